@@ -0,0 +1,106 @@
+"""
+Сериализация строк values() в словари ответа API.
+
+Объекты моделей не создаются: serializer знает, какую колонку (с JOIN
+через «__») читать для каждого поля ответа, и выбирает из базы только
+колонки полей, которые клиент перечислил в ?fields=.
+"""
+from django.core.files.storage import default_storage
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+def file_url(name):
+    return default_storage.url(name) if name else None
+
+
+class Serializer:
+    """
+    Поля ответа: имя поля — колонка для values() или пара
+    (колонка, функция преобразования значения).
+    """
+
+    def __init__(self, **fields):
+        self.fields = {
+            name: spec if isinstance(spec, tuple) else (spec, None)
+            for name, spec in fields.items()
+        }
+
+    def field_names(self, query):
+        """
+        Поля из параметра fields (через запятую) или все поля.
+        Незнакомое поле — InvalidFields.
+        """
+        names = tuple(dict.fromkeys(
+            name.strip() for name in (query or '').split(',')
+            if name.strip()))
+        if not names:
+            return tuple(self.fields)
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise InvalidFields('Неизвестные поля: {}. Доступны: {}.'.format(
+                ', '.join(unknown), ', '.join(self.fields)))
+        return names
+
+    def rows(self, queryset, names, extra=()):
+        """
+        Строки queryset'а с колонками полей names; extra — колонки,
+        нужные не клиенту, а пагинатору.
+        """
+        columns = {self.fields[name][0] for name in names}
+        return queryset.values(*columns.union(extra))
+
+    def dump(self, row, names):
+        data = {}
+        for name in names:
+            column, convert = self.fields[name]
+            value = row[column]
+            data[name] = convert(value) if convert else value
+        return data
+
+    def dump_many(self, rows, names):
+        return [self.dump(row, names) for row in rows]
+
+
+def user_serializer(prefix=''):
+    return Serializer(
+        username=f'{prefix}username',
+        first_name=f'{prefix}first_name',
+        last_name=f'{prefix}last_name',
+    )
+
+
+POST = Serializer(
+    id='id',
+    text='text',
+    pub_date='pub_date',
+    image=('image', file_url),
+    comment_count='comment_count',
+    author='author__username',
+    group='group__slug',
+)
+COMMENT = Serializer(
+    id='id',
+    text='text',
+    created='created',
+    author='author__username',
+)
+GROUP = Serializer(
+    id='id',
+    slug='slug',
+    title='title',
+    description='description',
+)
+PROFILE = Serializer(
+    id='id',
+    username='username',
+    first_name='first_name',
+    last_name='last_name',
+    followers_count='stats__followers_count',
+    following_count='stats__following_count',
+    posts_count='stats__posts_count',
+)
+FOLLOWER = user_serializer('user__')
+FOLLOWING = user_serializer('author__')
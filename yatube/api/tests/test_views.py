@@ -0,0 +1,188 @@
+import gzip
+import json
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+
+@override_settings(API_PAGE_SIZE=2)
+class ApiViewsTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='описание')
+        cls.other_group = Group.objects.create(title='Другая', slug='other')
+        cls.posts = [
+            Post.objects.create(text=f'пост {number}', author=cls.author,
+                                group=cls.group)
+            for number in range(5)
+        ]
+        cls.post = cls.posts[-1]
+        cls.post.image = 'posts/cat.jpg'
+        cls.post.save()
+        cls.comments = [
+            Comment.objects.create(post=cls.post, author=cls.reader,
+                                   text=f'комментарий {number}')
+            for number in range(3)
+        ]
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, name, *args, **params):
+        return self.client.get(reverse(f'api:v1:{name}', args=args), params)
+
+    def walk(self, name, *args, **params):
+        """Все записи списка, пройденного по next_cursor."""
+        results, cursor = [], None
+        while True:
+            data = self.get(name, *args, cursor=cursor or '', **params).json()
+            results += data['results']
+            cursor = data['next_cursor']
+            if cursor is None:
+                return results
+
+    def test_feeds_list_newest_posts_first(self):
+        expected = [post.id for post in reversed(self.posts)]
+        for args in (('posts',), ('group_posts', 'group'),
+                     ('user_posts', 'author')):
+            with self.subTest(view=args[0]):
+                self.assertEqual(
+                    [post['id'] for post in self.walk(*args)], expected)
+        self.assertEqual(self.walk('group_posts', 'other'), [])
+
+    def test_post_fields(self):
+        data = self.get('post', 'author', self.post.id).json()
+        self.assertEqual(data['text'], 'пост 4')
+        self.assertEqual(data['author'], 'author')
+        self.assertEqual(data['group'], 'group')
+        self.assertEqual(data['comment_count'], 3)
+        self.assertEqual(data['image'], '/media/posts/cat.jpg')
+        self.assertIn('pub_date', data)
+        first = self.get('post', 'author', self.posts[0].id).json()
+        self.assertIsNone(first['image'])
+
+    def test_cursors_move_both_ways(self):
+        first = self.get('posts').json()
+        self.assertIsNone(first['previous_cursor'])
+        second = self.get('posts', cursor=first['next_cursor']).json()
+        back = self.get('posts', cursor=second['previous_cursor']).json()
+        self.assertEqual(back['results'], first['results'])
+
+    def test_sparse_fieldsets(self):
+        data = self.get('posts', fields='id, author,id').json()
+        self.assertEqual(list(data['results'][0]), ['id', 'author'])
+        self.assertEqual(
+            list(self.get('profile', 'author', fields='username').json()),
+            ['username'])
+        response = self.get('posts', fields='id,password')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json()['detail'])
+
+    def test_feed_is_read_without_model_instances(self):
+        # Проба свежести ленты (2 запроса) и одна выборка страницы.
+        with self.settings(PAGE_CACHE_TIMEOUT=0):
+            with self.assertNumQueries(3):
+                self.get('posts')
+
+    def test_comments_newest_first(self):
+        comments = self.walk('post_comments', 'author', self.post.id)
+        self.assertEqual([comment['id'] for comment in comments],
+                         [comment.id for comment in reversed(self.comments)])
+        self.assertEqual(comments[0]['author'], 'reader')
+
+    def test_groups(self):
+        self.assertEqual([group['slug'] for group in self.walk('groups')],
+                         ['other', 'group'])
+        # Курсор ленты (по дате) не подходит списку групп (по id).
+        cursor = self.get('posts').json()['next_cursor']
+        self.assertEqual(len(self.get('groups', cursor=cursor).json()[
+            'results']), 2)
+        self.assertEqual(self.get('group', 'group').json(), {
+            'id': self.group.id, 'slug': 'group', 'title': 'Группа',
+            'description': 'описание',
+        })
+
+    def test_profile_and_follow_lists(self):
+        data = self.get('profile', 'author').json()
+        self.assertEqual(data['first_name'], 'Лев')
+        self.assertEqual(data['followers_count'], 1)
+        self.assertEqual(data['posts_count'], 5)
+        self.assertEqual(self.walk('followers', 'author'), [
+            {'username': 'reader', 'first_name': '', 'last_name': ''}])
+        self.assertEqual(
+            [user['username'] for user in self.walk('following', 'reader')],
+            ['author'])
+        self.assertEqual(self.walk('following', 'author'), [])
+
+    def test_missing_objects_are_json_404(self):
+        for args in (('post', 'reader', self.post.id),
+                     ('post_comments', 'reader', self.post.id),
+                     ('group', 'missing'), ('group_posts', 'missing'),
+                     ('profile', 'missing'), ('user_posts', 'missing'),
+                     ('followers', 'missing'), ('following', 'missing')):
+            with self.subTest(view=args[0]):
+                response = self.get(*args)
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(response['Content-Type'],
+                                 'application/json')
+                self.assertNotIn('ETag', response)
+                self.assertNotIn('Last-Modified', response)
+
+    def test_unchanged_responses_return_not_modified(self):
+        for args in (('posts',), ('post', 'author', self.post.id),
+                     ('followers', 'author'), ('groups',),
+                     ('group', 'group')):
+            with self.subTest(view=args[0]):
+                response = self.get(*args)
+                with CaptureQueriesContext(connection) as queries:
+                    again = self.client.get(
+                        reverse(f'api:v1:{args[0]}', args=args[1:]),
+                        HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(again.status_code, 304)
+                self.assertFalse(any(
+                    'COUNT(' in query['sql'] for query in queries))
+
+    def test_groups_answer_not_modified_without_queries(self):
+        for args in (('groups',), ('group', 'group')):
+            with self.subTest(view=args[0]):
+                url = reverse(f'api:v1:{args[0]}', args=args[1:])
+                etag = self.client.get(url)['ETag']
+                with self.assertNumQueries(0):
+                    again = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(again.status_code, 304)
+                group = Group.objects.get(slug='group')
+                group.title = f'{group.title}!'
+                group.save()
+                changed = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(changed.status_code, 200)
+                self.assertContains(changed, group.title)
+
+    def test_changes_reach_cached_feed(self):
+        self.get('posts')
+        new = Post.objects.create(text='новый', author=self.reader)
+        self.assertEqual(self.get('posts').json()['results'][0]['id'],
+                         new.id)
+
+    def test_responses_are_compressed(self):
+        response = self.client.get(reverse('api:v1:posts'),
+                                   HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        data = json.loads(gzip.decompress(response.content))
+        self.assertEqual(len(data['results']), 2)
+
+    def test_only_safe_methods(self):
+        response = self.client.post(reverse('api:v1:posts'))
+        self.assertEqual(response.status_code, 405)
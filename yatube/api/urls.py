@@ -0,0 +1,29 @@
+from django.urls import include, path
+
+from . import views
+
+app_name = 'api'
+
+v1_patterns = [
+    path('posts/', views.posts, name='posts'),
+    path('groups/', views.groups, name='groups'),
+    path('groups/<slug:slug>/', views.group, name='group'),
+    path('groups/<slug:slug>/posts/', views.group_posts, name='group_posts'),
+    path('users/<str:username>/', views.profile, name='profile'),
+    path('users/<str:username>/posts/', views.user_posts, name='user_posts'),
+    path('users/<str:username>/posts/<int:post_id>/', views.post,
+         name='post'),
+    path(
+        'users/<str:username>/posts/<int:post_id>/comments/',
+        views.post_comments,
+        name='post_comments'
+    ),
+    path('users/<str:username>/followers/', views.followers,
+         name='followers'),
+    path('users/<str:username>/following/', views.following,
+         name='following'),
+]
+
+urlpatterns = [
+    path('v1/', include((v1_patterns, 'v1'))),
+]
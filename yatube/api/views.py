@@ -0,0 +1,171 @@
+"""
+Версия 1 API только для чтения: ленты, посты, комментарии, группы,
+профили и подписки.
+
+Ответы строятся из строк values() без создания объектов моделей.
+Списки выводятся курсорным пагинатором, ?fields= ограничивает набор
+полей. Ленты, посты и профили проверяют свежесть теми же пробами, что
+и HTML-страницы, и для анонимных клиентов берутся из кэша страниц.
+Группы проверяются по версиям меток из кэша, без запросов к базе,
+поэтому 304 отдаётся без сборки ответа. Ошибки валидаторов не получают.
+Ответы сжимаются gzip.
+"""
+from functools import wraps
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_safe
+
+from posts.conditional import (conditional_page as fresh_page,
+                               group_detail_state, group_state, groups_state,
+                               index_state, post_state, profile_state)
+from posts.models import Comment, Follow, Group, Post, User
+from posts.pages import (cached_page, group_tags, index_tags, post_tags,
+                         profile_tags)
+from posts.paginators import CursorPaginator, IdCursorPaginator
+
+from .serializers import (COMMENT, FOLLOWER, FOLLOWING, GROUP, POST,
+                          PROFILE, InvalidFields)
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status,
+                        json_dumps_params={'ensure_ascii': False})
+
+
+def error(status, detail):
+    return json_response({'detail': detail}, status=status)
+
+
+def not_found():
+    return error(404, 'Не найдено.')
+
+
+def api_view(view):
+    """Только GET и HEAD, сжатие и ошибка 400 для неверного ?fields=."""
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except InvalidFields as exc:
+            return error(400, str(exc))
+    return gzip_page(require_safe(wrapper))
+
+
+def paginated(request, serializer, queryset, key='pub_date'):
+    """Страница списка по ?cursor= с полями из ?fields=."""
+    names = serializer.field_names(request.GET.get('fields'))
+    rows = serializer.rows(queryset, names, extra=(key, 'id'))
+    if key == 'id':
+        paginator = IdCursorPaginator(rows, settings.API_PAGE_SIZE)
+    else:
+        paginator = CursorPaginator(rows, settings.API_PAGE_SIZE, key=key)
+    page = paginator.get_page(request.GET.get('cursor'))
+    return json_response({
+        'results': serializer.dump_many(page, names),
+        'next_cursor': page.next_cursor,
+        'previous_cursor': page.previous_cursor,
+    })
+
+
+def detail(request, serializer, queryset):
+    names = serializer.field_names(request.GET.get('fields'))
+    row = serializer.rows(queryset, names).first()
+    if row is None:
+        return not_found()
+    return json_response(serializer.dump(row, names))
+
+
+def first_id(queryset):
+    return queryset.values_list('id', flat=True).first()
+
+
+@api_view
+@cached_page(index_tags)
+@fresh_page(index_state)
+def posts(request):
+    return paginated(request, POST, Post.objects.all())
+
+
+@api_view
+@fresh_page(groups_state)
+def groups(request):
+    return paginated(request, GROUP, Group.objects.order_by('-id'), key='id')
+
+
+@api_view
+@fresh_page(group_detail_state)
+def group(request, slug):
+    return detail(request, GROUP, Group.objects.filter(slug=slug))
+
+
+@api_view
+@cached_page(group_tags)
+@fresh_page(group_state)
+def group_posts(request, slug):
+    group_id = first_id(Group.objects.filter(slug=slug))
+    if group_id is None:
+        return not_found()
+    return paginated(request, POST, Post.objects.filter(group_id=group_id))
+
+
+@api_view
+@cached_page(profile_tags)
+@fresh_page(profile_state)
+def profile(request, username):
+    return detail(request, PROFILE, User.objects.filter(username=username))
+
+
+@api_view
+@cached_page(profile_tags)
+@fresh_page(profile_state)
+def user_posts(request, username):
+    author_id = first_id(User.objects.filter(username=username))
+    if author_id is None:
+        return not_found()
+    return paginated(request, POST, Post.objects.filter(author_id=author_id))
+
+
+@api_view
+@cached_page(post_tags)
+@fresh_page(post_state)
+def post(request, username, post_id):
+    return detail(request, POST, Post.objects.filter(
+        id=post_id, author__username=username))
+
+
+@api_view
+@cached_page(post_tags)
+@fresh_page(post_state)
+def post_comments(request, username, post_id):
+    if not Post.objects.filter(
+            id=post_id, author__username=username).exists():
+        return not_found()
+    return paginated(request, COMMENT,
+                     Comment.objects.filter(post_id=post_id), key='created')
+
+
+# Счётчики подписок входят в пробу профиля, а подписка сбрасывает
+# кэш страниц обоих авторов, поэтому списки подписок проверяются так же.
+@api_view
+@cached_page(profile_tags)
+@fresh_page(profile_state)
+def followers(request, username):
+    author_id = first_id(User.objects.filter(username=username))
+    if author_id is None:
+        return not_found()
+    return paginated(request, FOLLOWER, Follow.objects.filter(
+        author_id=author_id).order_by('-id'), key='id')
+
+
+@api_view
+@cached_page(profile_tags)
+@fresh_page(profile_state)
+def following(request, username):
+    user_id = first_id(User.objects.filter(username=username))
+    if user_id is None:
+        return not_found()
+    return paginated(request, FOLLOWING, Follow.objects.filter(
+        user_id=user_id).order_by('-id'), key='id')
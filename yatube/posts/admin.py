@@ -1,6 +1,7 @@
 from django.contrib import admin
 
 from .models import Comment, Group, Post
+from .search import search_filter
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -9,6 +10,12 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск идёт по полнотекстовому индексу, а не по icontains.
+        if not search_term:
+            return queryset, False
+        return queryset.filter(search_filter(search_term)), False
+
 
 class GroupAdmin(admin.ModelAdmin):
     list_display = ('title', 'slug', 'description')
@@ -0,0 +1,281 @@
+"""
+Нагрузочный замер страниц с постами.
+
+generate_data заполняет базу пользователями, группами, постами
+(часть с картинками), комментариями и подписками, run_benchmark гоняет
+страницы через тестовый клиент и считает задержку (p50/p95/p99),
+SQL-запросы ко всем базам и пиковую память на запрос. Команда benchmark
+делает то же самое в отдельной тестовой базе (реплики зеркалят её, как
+в тестах) и пишет результат в JSON.
+
+run_concurrency сравнивает пропускную способность SQLite при
+одновременных чтениях и записях: со стандартными настройками (журнал
+отката, новое соединение на каждый запрос) и с настройками проекта
+(WAL, PRAGMA, постоянные соединения). Это делает команда benchmark_db.
+"""
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import OperationalError, connections, transaction
+from django.db.models import F
+from django.test import Client
+from django.test.utils import (CaptureQueriesContext, setup_databases,
+                               teardown_databases)
+from django.urls import reverse
+
+from .models import Comment, Group, Post, User
+from .seeding import seed_database
+
+VIEWS = ('index', 'group_posts', 'profile', 'follow_index', 'post')
+
+
+def generate_data(users=50, groups=5, posts=500, comments=1000,
+                  follows=200, image_share=0.05, seed=0):
+    """
+    Создаёт данные для замера через posts.seeding и миниатюры картинок,
+    чтобы замер шёл по карточкам с картинками, а не с заглушками.
+    """
+    counts = seed_database(
+        users=users, groups=groups, posts=posts, comments=comments,
+        follows=follows, image_share=image_share, seed=seed, prefix='bench'
+    )
+    if image_share:
+        call_command('generate_post_images', stdout=StringIO())
+    return counts
+
+
+def view_urls(rng, samples=10):
+    """По нескольку адресов каждой страницы: разные авторы, группы, посты."""
+    post_ids = list(Post.objects.values_list('id', flat=True))
+    posts = Post.objects.select_related('author').filter(
+        id__in=rng.sample(post_ids, min(samples, len(post_ids))))
+    groups = Group.objects.order_by('id')[:samples]
+    return {
+        'index': [reverse('index')],
+        'group_posts': [
+            reverse('group_posts', args=(group.slug,)) for group in groups],
+        'profile': [
+            reverse('profile', args=(post.author.username,))
+            for post in posts
+        ],
+        'follow_index': [reverse('follow_index')],
+        'post': [
+            reverse('post', args=(post.author.username, post.id))
+            for post in posts
+        ],
+    }
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    index = (len(values) - 1) * fraction
+    low = int(index)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (index - low)
+
+
+@contextmanager
+def capture_queries():
+    """
+    Запросы ко всем базам: с репликами страницы читают не из default.
+    Возвращает список CaptureQueriesContext по одному на базу.
+    """
+    with ExitStack() as stack:
+        yield [stack.enter_context(CaptureQueriesContext(connections[alias]))
+               for alias in connections]
+
+
+@contextmanager
+def benchmark_databases():
+    """
+    Тестовые базы на время замера, как у тестового прогона: реплики
+    (TEST MIRROR) смотрят в тестовую копию основной базы, а не в настоящие.
+    """
+    saved = {alias: connections[alias].settings_dict for alias in connections}
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        yield
+    finally:
+        teardown_databases(old_config, verbosity=0)
+        for alias, settings_dict in saved.items():
+            connections[alias].close()
+            connections[alias].settings_dict = settings_dict
+
+
+def measure(client, urls, requests, warmup):
+    for url in urls * warmup:
+        client.get(url)
+    latencies, queries = [], []
+    for number in range(requests):
+        url = urls[number % len(urls)]
+        with capture_queries() as captured:
+            start = time.perf_counter()
+            response = client.get(url)
+            latencies.append((time.perf_counter() - start) * 1000)
+        if response.status_code != 200:
+            raise RuntimeError(f'{url}: ответ {response.status_code}')
+        queries.append(sum(len(queries) for queries in captured))
+    peaks = []
+    for url in urls[:5]:
+        tracemalloc.start()
+        try:
+            client.get(url)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+    return {
+        'requests': requests,
+        'p50_ms': round(percentile(latencies, 0.50), 2),
+        'p95_ms': round(percentile(latencies, 0.95), 2),
+        'p99_ms': round(percentile(latencies, 0.99), 2),
+        'mean_ms': round(sum(latencies) / len(latencies), 2),
+        'queries_mean': round(sum(queries) / len(queries), 2),
+        'queries_max': max(queries),
+        'peak_memory_kb': round(max(peaks) / 1024, 1),
+    }
+
+
+def run_benchmark(views=VIEWS, requests=100, warmup=1, seed=0):
+    """Замеряет страницы и возвращает {страница: метрики}."""
+    rng = random.Random(seed)
+    client = Client()
+    reader = User.objects.filter(follower__isnull=False).first()
+    if reader is not None:
+        client.force_login(reader)
+    urls = view_urls(rng)
+    return {
+        view: measure(client, urls[view], requests, warmup)
+        for view in views if urls[view]
+    }
+
+
+# Стандартные настройки Django: журнал отката, соединение на запрос.
+PLAIN_SQLITE = {'ENGINE': 'django.db.backends.sqlite3', 'CONN_MAX_AGE': 0}
+
+
+def prepare_concurrency_database(alias, posts):
+    """Создаёт схему и посты в базе alias, возвращает id автора и постов."""
+    call_command('migrate', database=alias, verbosity=0)
+    User.objects.using(alias).bulk_create(
+        [User(username='bench', password='!')])
+    author_id = User.objects.using(alias).get(username='bench').pk
+    Post.objects.using(alias).bulk_create(
+        Post(text=f'пост {number}', author_id=author_id)
+        for number in range(posts)
+    )
+    post_ids = list(Post.objects.using(alias).values_list('id', flat=True))
+    return author_id, post_ids
+
+
+def concurrency_load(alias, seconds, readers, writers, author_id, post_ids):
+    """
+    Читатели берут страницу ленты, писатели добавляют комментарий
+    и увеличивают счётчик поста. После каждой операции соединение
+    закрывается или остаётся, как в конце запроса к сайту.
+    """
+    counts = Counter()
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def read():
+        list(Post.objects.using(alias).order_by(
+            '-pub_date').values_list('id', 'text')[:10])
+
+    def write():
+        post_id = random.choice(post_ids)
+        with transaction.atomic(using=alias):
+            Comment.objects.using(alias).bulk_create([Comment(
+                post_id=post_id, author_id=author_id, text='комментарий')])
+            Post.objects.using(alias).filter(pk=post_id).update(
+                comment_count=F('comment_count') + 1)
+
+    def worker(kind, operation):
+        done = errors = 0
+        db = connections[alias]
+        try:
+            while time.perf_counter() < deadline:
+                try:
+                    operation()
+                    done += 1
+                except OperationalError:
+                    errors += 1
+                finally:
+                    db.close_if_unusable_or_obsolete()
+        finally:
+            db.close()
+        with lock:
+            counts[kind] += done
+            counts['errors'] += errors
+
+    threads = [
+        threading.Thread(target=worker, args=('reads', read))
+        for _ in range(readers)
+    ] + [
+        threading.Thread(target=worker, args=('writes', write))
+        for _ in range(writers)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {
+        'reads_per_second': round(counts['reads'] / seconds, 1),
+        'writes_per_second': round(counts['writes'] / seconds, 1),
+        'errors': counts['errors'],
+    }
+
+
+@contextmanager
+def temporary_database(alias, options):
+    """Подключает базу под именем alias на время блока."""
+    connections.databases[alias] = options
+    try:
+        yield alias
+    finally:
+        connections[alias].close()
+        del connections.databases[alias]
+        if hasattr(connections._connections, alias):
+            delattr(connections._connections, alias)
+
+
+def run_concurrency(readers=4, writers=2, seconds=5.0, posts=1000):
+    """
+    Замеряет одну и ту же нагрузку на копиях базы со стандартными
+    настройками (before) и с настройками проекта (after).
+    """
+    directory = tempfile.mkdtemp(prefix='yatube-db-bench-')
+    template = os.path.join(directory, 'template.sqlite3')
+    modes = {
+        'before': PLAIN_SQLITE,
+        'after': {
+            key: value for key, value in settings.DATABASES['default'].items()
+            if key != 'TEST'
+        },
+    }
+    results = {}
+    try:
+        with temporary_database('bench_template',
+                                {**PLAIN_SQLITE, 'NAME': template}) as alias:
+            ids = prepare_concurrency_database(alias, posts)
+        for mode, options in modes.items():
+            name = os.path.join(directory, f'{mode}.sqlite3')
+            shutil.copy(template, name)
+            with temporary_database(f'bench_{mode}',
+                                    {**options, 'NAME': name}) as alias:
+                results[mode] = concurrency_load(
+                    alias, seconds, readers, writers, *ids)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return results
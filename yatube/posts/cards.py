@@ -0,0 +1,36 @@
+from django.core.cache import cache
+
+from .versions import may_cache, new_version
+
+
+def card_version_key(post_id):
+    return f'post_card_version:{post_id}'
+
+
+def bump_card_version(post_id):
+    """Помечает закэшированную карточку поста устаревшей."""
+    cache.set(card_version_key(post_id), new_version(), None)
+
+
+def bump_card_versions(post_ids):
+    """Помечает устаревшими карточки нескольких постов одной записью."""
+    cache.set_many(
+        {card_version_key(post_id): new_version() for post_id in post_ids},
+        None)
+
+
+def attach_card_versions(posts):
+    """
+    Проставляет постам card_version — часть ключа кэша карточки.
+    Версии всех постов страницы читаются из кэша одним запросом.
+    Пост, прочитанный с реплики вскоре после смены версии, получает
+    card_version = None, и его карточка рисуется без кэша.
+    """
+    posts = {card_version_key(post.pk): post for post in posts}
+    versions = cache.get_many(posts)
+    missing = {key: new_version() for key in posts if key not in versions}
+    cache.set_many(missing, None)
+    versions.update(missing)
+    for key, post in posts.items():
+        version = versions[key]
+        post.card_version = version if may_cache(version) else None
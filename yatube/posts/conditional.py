@@ -0,0 +1,179 @@
+"""
+Условные GET-запросы (ETag и Last-Modified) для лент и страницы поста.
+
+Перед обработкой запроса выполняется дешёвая «проба» свежести: последние
+дата изменения и id постов ленты, последний комментарий и версии меток
+страницы из кэша (pages.py). Версии меток меняют сигналы удаления постов
+и генерация миниатюр, поэтому проба замечает удалённый пост и карточку,
+у которой заглушку сменила картинка, без подсчёта постов.
+Если клиент прислал совпадающий ETag или страница не менялась с
+If-Modified-Since, он получает 304 без основного запроса и рендеринга.
+У вошедших пользователей на страницу влияют их подписки, поэтому
+в ETag входят id пользователя и состояние его подписок, а Last-Modified
+не отдаётся. Валидаторы получают только ответы 200: 404 и другие ошибки
+клиент не должен перепроверять как страницу.
+"""
+import hashlib
+from functools import wraps
+
+from django.db.models import Count, Max
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from .models import AuthorStats, Comment, Follow, Post
+from .pages import (GROUPS_TAG, SITE_TAG, group_tags, index_tags,
+                    post_tags, profile_tags, tag_versions)
+from .versions import may_cache
+
+STATS_FIELDS = ('followers_count', 'following_count', 'posts_count')
+
+
+def latest(*moments):
+    moments = [moment for moment in moments if moment is not None]
+    return max(moments) if moments else None
+
+
+def last_comment():
+    return Comment.objects.order_by('-id').values_list(
+        'id', 'created').first() or (None, None)
+
+
+def feed_state(posts, tags):
+    """
+    Проба ленты: последний изменённый и последний созданный пост,
+    последний комментарий на сайте (меняет счётчики комментариев
+    в карточках) и версии меток страницы (удаления постов, миниатюры).
+    """
+    state = posts.order_by().aggregate(
+        updated=Max('updated'), last_id=Max('id'))
+    comment_id, commented = last_comment()
+    versions = tag_versions((SITE_TAG, *tags))
+    return {
+        'key': (state['last_id'], state['updated'], comment_id, versions),
+        'modified': latest(state['updated'], commented),
+        'versions': versions,
+    }
+
+
+def index_state(request):
+    return feed_state(Post.objects.all(), index_tags(request))
+
+
+def group_state(request, slug):
+    return feed_state(Post.objects.filter(group__slug=slug),
+                      group_tags(request, slug))
+
+
+def profile_state(request, username):
+    state = feed_state(Post.objects.filter(author__username=username),
+                       profile_tags(request, username))
+    stats = AuthorStats.objects.filter(
+        author__username=username).values_list(*STATS_FIELDS).first()
+    state['key'] += (stats,)
+    return state
+
+
+def post_state(request, username, post_id):
+    # [:1], а не first(): first() вернул бы ORDER BY id, и SQLite
+    # сортировал бы сгруппированную строку во временном B-дереве.
+    rows = Post.objects.filter(
+        id=post_id, author__username=username
+    ).values_list(
+        'updated', 'comment_count',
+        *(f'author__stats__{field}' for field in STATS_FIELDS)
+    ).annotate(commented=Max('comments__created')).order_by()[:1]
+    if not rows:
+        return None
+    updated, *counters, commented = rows[0]
+    versions = tag_versions((SITE_TAG, *post_tags(request, username, post_id)))
+    return {
+        'key': (updated, commented, *counters, versions),
+        'modified': latest(updated, commented),
+        'versions': versions,
+    }
+
+
+def versions_state(tags):
+    """
+    Проба только по версиям меток, без запросов к базе: для данных без
+    даты изменения, например групп. Last-Modified у таких ответов нет.
+    """
+    versions = tag_versions((SITE_TAG, *tags))
+    return {'key': versions, 'modified': None, 'versions': versions}
+
+
+def groups_state(request):
+    return versions_state((GROUPS_TAG,))
+
+
+def group_detail_state(request, slug):
+    return versions_state(group_tags(request, slug))
+
+
+def user_state(request):
+    """Подписки пользователя: меняют кнопки «Подписаться» в карточках."""
+    if not request.user.is_authenticated:
+        return None
+    follows = Follow.objects.filter(user=request.user).aggregate(
+        last_id=Max('id'), total=Count('id'))
+    return request.user.pk, follows['last_id'], follows['total']
+
+
+def has_validators(request, response):
+    """
+    Валидаторы остаются только у ответа 200 (и 304). Ответ, прочитанный
+    с отстающей реплики вскоре после смены версий пробы, мог собраться
+    из данных до записи: такой ETag закрепил бы у клиента старую страницу.
+    """
+    if response.status_code == 304:
+        return True
+    state = getattr(request, 'freshness', None)
+    return response.status_code == 200 and (
+        state is None or may_cache(*state['versions']))
+
+
+def finish_response(request, response):
+    """Убирает лишние валидаторы; страницу клиент всегда перепроверяет."""
+    if not has_validators(request, response):
+        del response['ETag']
+        del response['Last-Modified']
+    if request.method in ('GET', 'HEAD'):
+        patch_cache_control(response, no_cache=True)
+        patch_vary_headers(response, ('Cookie',))
+    return response
+
+
+def conditional_page(probe):
+    """
+    Декоратор вида: отвечает 304, если страница не менялась,
+    и добавляет ETag и Last-Modified к ответу 200.
+    """
+
+    def get_state(request, *args, **kwargs):
+        if not hasattr(request, 'freshness'):
+            request.freshness = probe(request, *args, **kwargs)
+        return request.freshness
+
+    def etag(request, *args, **kwargs):
+        state = get_state(request, *args, **kwargs)
+        if state is None:
+            return None
+        key = repr((request.get_full_path(), state['key'],
+                    user_state(request)))
+        return hashlib.md5(key.encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        state = get_state(request, *args, **kwargs)
+        if state is None or request.user.is_authenticated:
+            return None
+        return state['modified']
+
+    def decorator(view):
+        conditional_view = condition(etag, last_modified)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            return finish_response(
+                request, conditional_view(request, *args, **kwargs))
+        return wrapper
+    return decorator
@@ -0,0 +1,111 @@
+"""
+Проверка планов SQL-запросов страниц с постами.
+
+audit_views вызывает виды напрямую (RequestFactory, без сессий и записи
+в базу), собирает их SELECT-запросы вместе с пробами свежести и
+прогоняет каждый через EXPLAIN текущей базы. В плане ищутся полные
+просмотры таблиц и сортировки во временном B-дереве (SQLite) или
+Seq Scan и Sort (PostgreSQL). Планы имеют смысл на заполненной базе:
+на пустых таблицах планировщик выбирает их полный просмотр.
+"""
+import random
+import re
+
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+
+from yatube.query_budget import fingerprint
+
+from .benchmark import VIEWS, view_urls
+from .models import User
+
+FULL_SCAN = 'полный просмотр'
+TEMP_SORT = 'сортировка'
+PLAN_PROBLEMS = {
+    'sqlite': (
+        (FULL_SCAN, re.compile(r'^SCAN (TABLE )?\S+$')),
+        (TEMP_SORT, re.compile(r'USE TEMP B-TREE')),
+    ),
+    'postgresql': (
+        (FULL_SCAN, re.compile(r'Seq Scan on')),
+        (TEMP_SORT, re.compile(r'(^|->)\s*(Incremental )?Sort\b')),
+    ),
+}
+
+
+def explain(sql, using=connection):
+    """Строки плана запроса."""
+    with using.cursor() as cursor:
+        if using.vendor == 'sqlite':
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[3] for row in cursor.fetchall()]
+        cursor.execute(f'EXPLAIN {sql}')
+        return [row[0] for row in cursor.fetchall()]
+
+
+def stops_early(sql, problems):
+    """
+    Запрос без условий с LIMIT, который просматривает таблицу в нужном
+    порядке без сортировки, читает только первые строки.
+    """
+    sql = sql.upper()
+    return (TEMP_SORT not in problems and ' LIMIT ' in sql
+            and ' WHERE ' not in sql)
+
+
+def plan_problems(plan, sql='', vendor=None):
+    """Названия проблем плана без повторов, в порядке появления."""
+    checks = PLAN_PROBLEMS.get(vendor or connection.vendor, ())
+    problems = []
+    for line in plan:
+        for problem, pattern in checks:
+            if pattern.search(line) and problem not in problems:
+                problems.append(problem)
+    if FULL_SCAN in problems and stops_early(sql, problems):
+        problems.remove(FULL_SCAN)
+    return problems
+
+
+def view_queries(url, user):
+    """SELECT-запросы вида по адресу url без повторов."""
+    request = RequestFactory().get(url)
+    request.user = user
+    request.resolver_match = match = resolve(request.path)
+    with CaptureQueriesContext(connection) as captured:
+        match.func(request, *match.args, **match.kwargs)
+    queries = {}
+    for query in captured:
+        sql = query['sql']
+        if sql.lstrip().upper().startswith('SELECT'):
+            queries.setdefault(fingerprint(sql), sql)
+    return list(queries.values())
+
+
+@override_settings(PAGE_CACHE_TIMEOUT=0)
+def audit_views(views=VIEWS, samples=3, seed=0):
+    """
+    Планы запросов нескольких адресов каждого вида:
+    [{'view', 'url', 'sql', 'plan', 'problems'}, ...].
+    """
+    urls = view_urls(random.Random(seed), samples)
+    reader = User.objects.filter(follower__isnull=False).first()
+    results = []
+    for view in views:
+        user = reader if view == 'follow_index' else AnonymousUser()
+        if user is None:
+            continue
+        seen = set()
+        for url in urls[view]:
+            for sql in view_queries(url, user):
+                if fingerprint(sql) in seen:
+                    continue
+                seen.add(fingerprint(sql))
+                plan = explain(sql)
+                results.append({
+                    'view': view, 'url': url, 'sql': sql, 'plan': plan,
+                    'problems': plan_problems(plan, sql),
+                })
+    return results
@@ -1,5 +1,7 @@
+from django.core.files.uploadedfile import UploadedFile
 from django.forms import ModelForm
 
+from .images import prepare_post_image
 from .models import Comment, Post
 
 
@@ -19,6 +21,14 @@ class PostForm(ModelForm):
             'image': 'Можете загрузить одно фото с вашего компьютера',
         }
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        # При редактировании без новой картинки здесь лежит уже
+        # сохранённый файл, его проверять не нужно.
+        if not isinstance(image, UploadedFile):
+            return image
+        return prepare_post_image(image)
+
 
 class CommentForm(ModelForm):
 
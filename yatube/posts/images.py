@@ -0,0 +1,117 @@
+"""
+Проверка и подготовка картинок, которые загружают к постам.
+
+Сначала проверяются размер файла и размеры изображения из заголовка,
+и только потом картинка декодируется. Для JPEG декодирование идёт сразу
+в уменьшенном масштабе (draft), поэтому память не зависит от размера
+исходного снимка. Принятая картинка перекодируется и уменьшается
+до POST_IMAGE_MAX_SIDE по большей стороне.
+"""
+import os
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import InMemoryUploadedFile
+from django.template.defaultfilters import filesizeformat
+from PIL import Image, ImageOps
+
+SAVE_OPTIONS = {
+    'JPEG': {'quality': 85, 'optimize': True, 'progressive': True},
+    'PNG': {'optimize': True},
+    'GIF': {},
+    'WEBP': {'quality': 85},
+}
+# Режимы, которые формат записывает как есть. Остальные переводятся
+# в RGB, а при прозрачности (кроме JPEG) — в RGBA.
+SAVE_MODES = {
+    'JPEG': ('RGB', 'L'),
+    'PNG': ('1', 'L', 'LA', 'P', 'RGB', 'RGBA'),
+    'GIF': ('1', 'L', 'P'),
+    'WEBP': ('RGB', 'RGBA'),
+}
+EXTENSIONS = {
+    'JPEG': ('.jpg', '.jpeg'),
+    'PNG': ('.png',),
+    'GIF': ('.gif',),
+    'WEBP': ('.webp',),
+}
+
+
+def check_image_size(upload):
+    """Отклоняет файл, который больше POST_IMAGE_MAX_UPLOAD_SIZE."""
+    limit = settings.POST_IMAGE_MAX_UPLOAD_SIZE
+    if upload.size > limit:
+        raise ValidationError(
+            'Файл слишком большой: не больше %(limit)s.',
+            code='file_too_large',
+            params={'limit': filesizeformat(limit)},
+        )
+
+
+def open_image(upload):
+    """
+    Открывает картинку, прочитав только заголовок, и отклоняет её,
+    если в ней больше POST_IMAGE_MAX_PIXELS пикселей.
+    """
+    upload.seek(0)
+    try:
+        image = Image.open(upload)
+    except (OSError, Image.DecompressionBombError):
+        raise ValidationError(
+            'Загрузите правильное изображение.', code='invalid_image')
+    width, height = image.size
+    limit = settings.POST_IMAGE_MAX_PIXELS
+    if width * height > limit:
+        raise ValidationError(
+            'Изображение слишком большое: не больше %(limit)s пикселей.',
+            code='too_many_pixels',
+            params={'limit': limit},
+        )
+    return image
+
+
+def image_name(name, image_format):
+    root, extension = os.path.splitext(os.path.basename(name))
+    if extension.lower() in EXTENSIONS[image_format]:
+        return f'{root}{extension}'
+    return f'{root}{EXTENSIONS[image_format][0]}'
+
+
+def convert_mode(image, image_format):
+    """Переводит картинку в режим, который умеет записать image_format."""
+    if image.mode in SAVE_MODES[image_format]:
+        return image
+    alpha = image_format != 'JPEG' and (
+        {'A', 'a'} & set(image.getbands()) or 'transparency' in image.info)
+    return image.convert('RGBA' if alpha else 'RGB')
+
+
+def prepare_post_image(upload):
+    """
+    Проверяет загруженную картинку и возвращает её перекодированную
+    и уменьшенную копию. Выбрасывает ValidationError.
+    """
+    check_image_size(upload)
+    image = open_image(upload)
+    image_format = image.format if image.format in SAVE_OPTIONS else 'PNG'
+    max_side = settings.POST_IMAGE_MAX_SIDE
+    ratio = min(1, max_side / max(image.size))
+    output = SpooledTemporaryFile(
+        max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE)
+    try:
+        image.draft(None, tuple(round(side * ratio) for side in image.size))
+        image.thumbnail((max_side, max_side))
+        image = ImageOps.exif_transpose(image)
+        image = convert_mode(image, image_format)
+        image.save(output, image_format, **SAVE_OPTIONS[image_format])
+    except (OSError, SyntaxError, ValueError):
+        output.close()
+        raise ValidationError(
+            'Загрузите правильное изображение.', code='invalid_image')
+    size = output.tell()
+    output.seek(0)
+    return InMemoryUploadedFile(
+        output, upload.field_name, image_name(upload.name, image_format),
+        Image.MIME[image_format], size, None
+    )
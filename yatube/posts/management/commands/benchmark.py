@@ -0,0 +1,104 @@
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from posts.benchmark import (VIEWS, benchmark_databases, generate_data,
+                             run_benchmark)
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = ('Замеряет задержку, число запросов и память страниц с постами '
+            'на сгенерированных данных в отдельной тестовой базе.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--groups', type=int, default=10)
+        parser.add_argument('--posts', type=int, default=5000)
+        parser.add_argument('--comments', type=int, default=10000)
+        parser.add_argument('--follows', type=int, default=2000)
+        parser.add_argument('--image-share', type=float, default=0.01,
+                            help='Доля постов с картинкой.')
+        parser.add_argument('--requests', type=int, default=100,
+                            help='Запросов на каждую страницу.')
+        parser.add_argument('--views', default=','.join(VIEWS),
+                            help='Страницы через запятую.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Куда записать JSON.')
+        parser.add_argument('--compare',
+                            help='JSON прошлого замера для сравнения.')
+
+    def handle(self, *args, **options):
+        media_root = tempfile.mkdtemp(prefix='yatube-bench-')
+        try:
+            # Запросы считает сам замер, предупреждения о бюджетах
+            # на прогреве только мешают.
+            with benchmark_databases(), override_settings(
+                    MEDIA_ROOT=media_root, QUERY_BUDGETS={}):
+                cache.clear()
+                generate_data(
+                    users=options['users'], groups=options['groups'],
+                    posts=options['posts'], comments=options['comments'],
+                    follows=options['follows'],
+                    image_share=options['image_share'],
+                    seed=options['seed'],
+                )
+                results = run_benchmark(
+                    views=options['views'].split(','),
+                    requests=options['requests'], seed=options['seed'],
+                )
+        finally:
+            shutil.rmtree(media_root, ignore_errors=True)
+        report = {
+            'commit': current_commit(),
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'parameters': {
+                key: options[key] for key in (
+                    'users', 'groups', 'posts', 'comments', 'follows',
+                    'image_share', 'requests', 'seed')
+            },
+            'views': results,
+        }
+        previous = None
+        if options['compare'] and os.path.exists(options['compare']):
+            with open(options['compare']) as file:
+                previous = json.load(file)['views']
+        self.print_report(results, previous)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+            self.stdout.write(f'Результат записан в {options["output"]}')
+
+    def print_report(self, results, previous=None):
+        self.stdout.write(
+            f'{"view":<14} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} '
+            f'{"queries":>8} {"peak KB":>9}'
+        )
+        for view, row in results.items():
+            line = (
+                f'{view:<14} {row["p50_ms"]:>8} {row["p95_ms"]:>8} '
+                f'{row["p99_ms"]:>8} {row["queries_mean"]:>8} '
+                f'{row["peak_memory_kb"]:>9}'
+            )
+            if previous and view in previous:
+                before = previous[view]['p95_ms']
+                change = (row['p95_ms'] - before) / before if before else 0
+                line += f'   p95 {change:+.0%}'
+            self.stdout.write(line)
@@ -0,0 +1,39 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.benchmark import run_concurrency
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает пропускную способность SQLite при одновременных '
+            'чтениях и записях со стандартными настройками и с настройками '
+            'проекта (WAL, PRAGMA, постоянные соединения).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--seconds', type=float, default=5.0)
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument('--output', help='Куда записать JSON.')
+
+    def handle(self, *args, **options):
+        if settings.DATABASES['default']['ENGINE'] != (
+                'yatube.backends.sqlite3'):
+            raise CommandError('Замер настроек доступен только для SQLite.')
+        results = run_concurrency(
+            readers=options['readers'], writers=options['writers'],
+            seconds=options['seconds'], posts=options['posts'],
+        )
+        self.stdout.write(
+            f'{"mode":<8} {"reads/s":>10} {"writes/s":>10} {"errors":>7}')
+        for mode, row in results.items():
+            self.stdout.write(
+                f'{mode:<8} {row["reads_per_second"]:>10} '
+                f'{row["writes_per_second"]:>10} {row["errors"]:>7}'
+            )
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(results, file, indent=2)
+            self.stdout.write(f'Результат записан в {options["output"]}')
@@ -0,0 +1,36 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Показывает попадания, промахи и вытеснения кэша по префиксам.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true',
+                            help='Обнулить накопленную статистику.')
+
+    def handle(self, *args, **options):
+        if not hasattr(cache, 'read_stats'):
+            raise CommandError('Бэкенд кэша не собирает статистику')
+        if options['reset']:
+            cache.reset_stats()
+            self.stdout.write('Статистика кэша обнулена')
+            return
+        self.stdout.write(
+            f'{"prefix":<40} {"hits":>10} {"misses":>10} '
+            f'{"evictions":>10} {"hit rate":>9}'
+        )
+        for prefix, stats in sorted(cache.read_stats().items()):
+            requests = stats['hits'] + stats['misses']
+            hit_rate = stats['hits'] / requests if requests else 0
+            evictions = stats['evictions']
+            if evictions is None:
+                evictions = '-'
+            self.stdout.write(
+                f'{prefix:<40} {stats["hits"]:>10} {stats["misses"]:>10} '
+                f'{evictions:>10} {hit_rate:>9.1%}'
+            )
+        self.stdout.write(f'Вытеснений всего: {cache.read_evictions()}')
+        if not cache.evictions_by_prefix:
+            self.stdout.write('Бэкенд не знает ключей вытесненных записей, '
+                              'поэтому вытеснения не делятся по префиксам.')
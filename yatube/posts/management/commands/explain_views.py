@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.benchmark import VIEWS
+from posts.explain import audit_views
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = ('Прогоняет SQL-запросы страниц с постами через EXPLAIN '
+            'и отмечает полные просмотры таблиц и сортировки.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--views', default=','.join(VIEWS),
+                            help='Страницы через запятую.')
+        parser.add_argument('--samples', type=int, default=3,
+                            help='Сколько адресов каждой страницы проверить.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--all', action='store_true',
+                            help='Показать и запросы без замечаний.')
+        parser.add_argument('--strict', action='store_true',
+                            help='Завершиться с ошибкой, если есть '
+                                 'замечания.')
+
+    def handle(self, *args, **options):
+        views = [view for view in options['views'].split(',') if view]
+        unknown = set(views) - set(VIEWS)
+        if unknown:
+            raise CommandError(
+                f'Неизвестные страницы: {", ".join(sorted(unknown))}')
+        if not Post.objects.exists():
+            raise CommandError(
+                'В базе нет постов: заполните её командой seed.')
+        results = audit_views(views, options['samples'], options['seed'])
+        flagged = 0
+        for result in results:
+            if result['problems']:
+                flagged += 1
+            elif not options['all']:
+                continue
+            status = ', '.join(result['problems']) or 'ok'
+            self.stdout.write(f'{result["view"]} {result["url"]}: {status}')
+            self.stdout.write(f'    {result["sql"]}')
+            for line in result['plan']:
+                self.stdout.write(f'      {line}')
+        self.stdout.write(
+            f'Запросов: {len(results)}, с замечаниями: {flagged}')
+        if flagged and options['strict']:
+            raise CommandError('Есть запросы с полным просмотром '
+                               'или сортировкой.')
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.thumbnails import generate_card_thumbnail
+
+
+class Command(BaseCommand):
+    help = ('Создаёт миниатюры и уменьшенные копии картинок '
+            'для уже опубликованных постов.')
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').exclude(
+            image__isnull=True).values_list('pk', 'image').order_by('pk')
+        done = failed = 0
+        for post_id, name in posts.iterator():
+            try:
+                generate_card_thumbnail(name, post_id)
+            except Exception as error:
+                failed += 1
+                self.stderr.write(f'{name}: {error}')
+            else:
+                done += 1
+        self.stdout.write(f'Обработано картинок: {done}, ошибок: {failed}')
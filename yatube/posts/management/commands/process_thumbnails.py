@@ -0,0 +1,53 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from posts.thumbnails import process_thumbnail_tasks
+
+
+class Command(BaseCommand):
+    help = ('Воркер миниатюр: создаёт миниатюры картинок из очереди '
+            'ThumbnailTask.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Разобрать очередь и завершиться.')
+        parser.add_argument('--batch', type=int, default=20,
+                            help='Сколько задач брать за раз.')
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help='Пауза в секундах, когда очередь пуста.')
+
+    def handle(self, *args, **options):
+        self.running = True
+        # SIGTERM и Ctrl+C дают доделать текущую пачку задач.
+        handlers = {
+            signum: signal.signal(signum, self.stop)
+            for signum in (signal.SIGTERM, signal.SIGINT)
+        }
+        try:
+            done, failed = self.work(options)
+        finally:
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+        self.stdout.write(f'Обработано картинок: {done}, ошибок: {failed}')
+
+    def work(self, options):
+        total_done = total_failed = 0
+        while self.running:
+            done, failed = process_thumbnail_tasks(limit=options['batch'])
+            total_done += done
+            total_failed += failed
+            if done or failed:
+                continue
+            if options['once']:
+                break
+            time.sleep(options['interval'])
+            # Долгоживущий процесс: как между запросами к сайту, закрываем
+            # соединение с истёкшим CONN_MAX_AGE или оборванное.
+            close_old_connections()
+        return total_done, total_failed
+
+    def stop(self, signum, frame):
+        self.running = False
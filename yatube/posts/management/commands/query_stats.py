@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from yatube.query_budget import query_stats
+
+
+class Command(BaseCommand):
+    help = ('Показывает число SQL-запросов, время в базе и повторы '
+            'запросов по страницам сайта.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=24,
+                            help='За сколько последних часов показать.')
+        parser.add_argument('--duplicates', action='store_true',
+                            help='Показать самые частые повторы запросов.')
+        parser.add_argument('--reset', action='store_true',
+                            help='Обнулить накопленную статистику.')
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            query_stats.reset()
+            self.stdout.write('Статистика запросов обнулена')
+            return
+        self.stdout.write(
+            f'{"view":<25} {"requests":>9} {"avg q":>7} {"max q":>6} '
+            f'{"avg ms":>8} {"dup":>6} {"over":>6}'
+        )
+        stats = query_stats.read(options['hours'])
+        for url_name, row in sorted(stats.items()):
+            requests = row['requests']
+            self.stdout.write(
+                f'{url_name:<25} {requests:>9} '
+                f'{row["queries"] / requests:>7.1f} {row["max_queries"]:>6} '
+                f'{row["db_time"] * 1000 / requests:>8.1f} '
+                f'{row["duplicates"]:>6} {row["over_budget"]:>6}'
+            )
+            if options['duplicates']:
+                for sql, count in row['top_duplicates'].most_common():
+                    self.stdout.write(f'    {count}× {sql}')
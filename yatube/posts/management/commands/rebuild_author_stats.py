@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from posts.stats import rebuild_author_stats
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики подписчиков, подписок и записей авторов.'
+
+    def handle(self, *args, **options):
+        rebuild_author_stats()
+        self.stdout.write('Статистика авторов пересчитана')
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from posts.models import Comment, Post
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики комментариев у всех постов.'
+
+    def handle(self, *args, **options):
+        counts = Comment.objects.filter(post=OuterRef('pk')).order_by(
+        ).values('post').annotate(total=Count('pk')).values('total')
+        updated = Post.objects.update(
+            comment_count=Coalesce(Subquery(counts), 0))
+        self.stdout.write(f'Обновлено постов: {updated}')
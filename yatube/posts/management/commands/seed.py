@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+from django.utils.timezone import is_naive, make_aware
+
+from posts.seeding import seed_database
+
+
+class Command(BaseCommand):
+    help = ('Заполняет базу синтетическими пользователями, группами, '
+            'постами, комментариями и подписками.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=30000)
+        parser.add_argument('--follows', type=int, default=20000)
+        parser.add_argument('--image-share', type=float, default=0.0,
+                            help='Доля постов с картинкой-заглушкой.')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Зерно генератора случайных чисел.')
+        parser.add_argument('--until',
+                            help='Дата последнего поста, например '
+                                 '2021-06-01T00:00. По умолчанию — сейчас.')
+        parser.add_argument('--days', type=int, default=365,
+                            help='За сколько дней до --until идут посты.')
+        parser.add_argument('--prefix', default='user',
+                            help='Начало имён создаваемых пользователей.')
+        parser.add_argument('--no-rebuild', action='store_true',
+                            help='Не пересчитывать счётчики и индекс.')
+
+    def handle(self, *args, **options):
+        until = None
+        if options['until']:
+            until = parse_datetime(options['until'])
+            if until is None:
+                raise CommandError('Неверный формат --until')
+            if is_naive(until):
+                until = make_aware(until)
+        if not 0 <= options['image_share'] <= 1:
+            raise CommandError('--image-share должна быть от 0 до 1')
+        start = time.monotonic()
+        created = seed_database(
+            users=options['users'], groups=options['groups'],
+            posts=options['posts'], comments=options['comments'],
+            follows=options['follows'], image_share=options['image_share'],
+            seed=options['seed'], until=until, days=options['days'],
+            prefix=options['prefix'], rebuild=not options['no_rebuild'],
+        )
+        for model, count in created.items():
+            self.stdout.write(f'{model}: {count}')
+        self.stdout.write(f'Готово за {time.monotonic() - start:.1f} с')
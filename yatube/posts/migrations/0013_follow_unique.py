@@ -0,0 +1,44 @@
+# Generated by Django 2.2.6 on 2026-10-18 06:00
+
+from django.db import migrations, models
+from django.db.models import Count, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def remove_duplicate_follows(apps, schema_editor):
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    Follow = apps.get_model('posts', 'Follow')
+    db = schema_editor.connection.alias
+    first_ids = Follow.objects.using(db).values('user', 'author').annotate(
+        first_id=Min('id')).values('first_id')
+    deleted, _ = Follow.objects.using(db).exclude(id__in=first_ids).delete()
+    if not deleted:
+        return
+
+    def count_by(field):
+        counts = Follow.objects.filter(**{field: OuterRef('author')}).order_by(
+        ).values(field).annotate(total=Count('pk')).values('total')
+        return Coalesce(Subquery(counts), 0)
+
+    AuthorStats.objects.using(db).update(followers_count=count_by('author'),
+                                         following_count=count_by('user'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_authorstats'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_follows,
+                             migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(fields=['author', 'user'], name='follow_author_user_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('user', 'author'), name='unique_follow'),
+        ),
+    ]
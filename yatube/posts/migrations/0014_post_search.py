@@ -0,0 +1,25 @@
+# Generated by Django 2.2.6 on 2026-10-18 09:00
+
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    from posts.search import create_search_index, rebuild_search_index
+    create_search_index(schema_editor.connection)
+    rebuild_search_index(schema_editor.connection)
+
+
+def drop_search_index(apps, schema_editor):
+    from posts.search import drop_search_index
+    drop_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_follow_unique'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -29,15 +29,38 @@ class Post(models.Model):
                               null=True,
                               verbose_name='Группа')
     image = models.ImageField(upload_to='posts/', blank=True, null=True)
+    comment_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Количество комментариев'
+    )
+    updated = models.DateTimeField(auto_now=True, db_index=True,
+                                   verbose_name='Дата изменения')
 
     class Meta:
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
         ordering = ('-pub_date',)
+        # Ленты автора и группы выводятся по ключу (pub_date, id)
+        # по убыванию: индекс отдаёт их в нужном порядке без сортировки.
+        indexes = (
+            models.Index(fields=('author', '-pub_date', '-id'),
+                         name='post_author_pub_date_idx'),
+            models.Index(fields=('group', '-pub_date', '-id'),
+                         name='post_group_pub_date_idx'),
+        )
 
     def __str__(self):
         return self.text[:15]
 
+    def save(self, *args, **kwargs):
+        # Счётчик комментариев меняется только атомарным UPDATE в сигналах,
+        # поэтому при сохранении загруженного поста его не перезаписываем.
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'comment_count'
+            ]
+        super().save(*args, **kwargs)
+
 
 class Comment(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE,
@@ -52,6 +75,10 @@ class Comment(models.Model):
     class Meta:
         verbose_name_plural = 'Комментарии'
         ordering = ('-created',)
+        indexes = (
+            models.Index(fields=('post', '-created', '-id'),
+                         name='comment_post_created_id_idx'),
+        )
 
     def __str__(self):
         return self.text[:15]
@@ -65,5 +92,52 @@ class Follow(models.Model):
                                related_name='following',
                                verbose_name='Автор')
 
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(fields=('user', 'author'),
+                                    name='unique_follow'),
+        )
+        indexes = (
+            models.Index(fields=('author', 'user'),
+                         name='follow_author_user_idx'),
+        )
+
     def __str__(self):
         return f'user: {self.user.username} author: {self.author.username}'
+
+
+class AuthorStats(models.Model):
+    author = models.OneToOneField(User, on_delete=models.CASCADE,
+                                  primary_key=True, related_name='stats',
+                                  verbose_name='Автор')
+    followers_count = models.PositiveIntegerField(default=0,
+                                                  verbose_name='Подписчиков')
+    following_count = models.PositiveIntegerField(default=0,
+                                                  verbose_name='Подписок')
+    posts_count = models.PositiveIntegerField(default=0,
+                                              verbose_name='Записей')
+
+    class Meta:
+        verbose_name = 'Статистика автора'
+        verbose_name_plural = 'Статистика авторов'
+
+    def __str__(self):
+        return f'stats: {self.author_id}'
+
+
+class ThumbnailTask(models.Model):
+    """Картинка поста, для которой внешний воркер должен создать миниатюры."""
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name='thumbnail_tasks',
+                             verbose_name='Пост')
+    image = models.CharField(max_length=100, unique=True,
+                             verbose_name='Картинка')
+    created = models.DateTimeField(auto_now_add=True,
+                                   verbose_name='Дата постановки')
+
+    class Meta:
+        verbose_name = 'Задача миниатюр'
+        verbose_name_plural = 'Задачи миниатюр'
+
+    def __str__(self):
+        return self.image
@@ -0,0 +1,140 @@
+"""
+Кэш целых страниц для анонимных посетителей.
+
+Ответ хранится под ключом из адреса с параметрами запроса и версий
+«меток» страницы: лента index, группа, автор, пост. Сигналы при
+изменении постов, комментариев, групп и подписок меняют версии
+затронутых меток, и все варианты этих страниц (с любыми page и cursor)
+сразу перестают находиться в кэше. Срок хранения только ограничивает
+память. Ответ, прочитанный с отстающей реплики вскоре после смены
+версии, не сохраняется (versions.py). Вошедшие пользователи видят свои
+кнопки и подписки, поэтому кэш обходят.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+from .models import Post, User
+from .versions import may_cache, new_version
+
+# Метка всех страниц: её сбрасывают массовые изменения мимо сигналов.
+SITE_TAG = 'site'
+INDEX_TAG = 'index'
+# Список групп (API): меняется при создании, правке и удалении групп.
+GROUPS_TAG = 'groups'
+
+
+def group_tag(slug):
+    return f'group:{slug}'
+
+
+def author_tag(username):
+    return f'author:{username}'
+
+
+def post_tag(post_id):
+    return f'post:{post_id}'
+
+
+def tag_version_key(tag):
+    return f'page_version:{tag}'
+
+
+def index_tags(request):
+    return (INDEX_TAG,)
+
+
+def group_tags(request, slug):
+    return (group_tag(slug),)
+
+
+def profile_tags(request, username):
+    return (author_tag(username),)
+
+
+def post_tags(request, username, post_id):
+    return (post_tag(post_id), author_tag(username))
+
+
+def tag_versions(tags):
+    """Версии меток страницы одним обращением к кэшу."""
+    keys = [tag_version_key(tag) for tag in tags]
+    versions = cache.get_many(keys)
+    missing = {key: new_version() for key in keys if key not in versions}
+    cache.set_many(missing, None)
+    versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def invalidate_pages(tags):
+    """Помечает устаревшими все закэшированные страницы с этими метками."""
+    cache.set_many({tag_version_key(tag): new_version() for tag in tags}, None)
+
+
+def invalidate_all_pages():
+    invalidate_pages([SITE_TAG])
+
+
+def tags_for_posts(posts):
+    """Метки страниц, на которых видны посты: лента, группы, авторы, посты."""
+    tags = {INDEX_TAG}
+    for post_id, username, slug in posts.values_list(
+            'id', 'author__username', 'group__slug'):
+        tags.update((post_tag(post_id), author_tag(username)))
+        if slug:
+            tags.add(group_tag(slug))
+    return tags
+
+
+def invalidate_post_pages(*post_ids):
+    invalidate_pages(tags_for_posts(Post.objects.filter(pk__in=post_ids)))
+
+
+def invalidate_author_pages(*user_ids):
+    usernames = User.objects.filter(pk__in=user_ids).values_list(
+        'username', flat=True)
+    invalidate_pages([author_tag(username) for username in usernames])
+
+
+def cached_page(get_tags):
+    """
+    Декоратор вида: отдаёт анонимным посетителям сохранённый ответ,
+    а на промахе сохраняет успешный ответ вида. Условные заголовки
+    проверяются и по сохранённому ответу.
+    """
+
+    def decorator(view):
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (not settings.PAGE_CACHE_TIMEOUT
+                    or request.method not in ('GET', 'HEAD')
+                    or request.user.is_authenticated):
+                return view(request, *args, **kwargs)
+            versions = tag_versions(
+                (SITE_TAG, *get_tags(request, *args, **kwargs)))
+            key = 'page:{}:{}'.format(
+                request.resolver_match.view_name,
+                hashlib.md5(repr((request.get_full_path(), versions))
+                            .encode()).hexdigest()
+            )
+            response = cache.get(key)
+            if response is not None:
+                return get_conditional_response(
+                    request, etag=response.get('ETag'),
+                    last_modified=parse_http_date_safe(
+                        response.get('Last-Modified', '')),
+                    response=response,
+                )
+            response = view(request, *args, **kwargs)
+            if (request.method == 'GET' and response.status_code == 200
+                    and not response.streaming and not response.cookies
+                    and may_cache(*versions)):
+                cache.set(key, response, settings.PAGE_CACHE_TIMEOUT)
+            return response
+        return wrapper
+    return decorator
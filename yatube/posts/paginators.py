@@ -0,0 +1,143 @@
+import base64
+import binascii
+from datetime import datetime
+
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+def encode_cursor(direction, value, pk):
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = f'{direction}|{value}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, parse_value=parse_datetime):
+    """
+    Разбирает токен курсора на направление, значение ключа и id.
+    При любом повреждении токена выбрасывает ValueError.
+    """
+    if not cursor:
+        raise ValueError('Пустой курсор')
+    try:
+        padding = '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(cursor + padding).decode()
+    except (binascii.Error, UnicodeDecodeError):
+        raise ValueError('Некорректный курсор')
+    direction, value, pk = raw.split('|')
+    value = parse_value(value)
+    if direction not in (NEXT, PREVIOUS) or value is None:
+        raise ValueError('Некорректный курсор')
+    return direction, value, int(pk)
+
+
+class CursorPage(Page):
+    """
+    Страница курсорного пагинатора: вместо номеров соседних страниц
+    отдаёт непрозрачные токены next_cursor и previous_cursor.
+    """
+    cursor_mode = True
+
+    def __init__(self, object_list, number, paginator,
+                 has_next=False, has_previous=False):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<CursorPage {self.number}>'
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self.has_next():
+            return None
+        return self.paginator.cursor_for(NEXT, self[len(self) - 1])
+
+    @property
+    def previous_cursor(self):
+        if not self.has_previous():
+            return None
+        return self.paginator.cursor_for(PREVIOUS, self[0])
+
+
+class CursorPaginator(Paginator):
+    """
+    Постраничный вывод по ключу (key, id) в порядке убывания.
+
+    В отличие от Paginator не выполняет COUNT(*) и OFFSET: страница
+    выбирается условием «ключ меньше ключа последней записи предыдущей
+    страницы», поэтому глубокие страницы не медленнее первой.
+    Записи могут быть и объектами моделей, и словарями из values()
+    с ключом и id.
+    """
+    parse_value = staticmethod(parse_datetime)
+
+    def __init__(self, object_list, per_page, key='pub_date'):
+        super().__init__(object_list, per_page)
+        self.key = key
+
+    def cursor_for(self, direction, obj):
+        if isinstance(obj, dict):
+            return encode_cursor(direction, obj[self.key], obj['id'])
+        return encode_cursor(direction, getattr(obj, self.key), obj.pk)
+
+    def get_page(self, cursor):
+        """
+        Возвращает страницу по токену; при некорректном токене
+        возвращает первую страницу.
+        """
+        try:
+            direction, value, pk = decode_cursor(cursor, self.parse_value)
+        except ValueError:
+            return self.page()
+        return self.page(direction, value, pk, number=cursor)
+
+    def page(self, direction=None, value=None, pk=None, number=1):
+        key = self.key
+        queryset = self.object_list
+        if direction == NEXT:
+            queryset = queryset.filter(
+                Q(**{f'{key}__lt': value}) | Q(**{key: value, 'pk__lt': pk})
+            )
+        elif direction == PREVIOUS:
+            queryset = queryset.filter(
+                Q(**{f'{key}__gt': value}) | Q(**{key: value, 'pk__gt': pk})
+            )
+        if direction == PREVIOUS:
+            queryset = queryset.order_by(key, 'pk')
+        else:
+            queryset = queryset.order_by(f'-{key}', '-pk')
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == PREVIOUS:
+            if not has_more:
+                # Дошли до начала ленты: отдаём полную первую страницу.
+                return self.page()
+            rows.reverse()
+            return self._get_page(rows, number, self,
+                                  has_next=True, has_previous=True)
+        return self._get_page(rows, number, self, has_next=has_more,
+                              has_previous=direction == NEXT)
+
+    def _get_page(self, *args, **kwargs):
+        return CursorPage(*args, **kwargs)
+
+
+class IdCursorPaginator(CursorPaginator):
+    """Курсорный вывод по убыванию id для таблиц без даты."""
+    parse_value = staticmethod(int)
+
+    def __init__(self, object_list, per_page):
+        super().__init__(object_list, per_page, key='id')
@@ -0,0 +1,41 @@
+"""
+Общие queryset'ы постов и комментариев для страниц сайта.
+
+Все ленты берут посты через feed_posts: автор и группа подгружаются
+одним JOIN, а из таблиц выбираются только колонки, которые выводит
+карточка поста. Счётчики (комментарии, подписчики, записи) хранятся
+денормализованными в самих строках, поэтому агрегатов здесь нет.
+"""
+from .models import Comment, Post
+
+CARD_FIELDS = (
+    'id', 'text', 'pub_date', 'image', 'comment_count',
+    'author', 'author__username',
+    'group', 'group__title', 'group__slug',
+)
+AUTHOR_CARD_FIELDS = (
+    'author__first_name', 'author__last_name',
+    'author__stats__followers_count', 'author__stats__following_count',
+    'author__stats__posts_count',
+)
+COMMENT_FIELDS = ('id', 'text', 'created', 'post', 'author',
+                  'author__username')
+
+
+def feed_posts(queryset=None):
+    """Посты для лент и поиска."""
+    if queryset is None:
+        queryset = Post.objects.all()
+    return queryset.select_related('author', 'group').only(*CARD_FIELDS)
+
+
+def post_detail(queryset=None):
+    """Пост для отдельной страницы: вместе с карточкой автора."""
+    return feed_posts(queryset).select_related('author__stats').only(
+        *CARD_FIELDS, *AUTHOR_CARD_FIELDS)
+
+
+def comment_list(post):
+    """Комментарии поста вместе с именами авторов."""
+    return Comment.objects.filter(post=post).select_related(
+        'author').only(*COMMENT_FIELDS)
@@ -0,0 +1,202 @@
+"""
+Полнотекстовый поиск по постам.
+
+Индекс лежит в отдельной таблице posts_post_search: в SQLite это
+виртуальная таблица FTS5, в PostgreSQL — таблица с tsvector и GIN-индексом.
+В индекс попадают текст поста, название группы и имя автора, ключ строки
+совпадает с id поста. Индекс обновляется сигналами при сохранении
+и удалении постов, а также при переименовании групп и пользователей.
+На остальных СУБД поиск сводится к icontains без ранжирования.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Group, Post, User
+
+SEARCH_TABLE = 'posts_post_search'
+SEARCH_VENDORS = ('sqlite', 'postgresql')
+
+CREATE_SQL = {
+    'sqlite': [
+        f'CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5('
+        'text, group_title, username, '
+        "tokenize = 'unicode61 remove_diacritics 2')",
+    ],
+    'postgresql': [
+        f'CREATE TABLE {SEARCH_TABLE} ('
+        'post_id integer PRIMARY KEY, document tsvector NOT NULL)',
+        f'CREATE INDEX {SEARCH_TABLE}_document_idx '
+        f'ON {SEARCH_TABLE} USING gin (document)',
+    ],
+}
+
+# Строки индекса для постов, выбранных условием над алиасом p.
+SOURCE_SQL = (
+    'FROM {post} p '
+    'JOIN {user} u ON u.id = p.author_id '
+    'LEFT JOIN {group} g ON g.id = p.group_id '
+    'WHERE {condition}'
+)
+INDEX_SQL = {
+    'sqlite': (
+        f'INSERT INTO {SEARCH_TABLE} (rowid, text, group_title, username) '
+        "SELECT p.id, p.text, COALESCE(g.title, ''), u.username "
+    ),
+    'postgresql': (
+        f'INSERT INTO {SEARCH_TABLE} (post_id, document) '
+        'SELECT p.id, '
+        "setweight(to_tsvector(%s, p.text), 'A') || "
+        "setweight(to_tsvector(%s, COALESCE(g.title, '')), 'B') || "
+        "setweight(to_tsvector('simple', u.username), 'B') "
+    ),
+}
+UNINDEX_SQL = {
+    'sqlite': (
+        f'DELETE FROM {SEARCH_TABLE} WHERE rowid IN (SELECT p.id {{source}})'
+    ),
+    'postgresql': (
+        f'DELETE FROM {SEARCH_TABLE} '
+        f'WHERE post_id IN (SELECT p.id {{source}})'
+    ),
+}
+MATCH_SQL = {
+    'sqlite': (
+        f'SELECT rowid FROM {SEARCH_TABLE} '
+        f'WHERE {SEARCH_TABLE} MATCH %s'
+    ),
+    'postgresql': (
+        f'SELECT post_id FROM {SEARCH_TABLE} '
+        'WHERE document @@ plainto_tsquery(%s, %s)'
+    ),
+}
+RANKED_SQL = {
+    'sqlite': MATCH_SQL['sqlite'] + ' ORDER BY rank, rowid DESC',
+    'postgresql': (
+        MATCH_SQL['postgresql'] + ' ORDER BY '
+        'ts_rank(document, plainto_tsquery(%s, %s)) DESC, post_id DESC'
+    ),
+}
+
+
+def search_enabled(db=connection):
+    return db.vendor in SEARCH_VENDORS
+
+
+def create_search_index(db=connection):
+    with db.cursor() as cursor:
+        for sql in CREATE_SQL.get(db.vendor, ()):
+            cursor.execute(sql)
+
+
+def drop_search_index(db=connection):
+    if not search_enabled(db):
+        return
+    with db.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+
+def reindex_posts(condition, params=(), db=connection):
+    """
+    Переписывает строки индекса для постов, выбранных SQL-условием
+    над таблицей постов с алиасом p.
+    """
+    if not search_enabled(db):
+        return
+    source = SOURCE_SQL.format(
+        post=Post._meta.db_table, user=User._meta.db_table,
+        group=Group._meta.db_table, condition=condition,
+    )
+    index_params = list(params)
+    if db.vendor == 'postgresql':
+        index_params = [settings.SEARCH_CONFIG] * 2 + index_params
+    with db.cursor() as cursor:
+        cursor.execute(UNINDEX_SQL[db.vendor].format(source=source), params)
+        cursor.execute(INDEX_SQL[db.vendor] + source, index_params)
+
+
+def index_post(post_id):
+    reindex_posts('p.id = %s', [post_id])
+
+
+def unindex_post(post_id):
+    if not search_enabled():
+        return
+    key = 'rowid' if connection.vendor == 'sqlite' else 'post_id'
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {SEARCH_TABLE} WHERE {key} = %s', [post_id])
+
+
+def rebuild_search_index(db=connection):
+    reindex_posts('1 = 1', db=db)
+
+
+def match_expression(query):
+    """
+    Превращает пользовательский ввод в выражение FTS5: каждое слово
+    в кавычках и с поиском по префиксу, слова объединены через И.
+    """
+    return ' '.join(f'"{word}"*' for word in re.findall(r'\w+', query))
+
+
+def match_params(query):
+    if connection.vendor == 'sqlite':
+        return [match_expression(query)]
+    return [settings.SEARCH_CONFIG, query]
+
+
+def search_filter(query):
+    """Условие для фильтрации queryset постов по поисковому запросу."""
+    if not search_enabled():
+        return (Q(text__icontains=query)
+                | Q(group__title__icontains=query)
+                | Q(author__username__icontains=query))
+    return Q(pk__in=RawSQL(MATCH_SQL[connection.vendor], match_params(query)))
+
+
+class SearchResults:
+    """
+    Найденные посты в порядке релевантности. Поддерживает count()
+    и срезы, поэтому годится для Paginator: срез выбирает из индекса
+    только id нужной страницы и подгружает посты одним запросом.
+    """
+
+    def __init__(self, query, queryset):
+        self.query = query
+        self.queryset = queryset
+        self.empty = not re.search(r'\w', query)
+
+    def count(self):
+        if self.empty:
+            return 0
+        if not search_enabled():
+            return self.queryset.filter(search_filter(self.query)).count()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM ({MATCH_SQL[connection.vendor]}) s',
+                match_params(self.query)
+            )
+            return cursor.fetchone()[0]
+
+    def __getitem__(self, index):
+        if self.empty:
+            return []
+        if not search_enabled():
+            return self.queryset.filter(
+                search_filter(self.query)).order_by('-pub_date')[index]
+        params = match_params(self.query)
+        if connection.vendor == 'postgresql':
+            params *= 2
+        limit = index.stop - index.start
+        with connection.cursor() as cursor:
+            cursor.execute(
+                RANKED_SQL[connection.vendor] + ' LIMIT %s OFFSET %s',
+                params + [limit, index.start]
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        posts = self.queryset.in_bulk(ids)
+        return [posts[post_id] for post_id in ids if post_id in posts]
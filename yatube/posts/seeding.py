@@ -0,0 +1,275 @@
+"""
+Массовое заполнение базы синтетическими данными.
+
+Строки создаются генераторами и пишутся bulk_create пачками, поэтому
+в памяти никогда не лежит больше одной пачки. Распределения похожи
+на настоящие: популярность авторов подчиняется степенному закону
+(у популярных авторов больше и подписчиков, и постов, и комментариев —
+все три выбора идут по одному рейтингу авторов), посты идут
+сериями, комментарии приходят вскоре после публикации. При одинаковом
+seed и until получаются одни и те же данные.
+"""
+import random
+from bisect import bisect
+from contextlib import contextmanager
+from datetime import timedelta
+from io import BytesIO, StringIO
+from itertools import accumulate, islice
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from PIL import Image
+
+from .models import Comment, Follow, Group, Post, User
+from .pages import invalidate_all_pages
+
+BATCH_SIZE = 1000
+# Показатель степенного закона популярности авторов.
+POPULARITY_EXPONENT = 1.1
+# Вероятность, что следующий пост — продолжение серии того же автора.
+BURST_PROBABILITY = 0.6
+BURST_GAP = timedelta(minutes=3)
+COMMENT_DELAY = timedelta(hours=6)
+PLACEHOLDER_IMAGES = 16
+WORDS = (
+    'сегодня вчера утром вечером город море лес горы кофе книга фильм '
+    'работа проект друзья прогулка дождь солнце снег музыка концерт '
+    'поезд дорога отпуск кот собака сад огород урожай рецепт пирог'
+).split()
+
+
+def batched(iterable, size=BATCH_SIZE):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def bulk_insert(model, rows, batch_size=BATCH_SIZE, ignore_conflicts=False):
+    """
+    Пишет строки пачками и возвращает число переданных строк.
+    С ignore_conflicts строки, нарушающие уникальность, пропускаются
+    и всё равно входят в это число: созданные строки считают по новым id.
+    """
+    written = 0
+    for batch in batched(rows, batch_size):
+        model.objects.bulk_create(batch, ignore_conflicts=ignore_conflicts)
+        written += len(batch)
+    return written
+
+
+@contextmanager
+def explicit_dates(*fields):
+    """Временно отключает auto_now и auto_now_add, чтобы записать свои даты."""
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class PowerLaw:
+    """Выбор из id по убыванию популярности с весами 1 / rank ** exponent."""
+
+    def __init__(self, ranked_ids, rng, exponent=POPULARITY_EXPONENT):
+        self.ids = list(ranked_ids)
+        self.cum_weights = list(accumulate(
+            1 / rank ** exponent for rank in range(1, len(self.ids) + 1)))
+        self.rng = rng
+
+    def __call__(self):
+        point = self.rng.random() * self.cum_weights[-1]
+        return self.ids[bisect(self.cum_weights, point)]
+
+
+def sentence(rng, low=5, high=40):
+    words = rng.choices(WORDS, k=rng.randint(low, high))
+    return ' '.join(words).capitalize() + '.'
+
+
+class Seeder:
+
+    def __init__(self, seed=0, until=None, days=365, prefix='user'):
+        self.rng = random.Random(seed)
+        self.until = until or timezone.now()
+        self.since = self.until - timedelta(days=days)
+        self.prefix = prefix
+
+    def ranking(self, ids):
+        """Случайный порядок популярности: первый id — самый популярный."""
+        ranked = list(ids)
+        self.rng.shuffle(ranked)
+        return ranked
+
+    def new_ids(self, model, start):
+        return model.objects.filter(pk__gt=start).values_list(
+            'pk', flat=True).order_by('pk')
+
+    def last_id(self, model):
+        return model.objects.aggregate(last=Max('pk'))['last'] or 0
+
+    def users(self, count):
+        start = self.last_id(User)
+        offset = User.objects.filter(
+            username__startswith=self.prefix).count()
+        bulk_insert(User, (
+            User(username=f'{self.prefix}{offset + number}', password='!',
+                 date_joined=self.since)
+            for number in range(count)
+        ), ignore_conflicts=True)
+        return list(self.new_ids(User, start))
+
+    def groups(self, count):
+        start = self.last_id(Group)
+        offset = Group.objects.count()
+        bulk_insert(Group, (
+            Group(title=f'Группа {offset + number}',
+                  slug=f'group-{offset + number}',
+                  description=sentence(self.rng))
+            for number in range(count)
+        ), ignore_conflicts=True)
+        return list(self.new_ids(Group, start))
+
+    def placeholder_images(self):
+        names = []
+        for number in range(PLACEHOLDER_IMAGES):
+            color = tuple(self.rng.randrange(256) for _ in range(3))
+            content = BytesIO()
+            Image.new('RGB', (960, 640), color).save(content, 'JPEG')
+            names.append(default_storage.save(
+                f'posts/seed{number}.jpg', ContentFile(content.getvalue())))
+        return names
+
+    def post_rows(self, count, author_ids, group_ids, image_share):
+        if not count or not author_ids:
+            return
+        pick_author = PowerLaw(author_ids, self.rng)
+        pick_group = PowerLaw(group_ids, self.rng) if group_ids else None
+        images = self.placeholder_images() if image_share else []
+        # Средние промежутки подобраны так, чтобы посты заняли весь
+        # период с небольшим запасом на случайные отклонения.
+        span = (self.until - self.since).total_seconds() * 0.98
+        burst_gap = min(BURST_GAP.total_seconds(), span / count / 10)
+        gap = ((span - count * BURST_PROBABILITY * burst_gap)
+               / max(count * (1 - BURST_PROBABILITY), 1))
+        moment = self.since
+        author_id = pick_author()
+        for _ in range(count):
+            if self.rng.random() < BURST_PROBABILITY:
+                pause = self.rng.expovariate(1 / burst_gap)
+            else:
+                author_id = pick_author()
+                pause = self.rng.expovariate(1 / gap)
+            moment += timedelta(seconds=pause)
+            group_id = None
+            if pick_group and self.rng.random() < 0.7:
+                group_id = pick_group()
+            image = None
+            if images and self.rng.random() < image_share:
+                image = self.rng.choice(images)
+            pub_date = min(moment, self.until)
+            yield Post(text=sentence(self.rng), author_id=author_id,
+                       group_id=group_id, image=image,
+                       pub_date=pub_date, updated=pub_date)
+
+    def posts(self, count, author_ids, group_ids, image_share=0):
+        start = self.last_id(Post)
+        with explicit_dates(Post._meta.get_field('pub_date'),
+                            Post._meta.get_field('updated')):
+            bulk_insert(Post, self.post_rows(
+                count, author_ids, group_ids, image_share))
+        return start
+
+    def comment_rows(self, count, first_post_id, author_ids):
+        """
+        Комментарии к постам по порядку их публикации: число комментариев
+        у поста распределено экспоненциально вокруг среднего.
+        """
+        posts = Post.objects.filter(pk__gt=first_post_id).values_list(
+            'pk', 'pub_date')
+        total = posts.count()
+        if not total or not count:
+            return
+        mean = count / total
+        produced = 0
+        pick_author = PowerLaw(author_ids, self.rng)
+        for post_id, pub_date in posts.iterator(chunk_size=BATCH_SIZE):
+            for _ in range(int(self.rng.expovariate(1 / mean) + 0.5)):
+                if produced >= count:
+                    return
+                delay = COMMENT_DELAY * self.rng.expovariate(1)
+                yield Comment(post_id=post_id, author_id=pick_author(),
+                              text=sentence(self.rng, 2, 15),
+                              created=min(pub_date + delay, self.until))
+                produced += 1
+
+    def comments(self, count, first_post_id, author_ids):
+        with explicit_dates(Comment._meta.get_field('created')):
+            return bulk_insert(Comment, self.comment_rows(
+                count, first_post_id, author_ids))
+
+    def follow_rows(self, count, user_ids):
+        """
+        Подписки: авторов выбирают по степенному закону, число подписок
+        у пользователя тоже сильно разнится.
+        """
+        if len(user_ids) < 2 or not count:
+            return
+        pick_author = PowerLaw(user_ids, self.rng)
+        mean = count / len(user_ids)
+        produced = 0
+        for user_id in user_ids:
+            wanted = min(int(self.rng.expovariate(1 / mean) + 0.5),
+                         len(user_ids) - 1)
+            authors = set()
+            attempts = 0
+            while len(authors) < wanted and attempts < wanted * 10:
+                attempts += 1
+                author_id = pick_author()
+                if author_id != user_id:
+                    authors.add(author_id)
+            for author_id in authors:
+                if produced >= count:
+                    return
+                yield Follow(user_id=user_id, author_id=author_id)
+                produced += 1
+
+    def follows(self, count, user_ids):
+        return bulk_insert(Follow, self.follow_rows(count, user_ids))
+
+
+def seed_database(users=1000, groups=20, posts=10000, comments=30000,
+                  follows=20000, image_share=0.0, seed=0, until=None,
+                  days=365, prefix='user', rebuild=True):
+    """
+    Создаёт данные и пересчитывает денормализованные счётчики
+    и поисковый индекс. Возвращает число созданных строк по моделям.
+    """
+    seeder = Seeder(seed=seed, until=until, days=days, prefix=prefix)
+    with transaction.atomic():
+        authors = seeder.ranking(seeder.users(users))
+        group_ids = seeder.ranking(seeder.groups(groups))
+        first_post_id = seeder.posts(posts, authors, group_ids, image_share)
+        created = {
+            'users': len(authors),
+            'groups': len(group_ids),
+            'posts': seeder.last_id(Post) - first_post_id,
+            'comments': seeder.comments(comments, first_post_id, authors),
+            'follows': seeder.follows(follows, authors),
+        }
+    if rebuild:
+        for command in ('rebuild_comment_counts', 'rebuild_author_stats',
+                        'rebuild_search_index'):
+            call_command(command, stdout=StringIO())
+    # bulk_create не шлёт сигналов, поэтому страницы сбрасываются разом.
+    invalidate_all_pages()
+    return created
@@ -0,0 +1,226 @@
+from django.conf import settings
+from django.db.models import F
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from .cards import bump_card_version, bump_card_versions
+from .models import AuthorStats, Comment, Follow, Group, Post, User
+from .pages import (GROUPS_TAG, author_tag, group_tag,
+                    invalidate_author_pages, invalidate_pages,
+                    invalidate_post_pages, tags_for_posts)
+from .search import index_post, reindex_posts, unindex_post
+from .stats import change_author_stats
+from .thumbnails import queue_card_thumbnail
+from .timelines import drop_timeline, fan_out_post
+
+
+@receiver(post_save, sender=Comment)
+def increment_comment_count(sender, instance, created, **kwargs):
+    if created:
+        Post.objects.filter(pk=instance.post_id).update(
+            comment_count=F('comment_count') + 1)
+
+
+@receiver(post_delete, sender=Comment)
+def decrement_comment_count(sender, instance, **kwargs):
+    Post.objects.filter(pk=instance.post_id, comment_count__gt=0).update(
+        comment_count=F('comment_count') - 1)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_commented_post_card(sender, instance, **kwargs):
+    bump_card_version(instance.post_id)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_card(sender, instance, **kwargs):
+    bump_card_version(instance.pk)
+
+
+@receiver(post_save, sender=Group)
+def invalidate_group_cards(sender, instance, created, raw, **kwargs):
+    # Название и адрес группы выводятся в карточках её постов.
+    if not created and not raw:
+        bump_card_versions(instance.posts.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Group)
+def invalidate_ungrouped_cards(sender, instance, **kwargs):
+    # SET_NULL обновляет посты без сигналов Post.
+    bump_card_versions(getattr(instance, 'post_ids', ()))
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_cards(sender, instance, created, raw, **kwargs):
+    # Имя автора и ссылка на профиль выводятся в карточках его постов.
+    old_username = getattr(instance, 'old_username', None)
+    if old_username and old_username != instance.username:
+        bump_card_versions(instance.posts.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Post)
+def queue_post_thumbnail(sender, instance, raw, **kwargs):
+    # Без on_commit: задача ThumbnailTask попадает в ту же транзакцию,
+    # что и пост, а файл картинки к этому моменту уже записан.
+    if instance.image and not raw:
+        queue_card_thumbnail(instance.image)
+
+
+@receiver(post_save, sender=User)
+def create_author_stats(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        AuthorStats.objects.get_or_create(author=instance)
+
+
+@receiver(post_save, sender=Post)
+def increment_posts_count(sender, instance, created, **kwargs):
+    if created:
+        change_author_stats(instance.author_id, 'posts_count', 1)
+        if settings.FOLLOW_TIMELINES:
+            fan_out_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def decrement_posts_count(sender, instance, **kwargs):
+    change_author_stats(instance.author_id, 'posts_count', -1)
+
+
+@receiver(post_save, sender=Follow)
+def increment_follow_counts(sender, instance, created, **kwargs):
+    if created:
+        change_author_stats(instance.author_id, 'followers_count', 1)
+        change_author_stats(instance.user_id, 'following_count', 1)
+        drop_timeline(instance.user_id)
+
+
+@receiver(post_delete, sender=Follow)
+def decrement_follow_counts(sender, instance, **kwargs):
+    change_author_stats(instance.author_id, 'followers_count', -1)
+    change_author_stats(instance.user_id, 'following_count', -1)
+    drop_timeline(instance.user_id)
+
+
+@receiver(post_save, sender=Post)
+def index_saved_post(sender, instance, raw, **kwargs):
+    if not raw:
+        index_post(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_deleted_post(sender, instance, **kwargs):
+    unindex_post(instance.pk)
+
+
+@receiver(post_save, sender=Group)
+def reindex_group_posts(sender, instance, created, raw, **kwargs):
+    if not created and not raw:
+        reindex_posts('p.group_id = %s', [instance.pk])
+
+
+@receiver(pre_delete, sender=Group)
+def remember_group_posts(sender, instance, **kwargs):
+    instance.post_ids = list(instance.posts.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Group)
+def reindex_ungrouped_posts(sender, instance, **kwargs):
+    # Посты удалённой группы остаются, но уже без её названия.
+    for post_id in getattr(instance, 'post_ids', ()):
+        index_post(post_id)
+
+
+@receiver(post_save, sender=User)
+def reindex_author_posts(sender, instance, created, raw, update_fields,
+                         **kwargs):
+    # Вход на сайт сохраняет только last_login, индекс при этом не нужен.
+    if created or raw:
+        return
+    if update_fields is None or 'username' in update_fields:
+        reindex_posts('p.author_id = %s', [instance.pk])
+
+
+@receiver(pre_save, sender=Post)
+@receiver(pre_delete, sender=Post)
+def remember_post_pages(sender, instance, raw=False, **kwargs):
+    # Пост мог сменить группу: старые страницы тоже устарели.
+    instance.page_tags = set()
+    if instance.pk and not raw:
+        instance.page_tags = tags_for_posts(
+            Post.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Post)
+def invalidate_saved_post_pages(sender, instance, raw, **kwargs):
+    if not raw:
+        invalidate_pages(getattr(instance, 'page_tags', set())
+                         | tags_for_posts(Post.objects.filter(pk=instance.pk)))
+
+
+@receiver(post_delete, sender=Post)
+def invalidate_deleted_post_pages(sender, instance, **kwargs):
+    invalidate_pages(getattr(instance, 'page_tags', ()))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_commented_post_pages(sender, instance, **kwargs):
+    invalidate_post_pages(instance.post_id)
+
+
+@receiver(pre_save, sender=Group)
+def remember_group_slug(sender, instance, raw, **kwargs):
+    instance.old_slug = None
+    if instance.pk and not raw:
+        instance.old_slug = Group.objects.filter(pk=instance.pk).values_list(
+            'slug', flat=True).first()
+
+
+@receiver(post_save, sender=Group)
+def invalidate_group_pages(sender, instance, created, raw, **kwargs):
+    tags = {GROUPS_TAG, group_tag(instance.slug)}
+    old_slug = getattr(instance, 'old_slug', None)
+    if old_slug:
+        tags.add(group_tag(old_slug))
+    if not created and not raw:
+        # Название группы выводится в карточках постов на всех страницах.
+        tags |= tags_for_posts(instance.posts.all())
+    invalidate_pages(tags)
+
+
+@receiver(post_delete, sender=Group)
+def invalidate_deleted_group_pages(sender, instance, **kwargs):
+    post_ids = getattr(instance, 'post_ids', ())
+    invalidate_pages({GROUPS_TAG, group_tag(instance.slug)}
+                     | tags_for_posts(Post.objects.filter(pk__in=post_ids)))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_pages(sender, instance, **kwargs):
+    # Число подписчиков и подписок выводится в профиле и у постов автора.
+    invalidate_author_pages(instance.user_id, instance.author_id)
+
+
+@receiver(pre_save, sender=User)
+def remember_username(sender, instance, raw, update_fields, **kwargs):
+    instance.old_username = None
+    if instance.pk and not raw and (
+            update_fields is None or 'username' in update_fields):
+        instance.old_username = User.objects.filter(
+            pk=instance.pk).values_list('username', flat=True).first()
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_profile(sender, instance, created, raw, **kwargs):
+    # Вход сохраняет только last_login: имя не менялось.
+    old_username = getattr(instance, 'old_username', None)
+    if created:
+        invalidate_pages([author_tag(instance.username)])
+    elif old_username and old_username != instance.username:
+        # Имя автора выводится в карточках его постов на всех страницах.
+        invalidate_pages({author_tag(instance.username),
+                          author_tag(old_username)}
+                         | tags_for_posts(instance.posts.all()))
@@ -0,0 +1,65 @@
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import AuthorStats, Follow, Post, User
+
+
+def change_author_stats(author_id, field, delta):
+    """Атомарно изменяет один из счётчиков автора на delta."""
+    stats = AuthorStats.objects.filter(author_id=author_id)
+    if delta < 0:
+        stats = stats.filter(**{f'{field}__gte': -delta})
+    stats.update(**{field: F(field) + delta})
+
+
+def get_author_stats(author):
+    """
+    Статистика автора. Пользователи из bulk_create, loaddata и seed
+    не проходят через post_save и остаются без строки: её создаёт
+    первое обращение, сразу с подсчётом по основной базе: отстающая
+    реплика навсегда записала бы в строку неполные счётчики.
+    """
+    try:
+        return author.stats
+    except AuthorStats.DoesNotExist:
+        pass
+    counts = User.objects.using(DEFAULT_DB_ALIAS).filter(
+        pk=author.pk).values_list(
+        count_by(Follow, 'author'), count_by(Follow, 'user'),
+        count_by(Post, 'author'))
+    followers, following, posts = counts.get()
+    stats = AuthorStats(author=author, followers_count=followers,
+                        following_count=following, posts_count=posts)
+    # Параллельный запрос мог создать ту же строку с теми же счётчиками.
+    AuthorStats.objects.bulk_create([stats], ignore_conflicts=True)
+    return stats
+
+
+def count_by(model, field):
+    counts = model.objects.filter(**{field: OuterRef('pk')}).order_by(
+    ).values(field).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(counts), 0)
+
+
+def rebuild_author_stats(users=None, batch_size=1000):
+    """Пересчитывает статистику авторов; по умолчанию — всех."""
+    if users is None:
+        users = User.objects.all()
+    rows = users.annotate(
+        followers_total=count_by(Follow, 'author'),
+        following_total=count_by(Follow, 'user'),
+        posts_total=count_by(Post, 'author'),
+    ).values_list('pk', 'followers_total', 'following_total', 'posts_total')
+    with transaction.atomic():
+        AuthorStats.objects.filter(author__in=users).delete()
+        batch = []
+        for pk, followers, following, posts in rows.iterator():
+            batch.append(AuthorStats(author_id=pk,
+                                     followers_count=followers,
+                                     following_count=following,
+                                     posts_count=posts))
+            if len(batch) >= batch_size:
+                AuthorStats.objects.bulk_create(batch)
+                batch = []
+        AuthorStats.objects.bulk_create(batch)
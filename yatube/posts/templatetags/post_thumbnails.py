@@ -0,0 +1,12 @@
+from django import template
+
+from posts.thumbnails import get_card_thumbnail
+from yatube.timing import timed
+
+register = template.Library()
+
+
+@register.simple_tag
+def card_thumbnail(image):
+    with timed('thumbnail'):
+        return get_card_thumbnail(image)
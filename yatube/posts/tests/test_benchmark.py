@@ -0,0 +1,97 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, connections
+from django.http import HttpResponse
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from posts.benchmark import (PLAIN_SQLITE, VIEWS, generate_data, measure,
+                             percentile, run_benchmark, temporary_database)
+from posts.models import Comment, Follow, Post
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, QUERY_BUDGETS={})
+class BenchmarkTests(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_percentile_interpolates(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 0.5), 50.5)
+        self.assertAlmostEqual(percentile(values, 0.99), 99.01)
+        self.assertEqual(percentile([], 0.5), 0.0)
+
+    def test_generated_data_is_benchmarked(self):
+        generate_data(users=5, groups=2, posts=30, comments=20, follows=10,
+                      image_share=0.5)
+        self.assertEqual(Post.objects.count(), 30)
+        self.assertTrue(Post.objects.exclude(image='').exists())
+        self.assertEqual(
+            sum(Post.objects.values_list('comment_count', flat=True)),
+            Comment.objects.count()
+        )
+        self.assertTrue(Follow.objects.exists())
+        results = run_benchmark(requests=3)
+        self.assertEqual(set(results), set(VIEWS))
+        for metrics in results.values():
+            self.assertEqual(metrics['requests'], 3)
+            self.assertLessEqual(metrics['p50_ms'], metrics['p99_ms'])
+            self.assertGreater(metrics['queries_mean'], 0)
+            self.assertGreater(metrics['peak_memory_kb'], 0)
+
+
+class MeasureTests(SimpleTestCase):
+    databases = {'default'}
+
+    def test_queries_on_every_database_are_counted(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        replica = {**PLAIN_SQLITE,
+                   'NAME': os.path.join(directory, 'replica.sqlite3')}
+        with temporary_database('bench_replica', replica) as alias:
+
+            class ReplicaClient:
+                """Страница, которая читает и из default, и с реплики."""
+
+                def get(self, url):
+                    for db in (connection, connections[alias]):
+                        with db.cursor() as cursor:
+                            cursor.execute('SELECT 1')
+                    return HttpResponse()
+
+            metrics = measure(ReplicaClient(), ['/'], requests=2, warmup=0)
+        self.assertEqual(metrics['queries_mean'], 2)
+
+
+class ConcurrencyBenchmarkTests(SimpleTestCase):
+    databases = {'default'}
+
+    def test_command_compares_database_settings(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        output = os.path.join(directory, 'db.json')
+        out = StringIO()
+        call_command('benchmark_db', readers=1, writers=1, seconds=0.2,
+                     posts=10, output=output, stdout=out)
+        with open(output) as file:
+            results = json.load(file)
+        self.assertEqual(set(results), {'before', 'after'})
+        for mode, row in results.items():
+            with self.subTest(mode=mode):
+                self.assertGreater(row['reads_per_second'], 0)
+                self.assertGreater(row['writes_per_second'], 0)
+                self.assertIn(mode, out.getvalue())
@@ -0,0 +1,101 @@
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from yatube.cache import StatsFileBasedCache, StatsLocMemCache, key_prefix
+
+
+class CacheStatsTests(SimpleTestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.file_cache = StatsFileBasedCache(self.cache_dir, {})
+        self.memory_cache = StatsLocMemCache('stats-test', {})
+
+    def tearDown(self):
+        self.memory_cache.reset_stats()
+        self.memory_cache.clear()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_key_prefix(self):
+        keys_prefixes = (
+            ('timeline:5', 'timeline'),
+            ('post_card_version:7', 'post_card_version'),
+            ('template.cache.post_card.abc123', 'template.cache.post_card'),
+            ('sorl-thumbnail||image||abc123', 'sorl-thumbnail||image'),
+        )
+        for key, prefix in keys_prefixes:
+            with self.subTest(key=key):
+                self.assertEqual(key_prefix(key), prefix)
+
+    def test_hits_and_misses_are_counted_per_prefix(self):
+        for backend in (self.file_cache, self.memory_cache):
+            with self.subTest(backend=type(backend).__name__):
+                backend.set('timeline:1', [1])
+                backend.get('timeline:1')
+                backend.get('timeline:2')
+                backend.get_many(['post_card_version:1', 'timeline:1'])
+                stats = backend.read_stats()
+                self.assertEqual(stats['timeline']['hits'], 2)
+                self.assertEqual(stats['timeline']['misses'], 1)
+                self.assertEqual(stats['post_card_version']['misses'], 1)
+                backend.reset_stats()
+                self.assertEqual(backend.read_stats(), {})
+
+    def test_evictions_are_counted(self):
+        small_params = {'OPTIONS': {'MAX_ENTRIES': 4}}
+        # Ключи вытесненных файлов неизвестны, поэтому у файлового кэша
+        # вытеснения не делятся по префиксам.
+        small_caches = (
+            (StatsFileBasedCache(self.cache_dir, small_params), None),
+            (StatsLocMemCache('stats-small', small_params), 'timeline'),
+        )
+        for backend, prefix in small_caches:
+            with self.subTest(backend=type(backend).__name__):
+                for number in range(10):
+                    backend.set(f'timeline:{number}', number)
+                backend.get('timeline:9')
+                evictions = backend.read_evictions()
+                self.assertGreater(evictions, 0)
+                by_prefix = backend.read_stats()['timeline']['evictions']
+                self.assertEqual(by_prefix, evictions if prefix else None)
+                backend.reset_stats()
+                backend.clear()
+
+    def test_stats_survive_clear(self):
+        for backend in (self.file_cache, self.memory_cache):
+            with self.subTest(backend=type(backend).__name__):
+                backend.get('timeline:1')
+                backend.flush_stats()
+                backend.clear()
+                self.assertEqual(
+                    backend.read_stats()['timeline']['misses'], 1)
+
+    def test_file_cache_is_shared_between_instances(self):
+        other_process_cache = StatsFileBasedCache(self.cache_dir, {})
+        self.file_cache.set('timeline:1', [1])
+        self.assertEqual(other_process_cache.get('timeline:1'), [1])
+        other_process_cache.flush_stats()
+        self.assertEqual(
+            self.file_cache.read_stats()['timeline']['hits'], 1)
+
+    def test_file_cache_add_is_atomic(self):
+        other_process_cache = StatsFileBasedCache(self.cache_dir, {})
+        # Второй процесс проверил ключ раньше, чем первый его записал.
+        with mock.patch.object(other_process_cache, 'has_key',
+                               return_value=False):
+            self.assertTrue(self.file_cache.add('timeline:1:lock', 1))
+            self.assertFalse(other_process_cache.add('timeline:1:lock', 2))
+        self.assertEqual(other_process_cache.get('timeline:1:lock'), 1)
+        self.file_cache.set('timeline:2:lock', 1, timeout=-1)
+        self.assertTrue(other_process_cache.add('timeline:2:lock', 2))
+        self.assertEqual(len(self.file_cache._list_cache_files()), 2)
+
+    def test_cache_stats_command(self):
+        out = StringIO()
+        call_command('cache_stats', stdout=out)
+        self.assertIn('hit rate', out.getvalue())
@@ -0,0 +1,133 @@
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import HttpResponseNotFound
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.conditional import conditional_page
+from posts.models import Comment, Follow, Group, Post, ThumbnailTask, User
+from posts.thumbnails import process_thumbnail_tasks
+
+
+# Пробы проверяются без кэша страниц: он отвечает анонимам сам.
+@override_settings(PAGE_CACHE_TIMEOUT=0)
+class ConditionalGetTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.post = Post.objects.create(
+            text='пост', author=cls.author, group=cls.group)
+        cls.urls = (
+            reverse('index'),
+            reverse('group_posts', args=(cls.group.slug,)),
+            reverse('profile', args=(cls.author.username,)),
+            reverse('post', args=(cls.author.username, cls.post.id)),
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def etags(self):
+        return [self.client.get(url)['ETag'] for url in self.urls]
+
+    def test_unchanged_pages_return_not_modified(self):
+        # Только запросы пробы: лента и последний комментарий, у профиля
+        # ещё статистика автора, у поста — одна проба.
+        probe_queries = (2, 2, 3, 1)
+        for url, queries in zip(ConditionalGetTests.urls, probe_queries):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertIn('no-cache', response['Cache-Control'])
+                self.assertIn('Last-Modified', response)
+                with self.assertNumQueries(queries):
+                    again = self.client.get(
+                        url, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(again.status_code, 304)
+                again = self.client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+                self.assertEqual(again.status_code, 304)
+
+    def test_content_changes_change_etags(self):
+        before = self.etags()
+        Comment.objects.create(
+            post=ConditionalGetTests.post, author=self.reader, text='ого')
+        after_comment = self.etags()
+        self.assertTrue(all(
+            old != new for old, new in zip(before, after_comment)))
+        post = Post.objects.get(id=ConditionalGetTests.post.id)
+        post.text = 'исправленный пост'
+        post.save()
+        after_edit = self.etags()
+        self.assertTrue(all(
+            old != new for old, new in zip(after_comment, after_edit)))
+
+    def test_new_and_deleted_posts_change_feed_etag(self):
+        url = reverse('index')
+        first = self.client.get(url)['ETag']
+        Post.objects.create(text='новый', author=self.author)
+        second = self.client.get(url)['ETag']
+        Post.objects.filter(id=ConditionalGetTests.post.id).delete()
+        third = self.client.get(url)['ETag']
+        self.assertEqual(len({first, second, third}), 3)
+
+    def test_deleting_older_post_changes_feed_etag(self):
+        older = Post.objects.create(
+            text='старый', author=self.author, group=self.group)
+        Post.objects.filter(id=older.id).update(
+            updated=timezone.now() - timezone.timedelta(days=1))
+        Post.objects.create(text='новый', author=self.author)
+        before = self.etags()[:3]
+        older.delete()
+        after = self.etags()[:3]
+        self.assertTrue(all(old != new for old, new in zip(before, after)))
+
+    def test_ready_thumbnail_changes_etags(self):
+        before = self.etags()
+        ThumbnailTask.objects.create(
+            post=ConditionalGetTests.post, image='posts/card.png')
+        with mock.patch('posts.thumbnails.generate_card_images'):
+            process_thumbnail_tasks()
+        after = self.etags()
+        self.assertTrue(all(old != new for old, new in zip(before, after)))
+
+    def test_etag_depends_on_page_and_user(self):
+        url = reverse('index')
+        anonymous = self.client.get(url)['ETag']
+        self.assertNotEqual(self.client.get(url, {'page': 2})['ETag'],
+                            anonymous)
+        self.client.force_login(ConditionalGetTests.reader)
+        response = self.client.get(url)
+        self.assertNotEqual(response['ETag'], anonymous)
+        self.assertNotIn('Last-Modified', response)
+        Follow.objects.create(user=ConditionalGetTests.reader,
+                              author=ConditionalGetTests.author)
+        self.assertNotEqual(self.client.get(url)['ETag'], response['ETag'])
+
+    def test_missing_post_is_not_found(self):
+        for url in (reverse('post', args=(self.author.username, 999)),
+                    reverse('group_posts', args=('missing',))):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 404)
+                self.assertNotIn('ETag', response)
+                self.assertNotIn('Last-Modified', response)
+
+    def test_error_responses_get_no_validators(self):
+        def probe(request):
+            return {'key': 1, 'modified': timezone.now(), 'versions': ()}
+
+        view = conditional_page(probe)(
+            lambda request: HttpResponseNotFound())
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        response = view(request)
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn('ETag', response)
+        self.assertNotIn('Last-Modified', response)
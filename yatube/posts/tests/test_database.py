@@ -0,0 +1,69 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.db import connection
+from django.test import SimpleTestCase
+
+from yatube.backends.sqlite3.base import DatabaseWrapper
+
+
+class DatabaseBackendTests(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def wrapper(self, **options):
+        wrapper = DatabaseWrapper({
+            **connection.settings_dict,
+            'NAME': os.path.join(self.directory, 'db.sqlite3'),
+            'PRAGMAS': settings.DATABASE_BACKENDS['sqlite']['PRAGMAS'],
+            **options,
+        }, alias='backend_test')
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def pragma(self, wrapper, name):
+        with wrapper.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_sqlite_pragmas_are_applied_on_connect(self):
+        wrapper = self.wrapper()
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'wal')
+        # synchronous: 1 — NORMAL.
+        self.assertEqual(self.pragma(wrapper, 'synchronous'), 1)
+        self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 5000)
+        self.assertEqual(self.pragma(wrapper, 'mmap_size'), 256 * 1024 * 1024)
+
+    def test_health_check_replaces_dead_connection(self):
+        wrapper = self.wrapper(CONN_MAX_AGE=60, CONN_HEALTH_CHECKS=True)
+        wrapper.ensure_connection()
+        first = wrapper.connection
+        # Начало следующего запроса к сайту.
+        wrapper.close_if_unusable_or_obsolete()
+        with mock.patch.object(wrapper, 'is_usable',
+                               return_value=False) as is_usable:
+            self.pragma(wrapper, 'user_version')
+            self.pragma(wrapper, 'user_version')
+        is_usable.assert_called_once_with()
+        self.assertIsNot(wrapper.connection, first)
+
+    def test_live_connection_is_reused(self):
+        wrapper = self.wrapper(CONN_MAX_AGE=60, CONN_HEALTH_CHECKS=True)
+        wrapper.ensure_connection()
+        first = wrapper.connection
+        wrapper.close_if_unusable_or_obsolete()
+        self.pragma(wrapper, 'user_version')
+        self.assertIs(wrapper.connection, first)
+
+    def test_health_checks_can_be_disabled(self):
+        wrapper = self.wrapper(CONN_MAX_AGE=60, CONN_HEALTH_CHECKS=False)
+        wrapper.ensure_connection()
+        wrapper.close_if_unusable_or_obsolete()
+        with mock.patch.object(wrapper, 'is_usable') as is_usable:
+            self.pragma(wrapper, 'user_version')
+        is_usable.assert_not_called()
@@ -0,0 +1,183 @@
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.test import (RequestFactory, SimpleTestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import resolve, reverse
+
+from posts.models import AuthorStats, Follow, Post, User
+from posts.stats import get_author_stats
+from posts.timelines import build_timeline
+from yatube.db_router import ReplicaMiddleware, ReplicaRouter, used_replica
+
+router = ReplicaRouter()
+
+
+@override_settings(DATABASE_REPLICAS=['replica1', 'replica2'])
+class ReplicaRouterTests(SimpleTestCase):
+    """Куда уходят чтения во время запроса; сами запросы к базе не нужны."""
+    databases = {'default'}
+
+    def request(self, url, method='get', write=False, atomic=False,
+                **extra):
+        request = getattr(RequestFactory(), method)(url, **extra)
+        request.resolver_match = resolve(request.path)
+        middleware = ReplicaMiddleware(None)
+
+        def view(request):
+            middleware.process_view(request, None, (), {})
+            if write:
+                router.db_for_write(Post)
+            if atomic:
+                with transaction.atomic():
+                    return HttpResponse(str(router.db_for_read(Post)))
+            return HttpResponse(str(router.db_for_read(Post)))
+
+        middleware.get_response = view
+        return middleware(request)
+
+    def test_read_views_read_from_replicas(self):
+        for url in (reverse('index'), reverse('profile', args=('leo',)),
+                    reverse('post', args=('leo', 1)),
+                    reverse('about:author')):
+            with self.subTest(url=url):
+                response = self.request(url)
+                self.assertIn(response.content, (b'replica1', b'replica2'))
+                self.assertNotIn(settings.REPLICA_STICKY_COOKIE,
+                                 response.cookies)
+
+    def test_other_views_and_methods_use_primary(self):
+        self.assertEqual(self.request(reverse('new_post')).content, b'None')
+        self.assertEqual(
+            self.request(reverse('index'), method='post').content, b'None')
+
+    def test_reads_after_write_stick_to_primary(self):
+        response = self.request(reverse('add_comment', args=('leo', 1)),
+                                method='post', write=True)
+        cookie = response.cookies[settings.REPLICA_STICKY_COOKIE]
+        self.assertEqual(cookie['max-age'], settings.REPLICA_STICKY_SECONDS)
+        sticky = self.request(
+            reverse('post', args=('leo', 1)),
+            HTTP_COOKIE=f'{settings.REPLICA_STICKY_COOKIE}=1')
+        self.assertEqual(sticky.content, b'None')
+
+    def test_write_switches_rest_of_request_to_primary(self):
+        response = self.request(reverse('index'), write=True)
+        self.assertEqual(response.content, b'None')
+        self.assertIn(settings.REPLICA_STICKY_COOKIE, response.cookies)
+
+    def test_reads_inside_transaction_use_primary(self):
+        self.assertEqual(
+            self.request(reverse('index'), atomic=True).content, b'None')
+
+    def test_reads_outside_requests_use_primary(self):
+        self.assertIsNone(router.db_for_read(Post))
+        self.assertEqual(router.db_for_write(Post), 'default')
+
+    def test_objects_from_other_databases_are_written_in_place(self):
+        post = Post()
+        post._state.db = 'replica1'
+        self.assertEqual(router.db_for_write(Post, instance=post), 'default')
+        post._state.db = 'archive'
+        self.assertEqual(router.db_for_write(Post, instance=post), 'archive')
+
+    def test_replicas_are_not_migrated(self):
+        self.assertFalse(router.allow_migrate('replica1', 'posts'))
+        self.assertIsNone(router.allow_migrate('default', 'posts'))
+
+
+@override_settings(REPLICA_LAG_SECONDS=60)
+class ReplicaLagTests(TransactionTestCase):
+    """
+    Реплика ещё не получила запись. Её изображает основная база, в которой
+    запись откатывают update() мимо сигналов: версии кэша уже сменились,
+    а чтение возвращает старые данные. TransactionTestCase — потому что
+    внутри транзакции чтения с реплик не идут.
+    """
+
+    def setUp(self):
+        # Не на весь класс: очистка базы после теста не трогает реплики.
+        replicas = override_settings(DATABASE_REPLICAS=['default'])
+        replicas.enable()
+        self.addCleanup(replicas.disable)
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.post = Post.objects.create(text='до записи', author=self.author)
+        self.urls = (reverse('index'),
+                     reverse('post', args=('author', self.post.id)))
+
+    def set_text(self, text):
+        Post.objects.filter(pk=self.post.pk).update(text=text)
+
+    def edit_with_lagging_replica(self):
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'после записи'
+        post.save()
+        self.set_text('до записи')
+
+    def test_lagging_replica_does_not_fill_caches(self):
+        for url in self.urls:
+            self.client.get(url)
+        self.edit_with_lagging_replica()
+        reader = self.client_class()
+        reader.force_login(self.reader)
+        for client in (self.client, reader):
+            for url in self.urls:
+                response = client.get(url)
+                self.assertContains(response, 'до записи')
+                self.assertNotIn('ETag', response)
+        self.set_text('после записи')
+        for client in (self.client, reader):
+            for url in self.urls:
+                with self.subTest(url=url, client=client):
+                    response = client.get(url)
+                    self.assertContains(response, 'после записи')
+
+    @override_settings(REPLICA_LAG_SECONDS=0)
+    def test_replica_reads_are_cached_after_lag(self):
+        url = self.urls[0]
+        self.edit_with_lagging_replica()
+        self.set_text('после записи')
+        self.assertIn('ETag', self.client.get(url))
+        # Страница сохранена в кэше: обновление мимо сигналов не видно.
+        self.set_text('без сигналов')
+        self.assertContains(self.client.get(url), 'после записи')
+
+    def test_timeline_is_rebuilt_from_primary(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        request = RequestFactory().get(reverse('follow_index'))
+        request.resolver_match = resolve(request.path)
+        middleware = ReplicaMiddleware(None)
+
+        def view(request):
+            middleware.process_view(request, None, (), {})
+            timeline = build_timeline(self.reader.pk)
+            return HttpResponse(f'{len(timeline)} {used_replica()}')
+
+        middleware.get_response = view
+        self.assertEqual(middleware(request).content, b'1 False')
+
+    def test_missing_author_stats_are_counted_on_primary(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        AuthorStats.objects.filter(author=self.author).delete()
+        author = User.objects.get(pk=self.author.pk)
+        request = RequestFactory().get(reverse('profile', args=('author',)))
+        request.resolver_match = resolve(request.path)
+        middleware = ReplicaMiddleware(None)
+
+        def view(request):
+            middleware.process_view(request, None, (), {})
+            stats = get_author_stats(author)
+            return HttpResponse(f'{stats.followers_count} {stats.posts_count}')
+
+        middleware.get_response = view
+        with mock.patch.object(ReplicaRouter, 'db_for_read', autospec=True,
+                               side_effect=ReplicaRouter.db_for_read) as read:
+            self.assertEqual(middleware(request).content, b'1 1')
+        # С реплики читается только сама строка статистики.
+        self.assertEqual({call.args[1] for call in read.call_args_list},
+                         {AuthorStats})
@@ -0,0 +1,102 @@
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from posts.explain import FULL_SCAN, TEMP_SORT, audit_views, plan_problems
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class PlanProblemsTests(TestCase):
+
+    def test_sqlite_plans(self):
+        self.assertEqual(plan_problems([
+            'SEARCH posts_post USING INDEX posts_post_author_id (author_id=?)',
+            'USE TEMP B-TREE FOR ORDER BY',
+        ], vendor='sqlite'), [TEMP_SORT])
+        self.assertEqual(
+            plan_problems(['SCAN posts_post'], 'SELECT * FROM posts_post '
+                          'WHERE text LIKE %s LIMIT 1', vendor='sqlite'),
+            [FULL_SCAN])
+        self.assertEqual(plan_problems([
+            'SCAN posts_post USING INDEX posts_post_pub_date',
+            'SEARCH auth_user USING INTEGER PRIMARY KEY (rowid=?)',
+        ], vendor='sqlite'), [])
+
+    def test_ordered_scan_with_limit_is_not_flagged(self):
+        self.assertEqual(plan_problems(
+            ['SCAN posts_comment'],
+            'SELECT id FROM posts_comment ORDER BY id DESC LIMIT 1',
+            vendor='sqlite'), [])
+
+    def test_postgresql_plans(self):
+        self.assertEqual(plan_problems([
+            'Limit  (cost=10.1..10.2 rows=11 width=64)',
+            '  ->  Sort  (cost=10.1..10.5 rows=200 width=64)',
+            '        Sort Key: pub_date DESC, id DESC',
+            '        ->  Seq Scan on posts_post  (cost=0.0..8.0 rows=200)',
+        ], vendor='postgresql'), [TEMP_SORT, FULL_SCAN])
+
+
+class ExplainViewsTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        author = User.objects.create_user(username='author')
+        reader = User.objects.create_user(username='reader')
+        group = Group.objects.create(title='Группа', slug='group')
+        posts = Post.objects.bulk_create(
+            Post(text=f'пост {number}', author=author,
+                 group=group if number % 2 else None)
+            for number in range(30)
+        )
+        post = Post.objects.latest('id')
+        Comment.objects.bulk_create(
+            Comment(post=post, author=reader, text='комментарий')
+            for _ in posts
+        )
+        Follow.objects.create(user=reader, author=author)
+
+    def test_author_and_group_feeds_use_indexes(self):
+        indexes = {'profile': 'post_author_pub_date_idx',
+                   'group_posts': 'post_group_pub_date_idx'}
+        results = audit_views(tuple(indexes), samples=2)
+        feeds = [result for result in results
+                 if '"posts_post"."text"' in result['sql']]
+        self.assertEqual({result['view'] for result in feeds}, set(indexes))
+        for result in feeds:
+            with self.subTest(view=result['view']):
+                self.assertEqual(result['problems'], [])
+                self.assertIn(indexes[result['view']], str(result['plan']))
+
+    def test_comments_use_index(self):
+        results = audit_views(('post',), samples=5)
+        comments = [result for result in results
+                    if 'FROM "posts_comment"' in result['sql']]
+        self.assertTrue(comments)
+        for result in comments:
+            self.assertEqual(result['problems'], [])
+
+    def test_post_probe_does_not_sort(self):
+        results = audit_views(('post',), samples=5)
+        probes = [result for result in results
+                  if 'MAX("posts_comment"."created")' in result['sql']]
+        self.assertTrue(probes)
+        for result in probes:
+            with self.subTest(url=result['url']):
+                self.assertNotIn('ORDER BY', result['sql'])
+                self.assertEqual(result['problems'], [])
+
+    def test_command_reports_flagged_queries(self):
+        out = StringIO()
+        call_command('explain_views', '--all', stdout=out)
+        self.assertIn('Запросов:', out.getvalue())
+        self.assertIn('index /: ok', out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('explain_views', '--views', 'missing')
+
+    def test_empty_database_is_refused(self):
+        Post.objects.all().delete()
+        with self.assertRaises(CommandError):
+            call_command('explain_views', stdout=StringIO())
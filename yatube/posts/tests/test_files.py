@@ -0,0 +1,136 @@
+import gzip
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.http import Http404
+from django.template import Context, Template
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.views.static import serve
+
+from yatube.files import file_urlpatterns, serve_media, serve_static
+
+TEMP_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SOURCE_DIR = os.path.join(TEMP_ROOT, 'source')
+STATIC_ROOT = os.path.join(TEMP_ROOT, 'static')
+MEDIA_ROOT = os.path.join(TEMP_ROOT, 'media')
+CSS = b'body { color: black; }\n' * 200
+
+
+@override_settings(
+    STATICFILES_DIRS=[SOURCE_DIR], STATIC_ROOT=STATIC_ROOT,
+    MEDIA_ROOT=MEDIA_ROOT, FILE_SERVING='x-accel-redirect',
+    STATICFILES_STORAGE='yatube.storage.CompressedManifestStaticFilesStorage',
+)
+class FileServingTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        os.makedirs(os.path.join(SOURCE_DIR, 'css'))
+        with open(os.path.join(SOURCE_DIR, 'css', 'site.css'), 'wb') as file:
+            file.write(CSS)
+        os.makedirs(os.path.join(MEDIA_ROOT, 'posts'))
+        with open(os.path.join(MEDIA_ROOT, 'posts', 'кот.jpg'), 'wb') as file:
+            file.write(b'jpeg')
+        call_command('collectstatic', interactive=False, stdout=StringIO())
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.hashed = staticfiles_storage.stored_name('css/site.css')
+
+    def test_collectstatic_writes_smaller_gzip_copies(self):
+        self.assertNotEqual(self.hashed, 'css/site.css')
+        with open(os.path.join(STATIC_ROOT, self.hashed + '.gz'),
+                  'rb') as file:
+            compressed = file.read()
+        self.assertLess(len(compressed), len(CSS))
+        self.assertEqual(gzip.decompress(compressed), CSS)
+
+    def test_hashed_files_are_offloaded_and_immutable(self):
+        response = serve_static(self.factory.get('/'), self.hashed)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['X-Accel-Redirect'],
+                         '/protected/static/' + self.hashed)
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn(f'max-age={settings.STATIC_CACHE_SECONDS}',
+                      response['Cache-Control'])
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_unhashed_names_are_cached_briefly(self):
+        response = serve_static(self.factory.get('/'), 'css/site.css')
+        self.assertNotIn('immutable', response['Cache-Control'])
+        self.assertIn(f'max-age={settings.STATIC_UNHASHED_CACHE_SECONDS}',
+                      response['Cache-Control'])
+
+    def test_precompressed_copy_is_chosen_by_accept_encoding(self):
+        response = serve_static(
+            self.factory.get('/', HTTP_ACCEPT_ENCODING='gzip, deflate'),
+            self.hashed)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(response['X-Accel-Redirect'],
+                         f'/protected/static/{self.hashed}.gz')
+
+    @override_settings(FILE_SERVING='x-sendfile')
+    def test_x_sendfile_gets_absolute_path(self):
+        response = serve_media(self.factory.get('/'), 'posts/кот.jpg')
+        path = os.path.join(os.path.abspath(MEDIA_ROOT), 'posts', 'кот.jpg')
+        self.assertIn(b'X-Sendfile: ' + path.encode(),
+                      response.serialize_headers().split(b'\r\n'))
+        self.assertFalse(response.has_header('Vary'))
+
+    def test_media_location_is_quoted(self):
+        response = serve_media(self.factory.get('/'), 'posts/кот.jpg')
+        self.assertEqual(response['X-Accel-Redirect'],
+                         '/protected/media/posts/%D0%BA%D0%BE%D1%82.jpg')
+        self.assertIn(f'max-age={settings.MEDIA_CACHE_SECONDS}',
+                      response['Cache-Control'])
+
+    def test_unchanged_file_answers_304(self):
+        response = serve_static(self.factory.get('/'), self.hashed)
+        not_modified = serve_static(
+            self.factory.get(
+                '/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified']),
+            self.hashed)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertFalse(not_modified.has_header('X-Accel-Redirect'))
+
+    def test_missing_and_outside_paths_are_404(self):
+        for path in ('css/missing.css', '../media/posts/кот.jpg',
+                     '/etc/passwd', 'css'):
+            with self.subTest(path=path):
+                with self.assertRaises(Http404):
+                    serve_static(self.factory.get('/'), path)
+
+    def test_files_missing_from_manifest_keep_their_names(self):
+        rendered = Template(
+            '{% load static %}{% static "css/site.css" %} '
+            '{% static "vendor/lib.js" %}'
+        ).render(Context())
+        self.assertEqual(
+            rendered, f'/static/{self.hashed} /static/vendor/lib.js')
+
+    def test_urlpatterns_follow_mode(self):
+        self.assertEqual(
+            [pattern.callback for pattern in file_urlpatterns()],
+            [serve_media, serve_static])
+        with self.settings(FILE_SERVING='django'):
+            self.assertEqual(
+                [pattern.callback for pattern in file_urlpatterns()],
+                [serve, serve])
+        with self.settings(FILE_SERVING='nginx'):
+            with self.assertRaises(ImproperlyConfigured):
+                file_urlpatterns()
@@ -1,17 +1,21 @@
 import shutil
 import tempfile
+from io import BytesIO
 
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template.defaultfilters import filesizeformat
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
+from posts.images import convert_mode
 from posts.models import Comment, Group, Post, User
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 
-@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, QUERY_BUDGET_STRICT=True)
 class PostFormTests(TestCase):
 
     @classmethod
@@ -64,6 +68,57 @@ class PostFormTests(TestCase):
         self.assertEqual(post.author, PostFormTests.user)
         self.assertEqual(post.image, f'posts/{image}')
 
+    def post_image(self, name, size, image_format, mode='RGB'):
+        content = BytesIO()
+        Image.new(mode, size).save(content, image_format)
+        uploaded = SimpleUploadedFile(name, content.getvalue())
+        return self.authorized_client.post(
+            reverse('new_post'), {'text': 'Картинка', 'image': uploaded}
+        )
+
+    def test_large_image_is_downscaled_and_reencoded(self):
+        with self.settings(POST_IMAGE_MAX_SIDE=100):
+            self.post_image('big.bmp', (400, 300), 'BMP')
+        post = Post.objects.get()
+        self.assertEqual(post.image.name, 'posts/big.png')
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.size, (100, 75))
+            self.assertEqual(image.format, 'PNG')
+
+    def test_images_in_other_modes_are_converted_to_png(self):
+        for mode in ('CMYK', 'F'):
+            with self.subTest(mode=mode):
+                response = self.post_image(
+                    f'{mode}.tiff', (40, 30), 'TIFF', mode)
+                self.assertRedirects(response, reverse('index'))
+                post = Post.objects.first()
+                self.assertEqual(post.image.name, f'posts/{mode}.png')
+                with Image.open(post.image.path) as image:
+                    self.assertEqual(image.format, 'PNG')
+                    self.assertEqual(image.mode, 'RGB')
+        # Прозрачность сохраняется везде, кроме JPEG.
+        premultiplied = Image.new('RGBa', (2, 2))
+        self.assertEqual(convert_mode(premultiplied, 'PNG').mode, 'RGBA')
+        self.assertEqual(convert_mode(premultiplied, 'JPEG').mode, 'RGB')
+
+    def test_image_over_byte_limit_is_rejected(self):
+        with self.settings(POST_IMAGE_MAX_UPLOAD_SIZE=1024):
+            response = self.post_image('heavy.bmp', (100, 100), 'BMP')
+        self.assertFormError(
+            response, 'form', 'image',
+            f'Файл слишком большой: не больше {filesizeformat(1024)}.'
+        )
+        self.assertFalse(Post.objects.exists())
+
+    def test_image_over_pixel_limit_is_rejected(self):
+        with self.settings(POST_IMAGE_MAX_PIXELS=10 * 1000):
+            response = self.post_image('wide.jpg', (200, 100), 'JPEG')
+        self.assertFormError(
+            response, 'form', 'image',
+            'Изображение слишком большое: не больше 10000 пикселей.'
+        )
+        self.assertFalse(Post.objects.exists())
+
     def test_post_edit_form_updates_post(self):
         post = Post.objects.create(
             text='тест текст',
@@ -1,6 +1,12 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
 from django.test import TestCase
+from django.urls import reverse
 
-from posts.models import Group, Post, User
+from posts.models import AuthorStats, Comment, Follow, Group, Post, User
 
 
 class PostModelTest(TestCase):
@@ -22,3 +28,106 @@ class PostModelTest(TestCase):
         for objects, expected_str in objects_str_method.items():
             with self.subTest(objects=objects):
                 self.assertEqual(str(objects), expected_str)
+
+
+class CommentCountTest(TestCase):
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.post = Post.objects.create(text='пост', author=self.author)
+
+    def add_comments(self, author, number):
+        for _ in range(number):
+            Comment.objects.create(post=self.post, author=author, text='к')
+
+    def get_count(self):
+        return Post.objects.get(pk=self.post.pk).comment_count
+
+    def test_comment_count_follows_create_and_delete(self):
+        self.add_comments(self.reader, 3)
+        self.assertEqual(self.get_count(), 3)
+        Comment.objects.first().delete()
+        self.assertEqual(self.get_count(), 2)
+
+    def test_comment_count_follows_cascade_delete(self):
+        self.add_comments(self.reader, 2)
+        self.add_comments(self.author, 1)
+        self.reader.delete()
+        self.assertEqual(self.get_count(), 1)
+
+    def test_saving_stale_post_keeps_comment_count(self):
+        stale_post = Post.objects.get(pk=self.post.pk)
+        self.add_comments(self.reader, 2)
+        stale_post.text = 'новый текст'
+        stale_post.save()
+        self.assertEqual(self.get_count(), 2)
+
+    def test_rebuild_comment_counts_command(self):
+        self.add_comments(self.reader, 2)
+        Post.objects.update(comment_count=0)
+        call_command('rebuild_comment_counts', stdout=StringIO())
+        self.assertEqual(self.get_count(), 2)
+
+
+class AuthorStatsTest(TestCase):
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+
+    def get_stats(self, user):
+        return AuthorStats.objects.get(author=user)
+
+    def test_stats_follow_posts_and_subscriptions(self):
+        post = Post.objects.create(text='пост', author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author)
+        author_stats = self.get_stats(self.author)
+        reader_stats = self.get_stats(self.reader)
+        self.assertEqual(author_stats.posts_count, 1)
+        self.assertEqual(author_stats.followers_count, 1)
+        self.assertEqual(reader_stats.following_count, 1)
+        post.delete()
+        Follow.objects.filter(user=self.reader, author=self.author).delete()
+        author_stats = self.get_stats(self.author)
+        self.assertEqual(author_stats.posts_count, 0)
+        self.assertEqual(author_stats.followers_count, 0)
+        self.assertEqual(self.get_stats(self.reader).following_count, 0)
+
+    def test_rebuild_author_stats_command(self):
+        Post.objects.bulk_create(
+            [Post(text='пост', author=self.author) for _ in range(3)])
+        Follow.objects.create(user=self.reader, author=self.author)
+        AuthorStats.objects.all().delete()
+        call_command('rebuild_author_stats', stdout=StringIO())
+        author_stats = self.get_stats(self.author)
+        self.assertEqual(author_stats.posts_count, 3)
+        self.assertEqual(author_stats.followers_count, 1)
+        self.assertEqual(self.get_stats(self.reader).following_count, 1)
+
+    def test_missing_stats_are_counted_on_profile(self):
+        User.objects.bulk_create([User(username='imported')])
+        imported = User.objects.get(username='imported')
+        Post.objects.create(text='пост', author=imported)
+        Follow.objects.create(user=self.reader, author=imported)
+        Follow.objects.create(user=imported, author=self.author)
+        self.assertFalse(AuthorStats.objects.filter(author=imported).exists())
+        cache.clear()
+        response = self.client.get(
+            reverse('profile', kwargs={'username': 'imported'}))
+        self.assertContains(response, 'Подписчиков: 1')
+        self.assertContains(response, 'Подписан: 1')
+        self.assertContains(response, 'Количество записей:1')
+        self.assertEqual(self.get_stats(imported).posts_count, 1)
+
+
+class FollowModelTest(TestCase):
+
+    def test_follow_pair_is_unique(self):
+        author = User.objects.create_user(username='author')
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=author)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Follow.objects.create(user=reader, author=author)
+        Follow.objects.create(user=author, author=reader)
+        self.assertEqual(Follow.objects.count(), 2)
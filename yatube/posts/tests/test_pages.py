@@ -0,0 +1,151 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class PageCacheTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.other_group = Group.objects.create(title='Другая', slug='other')
+        cls.post = Post.objects.create(
+            text='авторский пост', author=cls.author, group=cls.group)
+        cls.other_post = Post.objects.create(
+            text='чужой пост', author=cls.other, group=cls.other_group)
+
+    def setUp(self):
+        cache.clear()
+        self.index = reverse('index')
+        self.group_page = reverse('group_posts', args=('group',))
+        self.other_group_page = reverse('group_posts', args=('other',))
+        self.profile = reverse('profile', args=('author',))
+        self.other_profile = reverse('profile', args=('other',))
+        self.post_page = reverse('post', args=('author', self.post.id))
+        self.other_post_page = reverse(
+            'post', args=('other', self.other_post.id))
+        self.urls = (
+            self.index, self.group_page, self.other_group_page, self.profile,
+            self.other_profile, self.post_page, self.other_post_page,
+        )
+        for url in self.urls:
+            self.client.get(url)
+
+    def cached(self, url):
+        with CaptureQueriesContext(connection) as captured:
+            self.client.get(url)
+        return not captured
+
+    def assertStale(self, *urls):
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertFalse(self.cached(url))
+
+    def assertFresh(self, *urls):
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertTrue(self.cached(url))
+
+    def test_anonymous_pages_are_served_from_cache(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                first = self.client.get(url)
+                with self.assertNumQueries(0):
+                    again = self.client.get(url)
+                self.assertEqual(again.content, first.content)
+                with self.assertNumQueries(0):
+                    not_modified = self.client.get(
+                        url, HTTP_IF_NONE_MATCH=first['ETag'])
+                self.assertEqual(not_modified.status_code, 304)
+
+    def test_query_string_is_part_of_key(self):
+        self.assertFalse(self.cached(self.index + '?page=2'))
+        self.assertTrue(self.cached(self.index + '?page=2'))
+        Post.objects.create(text='новый', author=self.other)
+        self.assertStale(self.index, self.index + '?page=2')
+
+    def test_authenticated_users_bypass_cache(self):
+        self.client.force_login(self.author)
+        self.assertFalse(self.cached(self.post_page))
+        response = self.client.get(self.post_page)
+        self.assertContains(response, 'Редактировать')
+        self.client.logout()
+        self.assertNotContains(self.client.get(self.post_page),
+                               'Редактировать')
+
+    def test_comment_invalidates_pages_with_post(self):
+        Comment.objects.create(post=self.post, author=self.other, text='ого')
+        self.assertFresh(self.other_group_page, self.other_profile,
+                         self.other_post_page)
+        self.assertContains(self.client.get(self.post_page), 'ого')
+        self.assertStale(self.index, self.group_page, self.profile)
+
+    def test_moved_post_invalidates_both_groups(self):
+        self.post.group = self.other_group
+        self.post.save()
+        self.assertFresh(self.other_profile, self.other_post_page)
+        self.assertNotContains(self.client.get(self.group_page),
+                               'авторский пост')
+        self.assertContains(self.client.get(self.other_group_page),
+                            'авторский пост')
+        self.assertStale(self.index, self.profile, self.post_page)
+
+    def test_deleted_post_disappears(self):
+        Post.objects.filter(id=self.other_post.id).delete()
+        self.assertFresh(self.group_page, self.profile, self.post_page)
+        self.assertEqual(
+            self.client.get(self.other_post_page).status_code, 404)
+        self.assertNotContains(self.client.get(self.index), 'чужой пост')
+        self.assertStale(self.other_group_page, self.other_profile)
+
+    def test_renamed_group_invalidates_its_posts(self):
+        self.group.title = 'Новое название'
+        self.group.slug = 'renamed'
+        self.group.save()
+        self.assertFresh(self.other_group_page, self.other_profile,
+                         self.other_post_page)
+        self.assertEqual(self.client.get(self.group_page).status_code, 404)
+        self.assertStale(self.index, self.profile, self.post_page)
+
+    def test_renamed_group_shows_new_title(self):
+        group = Group.objects.get(slug='group')
+        group.title = 'Новое название'
+        group.save()
+        for url in (self.index, self.group_page, self.profile,
+                    self.post_page):
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), '#Новое название')
+
+    def test_renamed_author_invalidates_pages_with_posts(self):
+        author = User.objects.get(username='author')
+        author.username = 'renamed'
+        author.save()
+        self.assertFresh(self.other_group_page, self.other_profile,
+                         self.other_post_page)
+        new_profile = reverse('profile', args=('renamed',))
+        for url in (self.index, self.group_page, new_profile):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, '@renamed')
+                self.assertContains(response, new_profile)
+
+    def test_follow_invalidates_both_profiles(self):
+        Follow.objects.create(user=self.other, author=self.author)
+        self.assertFresh(self.index, self.group_page, self.other_group_page)
+        self.assertStale(self.profile, self.other_profile, self.post_page,
+                         self.other_post_page)
+
+    def test_new_user_profile_is_not_stale(self):
+        User.objects.filter(username='author').delete()
+        self.assertEqual(self.client.get(self.profile).status_code, 404)
+        User.objects.create_user(username='author')
+        response = self.client.get(self.profile)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'авторский пост')
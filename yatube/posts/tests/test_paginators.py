@@ -0,0 +1,86 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post, User
+from posts.paginators import CursorPage, CursorPaginator
+
+
+class CursorPaginatorTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='testuser')
+        Post.objects.bulk_create([
+            Post(text=f'пост {number}', author=cls.user)
+            for number in range(settings.POSTS_PER_PAGE * 2 + 3)
+        ])
+        cls.ordered_ids = list(
+            Post.objects.order_by('-pub_date', '-id').values_list(
+                'id', flat=True)
+        )
+
+    def setUp(self):
+        # bulk_create не шлёт сигналов, сбрасывающих кэш страниц.
+        cache.clear()
+
+    def get_paginator(self):
+        return CursorPaginator(Post.objects.all(), settings.POSTS_PER_PAGE)
+
+    def test_pages_follow_each_other_without_gaps(self):
+        paginator = self.get_paginator()
+        page = paginator.get_page(None)
+        seen = [post.id for post in page]
+        while page.has_next():
+            page = paginator.get_page(page.next_cursor)
+            seen.extend(post.id for post in page)
+        self.assertEqual(seen, CursorPaginatorTests.ordered_ids)
+        self.assertFalse(page.has_next())
+        self.assertTrue(page.has_previous())
+
+    def test_previous_cursor_returns_previous_page(self):
+        paginator = self.get_paginator()
+        first = paginator.get_page(None)
+        second = paginator.get_page(first.next_cursor)
+        third = paginator.get_page(second.next_cursor)
+        back = paginator.get_page(third.previous_cursor)
+        self.assertEqual(list(back), list(second))
+        self.assertTrue(back.has_next())
+        self.assertTrue(back.has_previous())
+        start = paginator.get_page(second.previous_cursor)
+        self.assertEqual(list(start), list(first))
+        self.assertFalse(start.has_previous())
+
+    def test_invalid_cursor_returns_first_page(self):
+        paginator = self.get_paginator()
+        for cursor in ('', 'мусор', '!!!', 'bnwxfDE='):
+            with self.subTest(cursor=cursor):
+                page = paginator.get_page(cursor)
+                self.assertEqual(
+                    [post.id for post in page],
+                    CursorPaginatorTests.ordered_ids[:settings.POSTS_PER_PAGE]
+                )
+
+    def test_page_is_fetched_without_count_query(self):
+        paginator = self.get_paginator()
+        first = paginator.get_page(None)
+        with self.assertNumQueries(1):
+            list(paginator.get_page(first.next_cursor))
+
+    def test_index_uses_cursor_page(self):
+        response = self.client.get(reverse('index'))
+        self.assertIsInstance(response.context['page'], CursorPage)
+
+    @override_settings(POSTS_PAGINATION='numbered')
+    def test_numbered_mode_is_available(self):
+        response = self.client.get(reverse('index'), {'page': 2})
+        page = response.context['page']
+        self.assertNotIsInstance(page, CursorPage)
+        self.assertEqual(page.number, 2)
+
+    def test_numbered_views_keep_numbered_pages(self):
+        self.client.force_login(CursorPaginatorTests.user)
+        response = self.client.get(reverse('follow_index'))
+        self.assertNotIsInstance(response.context['page'], CursorPage)
@@ -0,0 +1,82 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+
+@override_settings(FOLLOW_TIMELINES=False)
+class ViewQueryCountTests(TestCase):
+    """
+    Число запросов каждой страницы не зависит от количества постов,
+    авторов, групп и комментариев на ней. В ленты и страницу поста
+    входят запросы пробы свежести для ETag.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.post = Post.objects.create(
+            text='пост', author=cls.author, group=cls.group)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(ViewQueryCountTests.reader)
+
+    def add_content(self, number):
+        for index in range(number):
+            author = User.objects.create_user(f'author{number}_{index}')
+            group = Group.objects.create(
+                title=f'группа {index}', slug=f'group{number}_{index}')
+            Follow.objects.create(user=self.reader, author=author)
+            for text in ('первый', 'второй'):
+                post = Post.objects.create(
+                    text=f'{text} пост', author=author, group=group)
+                Post.objects.create(
+                    text=f'{text} пост', author=self.author, group=self.group)
+                Comment.objects.create(
+                    post=self.post, author=author, text='комментарий')
+                Comment.objects.create(
+                    post=post, author=self.reader, text='комментарий')
+
+    def count_queries(self, url, params=None):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_views_have_constant_query_count(self):
+        post = ViewQueryCountTests.post
+        urls = {
+            'index': (reverse('index'), None, 7),
+            'group_posts': (
+                reverse('group_posts', args=(self.group.slug,)), None, 8),
+            'profile': (
+                reverse('profile', args=(self.author.username,)), None, 9),
+            'post': (
+                reverse('post', args=(self.author.username, post.id)),
+                None, 6),
+            'post_comments': (
+                reverse('post_comments', args=(
+                    self.author.username, post.id)), None, 2),
+            'follow_index': (reverse('follow_index'), None, 5),
+            'search': (reverse('search'), {'q': 'пост'}, 6),
+        }
+        self.add_content(2)
+        before = {
+            name: self.count_queries(url, params)
+            for name, (url, params, _) in urls.items()
+        }
+        self.add_content(6)
+        for name, (url, params, budget) in urls.items():
+            with self.subTest(view=name):
+                after = self.count_queries(url, params)
+                self.assertEqual(after, before[name])
+                self.assertEqual(after, budget)
@@ -0,0 +1,73 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post, User
+from yatube.query_budget import (QueryBudgetExceeded, QueryRecorder,
+                                 fingerprint, query_stats)
+
+
+@override_settings(QUERY_STATS_FLUSH_EVERY=1)
+class QueryBudgetTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        Post.objects.create(text='пост', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        query_stats.reset()
+
+    def test_recorder_finds_duplicate_queries(self):
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            for user_id in (1, 2, 3):
+                list(User.objects.filter(id=user_id))
+            list(User.objects.filter(id__in=[1, 2]))
+            list(User.objects.filter(id__in=[1, 2, 3]))
+        self.assertEqual(recorder.count, 5)
+        self.assertEqual(sorted(recorder.duplicates.values()), [2, 3])
+
+    def test_fingerprint_ignores_in_list_length(self):
+        self.assertEqual(
+            fingerprint('SELECT 1 WHERE id IN (%s, %s, %s)'),
+            fingerprint('SELECT 1\n  WHERE id IN (%s, %s)')
+        )
+
+    @override_settings(QUERY_BUDGETS={'index': 0})
+    def test_over_budget_request_is_logged(self):
+        with self.assertLogs('yatube.query_budget', 'WARNING') as logs:
+            self.client.get(reverse('index'))
+        self.assertIn('index (/)', logs.output[0])
+        self.assertIn('при бюджете 0', logs.output[0])
+
+    @override_settings(QUERY_BUDGETS={'index': 0}, QUERY_BUDGET_STRICT=True)
+    def test_over_budget_request_fails_in_strict_mode(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get(reverse('index'))
+
+    def test_pages_fit_their_budgets(self):
+        with self.settings(QUERY_BUDGET_STRICT=True):
+            self.client.get(reverse('index'))
+            self.client.get(reverse('profile', args=('author',)))
+
+    def test_stats_are_aggregated_per_url_name(self):
+        self.client.get(reverse('index'))
+        self.client.get(reverse('index'))
+        self.client.get(reverse('profile', args=('author',)))
+        stats = query_stats.read()
+        self.assertEqual(stats['index']['requests'], 2)
+        self.assertEqual(stats['profile']['requests'], 1)
+        self.assertGreater(stats['index']['queries'], 0)
+        self.assertEqual(stats['index']['over_budget'], 0)
+        out = StringIO()
+        call_command('query_stats', stdout=out)
+        self.assertIn('index', out.getvalue())
+        call_command('query_stats', '--reset', stdout=StringIO())
+        self.assertEqual(query_stats.read(), {})
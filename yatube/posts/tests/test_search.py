@@ -0,0 +1,90 @@
+from django.contrib.auth.models import User as AdminUser
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import Group, Post, User
+
+
+class SearchTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='садовник')
+        cls.group = Group.objects.create(
+            title='Огородники', slug='garden', description='Грядки')
+        cls.tomatoes = Post.objects.create(
+            text='Помидоры созрели, помидоры краснеют на солнце',
+            author=cls.user, group=cls.group)
+        cls.cucumbers = Post.objects.create(
+            text='Огурцы и помидоры', author=cls.user)
+        cls.other = Post.objects.create(
+            text='Про котиков', author=User.objects.create_user('кот'))
+
+    def search(self, query, **params):
+        response = self.client.get(reverse('search'), {'q': query, **params})
+        return [post.id for post in response.context['page']]
+
+    def test_finds_posts_by_text_group_and_author(self):
+        cases = (
+            ('помидоры', [SearchTests.tomatoes.id, SearchTests.cucumbers.id]),
+            ('ОГОРОДНИКИ', [SearchTests.tomatoes.id]),
+            ('садовник', [SearchTests.tomatoes.id, SearchTests.cucumbers.id]),
+            ('котик', [SearchTests.other.id]),
+            ('арбуз', []),
+            ('"*()', []),
+        )
+        for query, expected in cases:
+            with self.subTest(query=query):
+                self.assertCountEqual(self.search(query), expected)
+
+    def test_results_are_ranked(self):
+        self.assertEqual(
+            self.search('помидоры')[0], SearchTests.tomatoes.id)
+
+    def test_index_follows_post_changes(self):
+        post = Post.objects.create(text='Редкий кабачок', author=self.user)
+        self.assertEqual(self.search('кабачок'), [post.id])
+        post.text = 'Редкая тыква'
+        post.save()
+        self.assertEqual(self.search('кабачок'), [])
+        self.assertEqual(self.search('тыква'), [post.id])
+        post.delete()
+        self.assertEqual(self.search('тыква'), [])
+
+    def test_index_follows_group_and_author_renames(self):
+        group = Group.objects.create(title='Пасечники', slug='bees')
+        post = Post.objects.create(
+            text='Мёд', author=SearchTests.user, group=group)
+        group.title = 'Пчеловоды'
+        group.save()
+        self.assertEqual(self.search('пчеловоды'), [post.id])
+        group.delete()
+        self.assertEqual(self.search('пчеловоды'), [])
+        self.assertEqual(self.search('мёд'), [post.id])
+
+    def test_results_are_paginated(self):
+        Post.objects.bulk_create([
+            Post(text=f'Урожай {number}', author=SearchTests.user)
+            for number in range(15)
+        ])
+        for post in Post.objects.filter(text__startswith='Урожай'):
+            post.save()
+        response = self.client.get(reverse('search'), {'q': 'урожай'})
+        page = response.context['page']
+        self.assertEqual(page.paginator.count, 15)
+        self.assertEqual(len(page), 10)
+        self.assertContains(
+            response, '?q=%D1%83%D1%80%D0%BE%D0%B6%D0%B0%D0%B9&page=2')
+        self.assertEqual(len(self.search('урожай', page=2)), 5)
+
+    def test_admin_search_uses_index(self):
+        admin = AdminUser.objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'огородники'})
+        self.assertEqual(
+            list(response.context['cl'].result_list),
+            [SearchTests.tomatoes]
+        )
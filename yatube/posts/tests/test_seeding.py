@@ -0,0 +1,97 @@
+from datetime import datetime
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import Count, F
+from django.test import TestCase
+from django.utils import timezone
+
+from posts.models import Comment, Follow, Group, Post, User
+from posts.seeding import bulk_insert, seed_database
+
+UNTIL = timezone.make_aware(datetime(2021, 6, 1))
+
+
+class SeedTests(TestCase):
+
+    def seed(self, **options):
+        return seed_database(
+            users=40, groups=3, posts=400, comments=300, follows=200,
+            until=UNTIL, days=30, **options
+        )
+
+    def snapshot(self):
+        return list(Post.objects.order_by('id').values_list(
+            'text', 'author__username', 'group__slug', 'pub_date'))
+
+    def test_creates_requested_rows(self):
+        created = self.seed()
+        self.assertEqual(created['users'], 40)
+        self.assertEqual(User.objects.count(), 40)
+        self.assertEqual(Post.objects.count(), 400)
+        self.assertEqual(created['comments'], Comment.objects.count())
+        self.assertLessEqual(created['comments'], 300)
+        self.assertLessEqual(Follow.objects.count(), 200)
+        self.assertFalse(
+            Follow.objects.filter(user_id=F('author_id')).exists())
+
+    def test_bulk_insert_does_not_count_table(self):
+        author = User.objects.create_user(username='author')
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=author)
+        rows = [Follow(user=reader, author=author),
+                Follow(user=author, author=reader)]
+        with self.assertNumQueries(2):
+            self.assertEqual(bulk_insert(Follow, rows, batch_size=1,
+                                         ignore_conflicts=True), 2)
+        self.assertEqual(Follow.objects.count(), 2)
+
+    def test_dates_fall_into_the_requested_period(self):
+        self.seed()
+        first = Post.objects.earliest('pub_date').pub_date
+        last = Post.objects.latest('pub_date').pub_date
+        self.assertGreaterEqual(first, UNTIL - timezone.timedelta(days=30))
+        self.assertLessEqual(last, UNTIL)
+        late_comments = Comment.objects.filter(created__gt=UNTIL)
+        self.assertFalse(late_comments.exists())
+        self.assertTrue(Post._meta.get_field('pub_date').auto_now_add)
+
+    def test_popularity_is_skewed(self):
+        self.seed()
+        followers = sorted(
+            User.objects.annotate(total=Count('following')).values_list(
+                'total', flat=True),
+            reverse=True
+        )
+        self.assertGreater(followers[0], 4 * followers[len(followers) // 2])
+
+    def test_popular_authors_post_and_comment_more(self):
+        self.seed()
+        users = User.objects.annotate(
+            followers=Count('following', distinct=True),
+            posts_total=Count('posts', distinct=True),
+            comments_total=Count('comments', distinct=True),
+        )
+        ranked = list(users.order_by('-followers', 'pk'))
+        top, rest = ranked[:5], ranked[len(ranked) // 2:]
+        for field in ('posts_total', 'comments_total'):
+            with self.subTest(field=field):
+                top_total = sum(getattr(user, field) for user in top)
+                rest_total = sum(getattr(user, field) for user in rest)
+                self.assertGreater(top_total, rest_total)
+
+    def test_same_seed_gives_same_data(self):
+        self.seed(seed=7)
+        first = self.snapshot()
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        self.seed(seed=7)
+        self.assertEqual(self.snapshot(), first)
+
+    def test_command_seeds_and_rebuilds_counters(self):
+        out = StringIO()
+        call_command('seed', '--users=10', '--posts=50', '--comments=40',
+                     '--follows=20', '--seed=1', stdout=out)
+        self.assertIn('posts: 50', out.getvalue())
+        user = User.objects.annotate(total=Count('posts')).latest('total')
+        self.assertEqual(user.stats.posts_count, user.total)
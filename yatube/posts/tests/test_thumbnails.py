@@ -0,0 +1,146 @@
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Post, ThumbnailTask, User
+from posts.thumbnails import (CARD_GEOMETRY, CARD_OPTIONS, backend,
+                              derivative_variants, process_thumbnail_tasks)
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, QUERY_BUDGET_STRICT=True)
+class CardThumbnailTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='testuser')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+
+    def create_post(self, name):
+        return Post.objects.create(
+            text='пост с картинкой',
+            author=CardThumbnailTests.user,
+            image=SimpleUploadedFile(name, SMALL_GIF, 'image/gif')
+        )
+
+    def get_ready_thumbnail(self, post):
+        return backend.get_ready_thumbnail(
+            post.image.name, CARD_GEOMETRY, **CARD_OPTIONS)
+
+    def test_requests_never_generate_thumbnails(self):
+        with mock.patch('posts.thumbnails.generate_card_images') as generate:
+            post = self.create_post('queued.gif')
+            response = self.client.get(reverse('index'))
+        generate.assert_not_called()
+        self.assertContains(response, 'Изображение обрабатывается')
+        self.assertIsNone(self.get_ready_thumbnail(post))
+
+    def test_page_reads_thumbnails_in_one_query(self):
+        posts = [self.create_post(f'page{number}.gif') for number in range(3)]
+        process_thumbnail_tasks()
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('index'))
+        kvstore_queries = [
+            query for query in queries if 'thumbnail_kvstore' in query['sql']
+        ]
+        self.assertEqual(len(kvstore_queries), 1)
+        for post in posts:
+            self.assertContains(response, self.get_ready_thumbnail(post).url)
+
+    def test_feed_shows_placeholder_until_worker_makes_thumbnail(self):
+        post = self.create_post('queued.gif')
+        for _ in range(2):
+            response = self.client.get(reverse('index'))
+            self.assertContains(response, 'Изображение обрабатывается')
+        self.assertIsNone(self.get_ready_thumbnail(post))
+        self.assertQuerysetEqual(
+            ThumbnailTask.objects.values_list('image', flat=True),
+            [post.image.name], transform=str)
+        out = StringIO()
+        call_command('process_thumbnails', '--once', stdout=out)
+        self.assertIn('Обработано картинок: 1, ошибок: 0', out.getvalue())
+        self.assertFalse(ThumbnailTask.objects.exists())
+        response = self.client.get(reverse('index'))
+        self.assertNotContains(response, 'Изображение обрабатывается')
+        self.assertContains(response, self.get_ready_thumbnail(post).url)
+
+    @override_settings(POST_IMAGE_FORMATS=('WEBP',))
+    def test_card_serves_main_image_until_derivatives_exist(self):
+        post = self.create_post('partial.gif')
+        with mock.patch('posts.thumbnails.derivative_variants',
+                        return_value=[]):
+            process_thumbnail_tasks()
+        response = self.client.get(reverse('index'))
+        self.assertContains(response, self.get_ready_thumbnail(post).url)
+        self.assertNotContains(response, 'type="image/webp"')
+
+    @mock.patch('posts.thumbnails.generate_card_images',
+                side_effect=OSError('cannot identify image file'))
+    def test_failed_task_is_logged_and_dropped(self, _):
+        post = Post.objects.create(
+            text='битая картинка', author=CardThumbnailTests.user)
+        ThumbnailTask.objects.create(post=post, image='posts/broken.gif')
+        with self.assertLogs('posts.thumbnails', 'ERROR'):
+            self.assertEqual(process_thumbnail_tasks(), (0, 1))
+        self.assertFalse(ThumbnailTask.objects.exists())
+
+    @override_settings(POST_IMAGE_FORMATS=('WEBP',))
+    def test_feed_offers_webp_srcset(self):
+        post = self.create_post('srcset.gif')
+        process_thumbnail_tasks()
+        response = self.client.get(reverse('index'))
+        self.assertContains(response, 'type="image/webp"')
+        for image_format, width, geometry in derivative_variants():
+            thumbnail = backend.get_ready_thumbnail(
+                post.image.name, geometry, format=image_format,
+                **CARD_OPTIONS)
+            self.assertTrue(thumbnail.url.endswith('.webp'))
+            self.assertContains(response, f'{thumbnail.url} {width}w')
+
+    @override_settings(POST_IMAGE_FORMATS=('NOSUCHFORMAT', 'WEBP'))
+    def test_unsupported_formats_are_skipped(self):
+        formats = {variant[0] for variant in derivative_variants()}
+        self.assertEqual(formats, {'WEBP'})
+
+    @override_settings(POST_IMAGE_FORMATS=('WEBP',))
+    @mock.patch('posts.signals.queue_card_thumbnail')
+    def test_backfill_command_generates_images(self, _):
+        post = self.create_post('backfill.gif')
+        Post.objects.create(
+            text='без картинки', author=CardThumbnailTests.user)
+        out = StringIO()
+        call_command('generate_post_images', stdout=out)
+        self.assertIn('Обработано картинок: 1, ошибок: 0', out.getvalue())
+        self.assertIsNotNone(self.get_ready_thumbnail(post))
+        for image_format, _, geometry in derivative_variants():
+            self.assertIsNotNone(backend.get_ready_thumbnail(
+                post.image.name, geometry, format=image_format,
+                **CARD_OPTIONS))
@@ -0,0 +1,106 @@
+import json
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post, User
+from yatube.timing import RequestTimer, current_timer, server_timing, timed
+
+
+class RequestTimerTests(SimpleTestCase):
+
+    @mock.patch('yatube.timing.time.perf_counter',
+                side_effect=[0, 1, 2, 5, 6, 10])
+    def test_nested_segments_are_exclusive(self, perf_counter):
+        timer = RequestTimer()
+        with timer.segment('template'):
+            with timer.segment('db'):
+                pass
+        timings = timer.timings()
+        self.assertEqual(timings['db'], 3000)
+        self.assertEqual(timings['template'], 2000)
+        self.assertEqual(timings['app'], 5000)
+        self.assertEqual(timings['total'], 10000)
+
+    def test_timed_without_timer_does_nothing(self):
+        self.assertIsNone(current_timer())
+        with timed('db'):
+            pass
+
+    def test_header_format(self):
+        header = server_timing(
+            {'db': 1.5, 'cache': 0.2, 'total': 3},
+            {'db': 4, 'cache_hits': 2, 'cache_misses': 1})
+        self.assertEqual(
+            header,
+            'db;dur=1.5;desc="4 SQL", cache;dur=0.2;desc="2 hit, 1 miss", '
+            'total;dur=3')
+
+
+@override_settings(PERF_SAMPLE_RATE=1, PERF_SERVER_TIMING=True)
+class ServerTimingTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        author = User.objects.create_user(username='author')
+        Post.objects.create(text='пост', author=author)
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, url):
+        with self.assertLogs('yatube.perf', 'INFO') as logs:
+            response = self.client.get(url)
+        self.assertEqual(len(logs.records), 1)
+        return response, json.loads(logs.records[0].getMessage())
+
+    def test_sampled_request_reports_segments(self):
+        response, line = self.get(reverse('index'))
+        self.assertEqual(line['view'], 'index')
+        self.assertEqual(line['status'], 200)
+        self.assertGreater(line['queries'], 0)
+        self.assertGreater(line['timings']['template'], 0)
+        self.assertEqual(set(line['timings']), {
+            'db', 'template', 'thumbnail', 'cache', 'app', 'total'})
+        header = response['Server-Timing']
+        self.assertIn(f'db;dur={line["timings"]["db"]};'
+                      f'desc="{line["queries"]} SQL"', header)
+        self.assertIn('template;dur=', header)
+        self.assertIn(f'total;dur={line["timings"]["total"]}', header)
+
+    def test_cache_hits_are_counted(self):
+        self.get(reverse('index'))
+        response, line = self.get(reverse('index'))
+        self.assertEqual(line['queries'], 0)
+        self.assertGreater(line['cache_hits'], 0)
+        self.assertEqual(line['timings']['template'], 0)
+
+    def test_missing_pages_are_logged(self):
+        response, line = self.get('/no/such/page/here/')
+        self.assertEqual(line['status'], 404)
+        self.assertEqual(line['view'], '<unresolved>')
+
+    @override_settings(PERF_SERVER_TIMING=False)
+    def test_header_can_be_disabled(self):
+        response, line = self.get(reverse('index'))
+        self.assertNotIn('Server-Timing', response)
+        self.assertGreater(line['queries'], 0)
+
+    @override_settings(PERF_SERVER_TIMING=False)
+    def test_header_is_shown_to_staff(self):
+        self.client.force_login(User.objects.create_user(
+            username='staff', is_staff=True))
+        response, line = self.get(reverse('index'))
+        self.assertIn('Server-Timing', response)
+        self.client.force_login(User.objects.create_user(username='reader'))
+        response, line = self.get(reverse('index'))
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(PERF_SAMPLE_RATE=0)
+    def test_unsampled_requests_are_not_timed(self):
+        with self.assertNoLogs('yatube.perf', 'INFO'):
+            response = self.client.get(reverse('index'))
+        self.assertNotIn('Server-Timing', response)
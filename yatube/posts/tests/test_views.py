@@ -8,12 +8,13 @@ from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
 from posts.forms import CommentForm, PostForm
-from posts.models import Follow, Group, Post, User
+from posts.models import Comment, Follow, Group, Post, User
+from posts.views import get_following_ids
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 
-@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, QUERY_BUDGET_STRICT=True)
 class PostPagesTests(TestCase):
 
     @classmethod
@@ -47,6 +48,7 @@ class PostPagesTests(TestCase):
         super().tearDownClass()
 
     def setUp(self):
+        cache.clear()
         self.authorized_client = Client()
         self.authorized_client.force_login(PostPagesTests.user)
 
@@ -164,17 +166,62 @@ class PostPagesTests(TestCase):
         self.assertIsInstance(response.context['form'], PostForm)
         self.assertIs(response.context['edit'], True)
 
-    def test_cache_page(self):
-        response_0 = self.client.get(reverse('index'))
-        cache_page = response_0.content
+    def test_post_card_is_cached_until_post_changes(self):
+        post = PostPagesTests.post
+        self.client.get(reverse('index'))
+        Post.objects.filter(pk=post.pk).update(text='без сигнала')
+        response = self.client.get(reverse('index'))
+        self.assertContains(response, post.text)
+        Post.objects.get(pk=post.pk).save()
+        response = self.client.get(reverse('index'))
+        self.assertContains(response, 'без сигнала')
+
+    def test_group_and_author_changes_invalidate_post_card(self):
+        # Вошедший пользователь обходит кэш страниц: проверяется карточка.
+        index = reverse('index')
+        self.authorized_client.get(index)
+        group = Group.objects.get(pk=PostPagesTests.group.pk)
+        group.title = 'Новое название'
+        group.slug = 'new-slug'
+        group.save()
+        response = self.authorized_client.get(index)
+        self.assertContains(response, '#Новое название')
+        self.assertContains(response, reverse('group_posts',
+                                              args=('new-slug',)))
+        user = User.objects.get(pk=PostPagesTests.user.pk)
+        user.username = 'renamed'
+        user.save()
+        response = self.authorized_client.get(index)
+        self.assertContains(response, '@renamed')
+        self.assertContains(response, reverse('profile', args=('renamed',)))
+        group.delete()
+        response = self.authorized_client.get(index)
+        self.assertNotContains(response, reverse('group_posts',
+                                                 args=('new-slug',)))
+
+    def test_new_post_appears_on_index_immediately(self):
+        self.client.get(reverse('index'))
         Post.objects.create(text='test cache', author=PostPagesTests.user)
-        response_1 = self.client.get(reverse('index'))
-        update_page = response_1.content
-        self.assertEqual(cache_page, update_page)
-        cache.clear()
         response = self.client.get(reverse('index'))
-        actual_page = response.content
-        self.assertNotEqual(actual_page, cache_page)
+        self.assertContains(response, 'test cache')
+
+    def test_cached_card_does_not_leak_user_controls(self):
+        post = PostPagesTests.post
+        edit_page = reverse('post_edit', args=(post.author.username, post.id))
+        response = self.authorized_client.get(reverse('index'))
+        self.assertContains(response, edit_page)
+        response = self.client.get(reverse('index'))
+        self.assertNotContains(response, edit_page)
+
+    def test_comment_invalidates_post_card(self):
+        post = PostPagesTests.post
+        self.client.get(reverse('index'))
+        self.authorized_client.post(
+            reverse('add_comment', args=(post.author.username, post.id)),
+            {'text': 'комментарий'}
+        )
+        response = self.client.get(reverse('index'))
+        self.assertContains(response, 'Комментариев: 1')
 
 
 class FollowTests(TestCase):
@@ -220,6 +267,51 @@ class FollowTests(TestCase):
             author=FollowTests.author, user=FollowTests.follower).count()
         self.assertEqual(count, follow_count - 1)
 
+    def test_profile_card_shows_author_stats(self):
+        Follow.objects.create(
+            author=FollowTests.author, user=FollowTests.follower)
+        response = self.client.get(
+            reverse('profile', args=(FollowTests.author.username,))
+        )
+        self.assertContains(response, 'Подписчиков: 1')
+        self.assertContains(response, 'Подписан: 0')
+        self.assertContains(response, 'Количество записей:1')
+
+    def test_feed_items_show_follow_state(self):
+        other_author = User.objects.create_user(username='Другой')
+        other_post = Post.objects.create(text='другой', author=other_author)
+        Follow.objects.create(
+            author=FollowTests.author, user=FollowTests.follower)
+        authorized_follower = Client()
+        authorized_follower.force_login(FollowTests.follower)
+        with self.assertNumQueries(1):
+            following_ids = get_following_ids(
+                FollowTests.follower, [FollowTests.post1, other_post])
+        self.assertEqual(following_ids, {FollowTests.author.id})
+        response = authorized_follower.get(reverse('index'))
+        self.assertEqual(response.context['following_ids'], following_ids)
+        self.assertContains(
+            response,
+            reverse('profile_unfollow', args=(FollowTests.author.username,))
+        )
+        self.assertContains(
+            response, reverse('profile_follow', args=(other_author.username,))
+        )
+
+    def test_repeated_follow_creates_single_subscription(self):
+        authorized_follower = Client()
+        authorized_follower.force_login(FollowTests.follower)
+        follow_page = reverse(
+            'profile_follow', args=(FollowTests.author.username,))
+        authorized_follower.get(follow_page)
+        authorized_follower.get(follow_page)
+        self.assertEqual(
+            Follow.objects.filter(
+                author=FollowTests.author, user=FollowTests.follower
+            ).count(),
+            1
+        )
+
     def test_authors_post_appears_at_follow_index(self):
         authorized_follower = Client()
         authorized_follower.force_login(FollowTests.follower)
@@ -233,3 +325,136 @@ class FollowTests(TestCase):
         authorized_reader.force_login(FollowTests.guest)
         response = authorized_reader.get(reverse('follow_index'))
         self.assertEqual(len(response.context.get('page').object_list), 0)
+
+
+@override_settings(FOLLOW_TIMELINES=True)
+class FollowTimelineTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.follower = User.objects.create_user(username='follower')
+        Follow.objects.create(user=cls.follower, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(FollowTimelineTests.follower)
+
+    def get_feed(self):
+        response = self.authorized_client.get(reverse('follow_index'))
+        return list(response.context['page'])
+
+    def test_new_post_is_pushed_to_built_timeline(self):
+        old_post = Post.objects.create(text='старый',
+                                       author=FollowTimelineTests.author)
+        self.assertEqual(self.get_feed(), [old_post])
+        new_post = Post.objects.create(text='новый',
+                                       author=FollowTimelineTests.author)
+        self.assertEqual(self.get_feed(), [new_post, old_post])
+
+    def test_unfollow_drops_timeline(self):
+        Post.objects.create(text='пост', author=FollowTimelineTests.author)
+        self.assertEqual(len(self.get_feed()), 1)
+        Follow.objects.filter(user=FollowTimelineTests.follower).delete()
+        self.assertEqual(self.get_feed(), [])
+
+    def test_busy_timeline_is_marked_stale_and_rebuilt(self):
+        old_post = Post.objects.create(text='старый',
+                                       author=FollowTimelineTests.author)
+        self.assertEqual(self.get_feed(), [old_post])
+        key = f'timeline:{self.follower.pk}'
+        # Ленту держит другой процесс: дописать пост в неё нельзя.
+        cache.add(f'{key}:lock', True)
+        new_post = Post.objects.create(text='новый',
+                                       author=FollowTimelineTests.author)
+        self.assertEqual(cache.get(key), [
+            (old_post.pub_date.timestamp(), old_post.pk)])
+        self.assertEqual(self.get_feed(), [new_post, old_post])
+        cache.delete(f'{key}:lock')
+        self.assertEqual(self.get_feed(), [new_post, old_post])
+        self.assertIsNone(cache.get(f'{key}:stale'))
+        self.assertEqual(len(cache.get(key)), 2)
+
+    def test_unfollow_during_fan_out_is_not_lost(self):
+        Post.objects.create(text='пост', author=FollowTimelineTests.author)
+        self.assertEqual(len(self.get_feed()), 1)
+        key = f'timeline:{self.follower.pk}'
+        stale_timeline = cache.get(key)
+        Follow.objects.filter(user=FollowTimelineTests.follower).delete()
+        # Одновременный пост записал ленту, прочитанную до отписки.
+        cache.set(key, stale_timeline)
+        self.assertEqual(self.get_feed(), [])
+
+    @override_settings(TIMELINE_FANOUT_MAX_FOLLOWERS=0)
+    def test_popular_author_posts_are_merged_on_read(self):
+        self.get_feed()
+        post = Post.objects.create(text='пост',
+                                   author=FollowTimelineTests.author)
+        self.assertFalse(cache.get(f'timeline:{self.follower.pk}'))
+        self.assertEqual(self.get_feed(), [post])
+
+
+@override_settings(COMMENTS_PER_PAGE=3)
+class CommentPaginationTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(text='пост', author=cls.user)
+        Comment.objects.bulk_create([
+            Comment(post=cls.post, text=f'комментарий {number}',
+                    author=User.objects.create_user(f'reader{number}'))
+            for number in range(7)
+        ])
+        cls.ordered_ids = list(cls.post.comments.order_by(
+            '-created', '-id').values_list('id', flat=True))
+        cls.args = (cls.user.username, cls.post.id)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_post_page_shows_first_comments_page(self):
+        response = self.client.get(
+            reverse('post', args=CommentPaginationTests.args))
+        comments = response.context['comments']
+        self.assertEqual([comment.id for comment in comments],
+                         CommentPaginationTests.ordered_ids[:3])
+        self.assertContains(response, 'data-comments-more=')
+
+    def test_comments_page_loads_authors_in_one_query(self):
+        url = reverse('post_comments', args=CommentPaginationTests.args)
+        with self.assertNumQueries(2):
+            self.client.get(url)
+
+    def test_fragment_endpoint_walks_all_comments(self):
+        url = reverse('post_comments', args=CommentPaginationTests.args)
+        seen, cursor = [], ''
+        while True:
+            response = self.client.get(url, {'cursor': cursor})
+            comments = response.context['comments']
+            seen.extend(comment.id for comment in comments)
+            if not comments.has_next():
+                break
+            cursor = comments.next_cursor
+        self.assertEqual(seen, CommentPaginationTests.ordered_ids)
+        self.assertNotContains(response, 'data-comments-more=')
+
+    def test_fragment_endpoint_returns_json(self):
+        response = self.client.get(
+            reverse('post_comments', args=CommentPaginationTests.args),
+            HTTP_ACCEPT='application/json'
+        )
+        data = response.json()
+        self.assertEqual([comment['id'] for comment in data['comments']],
+                         CommentPaginationTests.ordered_ids[:3])
+        self.assertEqual(data['comments'][0]['author'], 'reader6')
+        second = self.client.get(
+            reverse('post_comments', args=CommentPaginationTests.args),
+            {'cursor': data['next_cursor']},
+            HTTP_ACCEPT='application/json'
+        ).json()
+        self.assertEqual([comment['id'] for comment in second['comments']],
+                         CommentPaginationTests.ordered_ids[3:6])
@@ -0,0 +1,234 @@
+"""
+Генерация миниатюр картинок постов.
+
+Запросы к сайту картинки не режут. Сохранение поста ставит картинку
+в таблицу ThumbnailTask, которую разбирает отдельный процесс (команда
+process_thumbnails), а шаблон пока показывает заглушку. После генерации
+версия карточки поста сбрасывается, чтобы закэшированная карточка
+с заглушкой перерисовалась. Миниатюры уже опубликованных постов создаёт
+команда generate_post_images.
+
+Кроме основной миниатюры 960x559 для каждой картинки создаются уменьшенные
+копии в современных форматах (POST_IMAGE_WIDTHS × POST_IMAGE_FORMATS),
+из которых шаблон собирает srcset.
+"""
+import logging
+from collections import namedtuple
+
+from django.conf import settings
+from PIL import Image
+from sorl.thumbnail import default
+from sorl.thumbnail.base import EXTENSIONS, ThumbnailBackend
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.helpers import serialize, tokey
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores import cached_db_kvstore
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from .cards import bump_card_version
+from .models import ThumbnailTask
+from .pages import invalidate_post_pages
+
+CARD_WIDTH = 960
+CARD_HEIGHT = 559
+CARD_GEOMETRY = f'{CARD_WIDTH}x{CARD_HEIGHT}'
+CARD_OPTIONS = {'crop': 'center', 'upscale': True}
+MIME_TYPES = {'AVIF': 'image/avif', 'WEBP': 'image/webp'}
+
+CardImage = namedtuple('CardImage', 'url sources')
+CardSource = namedtuple('CardSource', 'type srcset')
+
+logger = logging.getLogger(__name__)
+
+
+def derivative_formats():
+    """Форматы из POST_IMAGE_FORMATS, которые умеет сохранять Pillow."""
+    Image.init()
+    return [
+        image_format for image_format in settings.POST_IMAGE_FORMATS
+        if image_format in Image.SAVE and image_format in MIME_TYPES
+    ]
+
+
+def derivative_variants():
+    """Тройки (формат, ширина, геометрия) всех уменьшенных копий."""
+    return [
+        (image_format, width,
+         f'{width}x{round(width * CARD_HEIGHT / CARD_WIDTH)}')
+        for image_format in derivative_formats()
+        for width in settings.POST_IMAGE_WIDTHS
+    ]
+
+
+class CardThumbnailBackend(ThumbnailBackend):
+
+    def _get_thumbnail_filename(self, source, geometry_string, options):
+        # То же имя, что у sorl, но расширение известно для любого формата
+        # Pillow, в том числе AVIF.
+        key = tokey(source.key, geometry_string, serialize(options))
+        path = f'{key[:2]}/{key[2:4]}/{key}'
+        image_format = options['format']
+        extension = EXTENSIONS.get(image_format, image_format.lower())
+        return f'{sorl_settings.THUMBNAIL_PREFIX}{path}.{extension}'
+
+    def get_ready_thumbnail(self, file_, geometry_string, **options):
+        """
+        Возвращает миниатюру из хранилища sorl или None, если её ещё
+        не создали. Сама картинка при этом не открывается.
+        """
+        return default.kvstore.get(
+            self.thumbnail_file(file_, geometry_string, **options))
+
+    def thumbnail_file(self, file_, geometry_string, **options):
+        """ImageFile миниатюры, под которым её создаст генерация."""
+        source = ImageFile(file_)
+        # Те же умолчания, что и в ThumbnailBackend.get_thumbnail, чтобы
+        # имя миниатюры совпало с тем, под которым её создаст генерация.
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(sorl_defaults, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return ImageFile(name, default.storage)
+
+
+backend = CardThumbnailBackend()
+
+
+def generate_card_images(name):
+    """Создаёт основную миниатюру и все уменьшенные копии картинки."""
+    backend.get_thumbnail(name, CARD_GEOMETRY, **CARD_OPTIONS)
+    for image_format, _, geometry in derivative_variants():
+        backend.get_thumbnail(name, geometry, format=image_format,
+                              **CARD_OPTIONS)
+
+
+def generate_card_thumbnail(name, post_id):
+    generate_card_images(name)
+    bump_card_version(post_id)
+    invalidate_post_pages(post_id)
+
+
+def generate_logged(generate, name, *args):
+    """
+    Вызывает generate(name, *args). Ошибка (картинки нет на диске, файл
+    битый) пишется в лог и не роняет сохранение поста или страницу;
+    в этом случае возвращает False.
+    """
+    try:
+        generate(name, *args)
+    except Exception:
+        logger.exception('Не удалось создать миниатюру %s', name)
+        return False
+    return True
+
+
+def queue_card_thumbnail(image):
+    """
+    Ставит создание миниатюр карточки в очередь ThumbnailTask. Повторная
+    постановка той же картинки, пока она в очереди, ничего не делает.
+    """
+    if not image:
+        return
+    ThumbnailTask.objects.bulk_create(
+        [ThumbnailTask(image=image.name, post_id=image.instance.pk)],
+        ignore_conflicts=True)
+
+
+def process_thumbnail_tasks(limit=None):
+    """
+    Создаёт миниатюры из очереди, старые задачи первыми. Возвращает
+    (создано, ошибок). Задача удаляется и при ошибке, чтобы битая
+    картинка не занимала воркер; ошибка пишется в лог.
+    """
+    tasks = ThumbnailTask.objects.order_by('id').values_list(
+        'id', 'image', 'post_id')
+    if limit is not None:
+        tasks = tasks[:limit]
+    done = failed = 0
+    for task_id, name, post_id in list(tasks):
+        if generate_logged(generate_card_thumbnail, name, post_id):
+            done += 1
+        else:
+            failed += 1
+        ThumbnailTask.objects.filter(id=task_id).delete()
+    return done, failed
+
+
+def prefetch_card_thumbnails(posts):
+    """
+    Загружает записи хранилища sorl о миниатюрах карточек страницы в кэш
+    одним запросом к базе. Без этого после сброса кэша каждая миниатюра
+    каждой карточки читалась бы из базы отдельным запросом.
+    """
+    kvstore = default.kvstore
+    if not isinstance(kvstore, cached_db_kvstore.KVStore):
+        return
+    variants = [(CARD_GEOMETRY, {})] + [
+        (geometry, {'format': image_format})
+        for image_format, _, geometry in derivative_variants()
+    ]
+    keys = [
+        add_prefix(backend.thumbnail_file(
+            post.image.name, geometry, **options, **CARD_OPTIONS).key)
+        for post in posts if post.image
+        for geometry, options in variants
+    ]
+    if not keys:
+        return
+    missing = set(keys).difference(kvstore.cache.get_many(keys))
+    if not missing:
+        return
+    values = dict(KVStoreModel.objects.filter(
+        key__in=missing).values_list('key', 'value'))
+    kvstore.cache.set_many({
+        key: values.get(key, cached_db_kvstore.EMPTY_VALUE) for key in missing
+    }, sorl_settings.THUMBNAIL_CACHE_TIMEOUT)
+
+
+def get_card_sources(name):
+    """
+    Возвращает srcset для каждого формата, у которого готовы все размеры,
+    и признак того, что готовы все уменьшенные копии.
+    """
+    srcsets = {}
+    complete = True
+    for image_format, width, geometry in derivative_variants():
+        thumbnail = backend.get_ready_thumbnail(
+            name, geometry, format=image_format, **CARD_OPTIONS)
+        srcset = srcsets.setdefault(image_format, [])
+        if thumbnail is None:
+            complete = False
+            srcsets[image_format] = None
+        elif srcset is not None:
+            srcset.append(f'{thumbnail.url} {width}w')
+    sources = [
+        CardSource(MIME_TYPES[image_format], ', '.join(srcset))
+        for image_format, srcset in srcsets.items() if srcset
+    ]
+    return sources, complete
+
+
+def get_card_thumbnail(image):
+    """
+    Возвращает CardImage с основной миниатюрой и готовыми srcset или None,
+    если основной миниатюры ещё нет (шаблон покажет заглушку). Пока готовы
+    не все уменьшенные копии, карточка отдаёт только src основной
+    миниатюры. Показ карточки ничего не создаёт и не пишет в базу:
+    картинку ставит в очередь сохранение поста, а миниатюры старых постов
+    создаёт generate_post_images.
+    """
+    if not image:
+        return None
+    thumbnail = backend.get_ready_thumbnail(
+        image.name, CARD_GEOMETRY, **CARD_OPTIONS)
+    if thumbnail is None:
+        return None
+    sources, _ = get_card_sources(image.name)
+    return CardImage(thumbnail.url, sources)
@@ -0,0 +1,169 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import DEFAULT_DB_ALIAS
+
+from .models import AuthorStats, Follow, Post
+from .queries import feed_posts
+
+# Сколько раз и с какой паузой пробовать занятую блокировку ленты.
+TIMELINE_LOCK_ATTEMPTS = 3
+TIMELINE_LOCK_WAIT = 0.01
+
+
+def timeline_key(user_id):
+    return f'timeline:{user_id}'
+
+
+def is_popular(author_id):
+    return AuthorStats.objects.filter(
+        author_id=author_id,
+        followers_count__gt=settings.TIMELINE_FANOUT_MAX_FOLLOWERS
+    ).exists()
+
+
+def lock_key(key):
+    return f'{key}:lock'
+
+
+def stale_key(key):
+    return f'{key}:stale'
+
+
+def lock_timelines(keys):
+    """
+    Берёт блокировки лент через cache.add и возвращает ключи взятых.
+    Занятые чужой блокировкой ключи пробует ещё несколько раз.
+    """
+    locked, busy = [], list(keys)
+    for attempt in range(TIMELINE_LOCK_ATTEMPTS):
+        if attempt:
+            time.sleep(TIMELINE_LOCK_WAIT)
+        waiting = []
+        for key in busy:
+            if cache.add(lock_key(key), True, settings.TIMELINE_LOCK_TIMEOUT):
+                locked.append(key)
+            else:
+                waiting.append(key)
+        busy = waiting
+        if not busy:
+            break
+    return locked
+
+
+def unlock_timelines(keys):
+    cache.delete_many([lock_key(key) for key in keys])
+
+
+def fan_out_post(post):
+    """
+    Добавляет пост в начало уже собранных лент подписчиков автора.
+    Ленты, которых нет в кэше, соберутся при чтении вместе с этим постом.
+
+    Чтение и запись ленты идут под блокировкой: иначе два одновременных
+    поста прочитали бы одну ленту, и запись второго потеряла бы первый.
+    Ленту, которую не удалось заблокировать, пост помечает устаревшей,
+    и при чтении она собирается заново из базы.
+    """
+    if is_popular(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id).values_list('user_id', flat=True)
+    keys = [timeline_key(user_id) for user_id in followers.iterator()]
+    locked = lock_timelines(keys)
+    entry = (post.pub_date.timestamp(), post.pk)
+    try:
+        timelines = {
+            key: [entry] + timeline[:settings.TIMELINE_LENGTH - 1]
+            for key, timeline in cache.get_many(locked).items()
+        }
+        cache.set_many(timelines, settings.TIMELINE_TIMEOUT)
+    finally:
+        unlock_timelines(locked)
+    busy = set(keys).difference(locked)
+    if busy:
+        cache.set_many({stale_key(key): True for key in busy},
+                       settings.TIMELINE_TIMEOUT)
+
+
+def drop_timeline(user_id):
+    """
+    Отметка об устаревании переживёт ленту, которую одновременный
+    fan_out_post успел прочитать до удаления и запишет после.
+    """
+    key = timeline_key(user_id)
+    cache.set(stale_key(key), True, settings.TIMELINE_TIMEOUT)
+    cache.delete(key)
+
+
+def timeline_entries(post_list):
+    return [
+        (pub_date.timestamp(), pk) for pub_date, pk in post_list.order_by(
+            '-pub_date', '-id').values_list('pub_date', 'id')[
+                :settings.TIMELINE_LENGTH]
+    ]
+
+
+def build_timeline(user_id):
+    """
+    Собирает ленту заново из основной базы: с отстающей реплики в кэш
+    на TIMELINE_TIMEOUT попала бы лента без только что записанных
+    постов и подписок.
+    """
+    return timeline_entries(Post.objects.using(DEFAULT_DB_ALIAS).filter(
+        author__following__user_id=user_id))
+
+
+def rebuild_timeline(user_id):
+    """
+    Собирает ленту и кладёт её в кэш под блокировкой, чтобы одновременный
+    fan_out_post не дописал пост в старую ленту, которую затрёт эта.
+    Отметка об устаревании снимается до чтения базы: пост, помеченный
+    после неё, снова пометит ленту. Без блокировки лента не кэшируется.
+    """
+    key = timeline_key(user_id)
+    if not lock_timelines([key]):
+        return build_timeline(user_id)
+    try:
+        cache.delete(stale_key(key))
+        timeline = build_timeline(user_id)
+        cache.set(key, timeline, settings.TIMELINE_TIMEOUT)
+    finally:
+        unlock_timelines([key])
+    return timeline
+
+
+def get_timeline(user_id):
+    """
+    Возвращает ленту подписок как список пар (время публикации, id поста).
+
+    Посты популярных авторов в ленты не раскладываются, поэтому
+    подмешиваются при каждом чтении.
+    """
+    key = timeline_key(user_id)
+    cached = cache.get_many([key, stale_key(key)])
+    timeline = cached.get(key)
+    if timeline is None or stale_key(key) in cached:
+        timeline = rebuild_timeline(user_id)
+    popular_authors = Follow.objects.filter(
+        user_id=user_id,
+        author__stats__followers_count__gt=(
+            settings.TIMELINE_FANOUT_MAX_FOLLOWERS)
+    ).values('author_id')
+    popular = timeline_entries(
+        Post.objects.filter(author_id__in=popular_authors))
+    if popular:
+        timeline = sorted(set(timeline) | set(popular), reverse=True)[
+            :settings.TIMELINE_LENGTH]
+    return timeline
+
+
+def get_timeline_page(request):
+    ids = [pk for _, pk in get_timeline(request.user.pk)]
+    paginator = Paginator(ids, settings.POSTS_PER_PAGE)
+    page = paginator.get_page(request.GET.get('page'))
+    posts = feed_posts().in_bulk(page.object_list)
+    page.object_list = [posts[pk] for pk in page.object_list if pk in posts]
+    return page
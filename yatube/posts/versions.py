@@ -0,0 +1,34 @@
+"""
+Версии ключей кэша страниц (pages.py) и карточек постов (cards.py).
+
+Версия — случайная строка и момент её смены. Запись сначала попадает
+в основную базу, а реплика догоняет её за REPLICA_LAG_SECONDS. Если
+запрос читал с реплики, а версия сменилась недавно, прочитанное могло
+быть ещё до записи, и сохранять его в кэш под новой версией нельзя:
+устаревшая страница жила бы там до следующего изменения.
+"""
+import time
+from uuid import uuid4
+
+from django.conf import settings
+
+from yatube.db_router import used_replica
+
+
+def new_version():
+    return f'{uuid4().hex}:{time.time():.3f}'
+
+
+def changed_at(version):
+    try:
+        return float(version.partition(':')[2])
+    except ValueError:
+        return 0.0
+
+
+def may_cache(*versions):
+    """Можно ли сохранить в кэш прочитанное под этими версиями."""
+    if not used_replica():
+        return True
+    settled = time.time() - settings.REPLICA_LAG_SECONDS
+    return all(changed_at(version) <= settled for version in versions)
@@ -1,32 +1,89 @@
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 
+from .cards import attach_card_versions
+from .conditional import (conditional_page, group_state, index_state,
+                          post_state, profile_state)
 from .forms import CommentForm, PostForm
 from .models import Follow, Group, Post, User
+from .pages import (cached_page, group_tags, index_tags, post_tags,
+                    profile_tags)
+from .paginators import CursorPaginator
+from .queries import comment_list, feed_posts, post_detail
+from .search import SearchResults
+from .stats import get_author_stats
+from .thumbnails import prefetch_card_thumbnails
+from .timelines import get_timeline_page
 
 
 def get_paginator_page(request, post_list):
-    paginator = Paginator(post_list, settings.POSTS_PER_PAGE)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    return page
-
-
+    url_name = request.resolver_match.url_name
+    if (settings.POSTS_PAGINATION == 'numbered'
+            or url_name in settings.NUMBERED_PAGINATION_VIEWS):
+        paginator = Paginator(post_list, settings.POSTS_PER_PAGE)
+        return paginator.get_page(request.GET.get('page'))
+    paginator = CursorPaginator(post_list, settings.POSTS_PER_PAGE)
+    return paginator.get_page(request.GET.get('cursor'))
+
+
+def get_following_ids(user, posts):
+    """
+    Возвращает id авторов постов страницы, на которых подписан
+    пользователь, одним запросом.
+    """
+    if not user.is_authenticated:
+        return set()
+    author_ids = {post.author_id for post in posts}
+    return set(Follow.objects.filter(
+        user=user, author_id__in=author_ids
+    ).values_list('author_id', flat=True))
+
+
+@cached_page(index_tags)
+@conditional_page(index_state)
 def index(request):
-    post_list = Post.objects.select_related(
-        'author', 'group').prefetch_related('comments')
-    page = get_paginator_page(request, post_list)
-    return render(request, 'posts/index.html', {'page': page})
+    page = get_paginator_page(request, feed_posts())
+    attach_card_versions(page)
+    prefetch_card_thumbnails(page)
+    following_ids = get_following_ids(request.user, page)
+    return render(
+        request,
+        'posts/index.html',
+        {'page': page, 'following_ids': following_ids}
+    )
 
 
+@cached_page(group_tags)
+@conditional_page(group_state)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts_list = group.posts.select_related(
-        'author', 'group').prefetch_related('comments')
-    page = get_paginator_page(request, posts_list)
-    return render(request, 'posts/group.html', {'group': group, 'page': page})
+    page = get_paginator_page(request, feed_posts(group.posts.all()))
+    attach_card_versions(page)
+    prefetch_card_thumbnails(page)
+    following_ids = get_following_ids(request.user, page)
+    return render(
+        request,
+        'posts/group.html',
+        {'group': group, 'page': page, 'following_ids': following_ids}
+    )
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    results = SearchResults(query, feed_posts())
+    paginator = Paginator(results, settings.POSTS_PER_PAGE)
+    page = paginator.get_page(request.GET.get('page'))
+    attach_card_versions(page)
+    prefetch_card_thumbnails(page)
+    following_ids = get_following_ids(request.user, page)
+    return render(
+        request,
+        'posts/search.html',
+        {'query': query, 'page': page, 'following_ids': following_ids}
+    )
 
 
 @login_required
@@ -40,11 +97,15 @@ def new_post(request):
     return render(request, 'posts/new.html', {'form': form, 'edit': False})
 
 
+@cached_page(profile_tags)
+@conditional_page(profile_state)
 def profile(request, username):
-    profile = get_object_or_404(User, username=username)
-    profile_post_list = profile.posts.select_related(
-        'author', 'group').prefetch_related('comments')
-    page = get_paginator_page(request, profile_post_list)
+    profile = get_object_or_404(
+        User.objects.select_related('stats'), username=username)
+    get_author_stats(profile)
+    page = get_paginator_page(request, feed_posts(profile.posts.all()))
+    attach_card_versions(page)
+    prefetch_card_thumbnails(page)
     following = False
     if request.user.is_authenticated:
         following = Follow.objects.filter(
@@ -56,9 +117,22 @@ def profile(request, username):
     )
 
 
+def get_comments_page(request, post):
+    comments = comment_list(post)
+    paginator = CursorPaginator(
+        comments, settings.COMMENTS_PER_PAGE, key='created')
+    return paginator.get_page(request.GET.get('cursor'))
+
+
+@cached_page(post_tags)
+@conditional_page(post_state)
 def post_view(request, username, post_id):
-    post = get_object_or_404(Post, id=post_id, author__username=username)
-    comments = post.comments.all()
+    post = get_object_or_404(
+        post_detail(), id=post_id, author__username=username)
+    get_author_stats(post.author)
+    attach_card_versions([post])
+    prefetch_card_thumbnails([post])
+    comments = get_comments_page(request, post)
     form = CommentForm()
     return render(
         request,
@@ -67,6 +141,36 @@ def post_view(request, username, post_id):
     )
 
 
+def post_comments(request, username, post_id):
+    """
+    Следующая страница комментариев для подгрузки на странице поста:
+    HTML-фрагмент или JSON, если клиент просит application/json.
+    """
+    post = get_object_or_404(
+        Post.objects.select_related('author').only('id', 'author__username'),
+        id=post_id, author__username=username
+    )
+    comments = get_comments_page(request, post)
+    if 'application/json' in request.META.get('HTTP_ACCEPT', ''):
+        return JsonResponse({
+            'comments': [
+                {
+                    'id': comment.id,
+                    'author': comment.author.username,
+                    'text': comment.text,
+                    'created': comment.created.isoformat(),
+                }
+                for comment in comments
+            ],
+            'next_cursor': comments.next_cursor,
+        })
+    return render(
+        request,
+        'includes/comment_list.html',
+        {'post': post, 'comments': comments}
+    )
+
+
 @login_required
 def post_edit(request, username, post_id):
     post = get_object_or_404(Post, id=post_id, author__username=username)
@@ -100,9 +204,20 @@ def add_comment(request, username, post_id):
 
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    page = get_paginator_page(request, post_list)
-    return render(request, 'posts/follow.html', {'page': page})
+    if settings.FOLLOW_TIMELINES:
+        page = get_timeline_page(request)
+    else:
+        post_list = feed_posts().filter(
+            author__following__user=request.user)
+        page = get_paginator_page(request, post_list)
+    attach_card_versions(page)
+    prefetch_card_thumbnails(page)
+    following_ids = get_following_ids(request.user, page)
+    return render(
+        request,
+        'posts/follow.html',
+        {'page': page, 'following_ids': following_ids}
+    )
 
 
 @login_required
@@ -0,0 +1,73 @@
+"""
+Загрузка вошедшего пользователя из общего кэша.
+
+AuthenticationMiddleware на каждом запросе читает пользователя из базы.
+CachedAuthenticationMiddleware берёт его из кэша под ключом user:<id>,
+а сигналы (users.signals) удаляют запись при сохранении и удалении
+пользователя и при изменении его групп и прав. Проверка хэша сессии
+остаётся прежней, поэтому смена пароля сразу завершает другие сессии.
+USER_CACHE_TIMEOUT = 0 отключает кэш.
+"""
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import SimpleLazyObject
+
+
+def user_cache_key(user_id):
+    return f'user:{user_id}'
+
+
+def load_user(backend, user_id):
+    if not settings.USER_CACHE_TIMEOUT:
+        return backend.get_user(user_id)
+    key = user_cache_key(user_id)
+    user = cache.get(key)
+    if user is None:
+        user = backend.get_user(user_id)
+        if user is not None:
+            cache.set(key, user, settings.USER_CACHE_TIMEOUT)
+    return user
+
+
+def invalidate_user(user_id):
+    key = user_cache_key(user_id)
+    cache.delete(key)
+    # Запрос, прочитавший строку до коммита, мог снова положить её в кэш.
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def get_user(request):
+    """django.contrib.auth.get_user с пользователем из кэша."""
+    try:
+        user_id = auth._get_user_session_key(request)
+        backend_path = request.session[auth.BACKEND_SESSION_KEY]
+    except KeyError:
+        return AnonymousUser()
+    if backend_path not in settings.AUTHENTICATION_BACKENDS:
+        return AnonymousUser()
+    user = load_user(auth.load_backend(backend_path), user_id)
+    if hasattr(user, 'get_session_auth_hash'):
+        session_hash = request.session.get(auth.HASH_SESSION_KEY)
+        if not (session_hash and constant_time_compare(
+                session_hash, user.get_session_auth_hash())):
+            request.session.flush()
+            user = None
+    return user or AnonymousUser()
+
+
+def get_request_user(request):
+    if not hasattr(request, '_cached_user'):
+        request._cached_user = get_user(request)
+    return request._cached_user
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: get_request_user(request))
@@ -0,0 +1,32 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .auth import invalidate_user
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_saved_user(sender, instance, **kwargs):
+    # Имя, пароль, is_active, is_staff и last_login хранятся в самой строке.
+    invalidate_user(instance.pk)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def invalidate_user_permissions(sender, instance, action, reverse, pk_set,
+                                **kwargs):
+    if not reverse:
+        user_ids = [instance.pk] if action.startswith('post_') else ()
+    elif action == 'pre_clear':
+        # Группа или право теряют всех пользователей: после clear()
+        # узнать, кого это коснулось, уже нельзя.
+        user_ids = list(instance.user_set.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        user_ids = pk_set
+    else:
+        user_ids = ()
+    for user_id in user_ids:
+        invalidate_user(user_id)
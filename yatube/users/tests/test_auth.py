@@ -0,0 +1,94 @@
+from django.contrib.auth.models import Group, Permission
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import User
+from users.auth import user_cache_key
+
+CACHED_SESSIONS = 'django.contrib.sessions.backends.cached_db'
+
+
+@override_settings(USER_CACHE_TIMEOUT=60, SESSION_ENGINE=CACHED_SESSIONS,
+                   PAGE_CACHE_TIMEOUT=0, QUERY_BUDGETS={})
+class CachedUserTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='leo', password='old-password-1')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+        self.url = reverse('about:author')
+
+    def request_user(self):
+        return self.client.get(self.url).wsgi_request.user
+
+    def test_session_and_user_come_from_cache(self):
+        self.assertEqual(self.request_user(), self.user)
+        with self.assertNumQueries(0):
+            user = self.request_user()
+            self.assertTrue(user.is_authenticated)
+        self.assertIsNotNone(cache.get(user_cache_key(self.user.pk)))
+
+    @override_settings(USER_CACHE_TIMEOUT=0)
+    def test_disabled_cache_reads_user_every_time(self):
+        self.request_user()
+        with self.assertNumQueries(1):
+            self.assertTrue(self.request_user().is_authenticated)
+
+    def test_profile_change_is_seen_immediately(self):
+        self.request_user()
+        user = User.objects.get(pk=self.user.pk)
+        user.first_name = 'Лев'
+        user.save()
+        self.assertEqual(self.request_user().first_name, 'Лев')
+
+    def test_password_change_ends_other_sessions(self):
+        self.request_user()
+        user = User.objects.get(pk=self.user.pk)
+        user.set_password('new-password-2')
+        user.save()
+        self.assertFalse(self.request_user().is_authenticated)
+
+    def test_deactivated_and_deleted_users_are_logged_out(self):
+        self.request_user()
+        user = User.objects.get(pk=self.user.pk)
+        user.is_active = False
+        user.save()
+        self.assertFalse(self.request_user().is_authenticated)
+        user.is_active = True
+        user.save()
+        self.client.force_login(user)
+        self.assertTrue(self.request_user().is_authenticated)
+        user.delete()
+        self.assertFalse(self.request_user().is_authenticated)
+
+    def test_permission_changes_drop_cached_user(self):
+        key = user_cache_key(self.user.pk)
+        permission = Permission.objects.get(codename='add_post')
+        group = Group.objects.create(name='editors')
+        changes = (
+            lambda: self.user.user_permissions.add(permission),
+            lambda: self.user.groups.add(group),
+            lambda: group.user_set.remove(self.user),
+            lambda: permission.user_set.clear(),
+        )
+        for change in changes:
+            self.request_user()
+            self.assertIsNotNone(cache.get(key))
+            change()
+            self.assertIsNone(cache.get(key))
+
+    def test_login_and_logout_work_as_before(self):
+        self.client.logout()
+        self.assertFalse(self.request_user().is_authenticated)
+        response = self.client.post(reverse('login'), {
+            'username': 'leo', 'password': 'old-password-1'})
+        self.assertRedirects(response, reverse('index'))
+        self.assertEqual(self.request_user(), self.user)
+        self.client.get(reverse('logout'))
+        self.assertFalse(self.request_user().is_authenticated)
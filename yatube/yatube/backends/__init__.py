@@ -0,0 +1,37 @@
+"""
+Бэкенды баз данных с проверкой постоянных соединений.
+
+При CONN_HEALTH_CHECKS = True соединение, оставшееся с прошлого запроса
+(CONN_MAX_AGE > 0), перед первым запросом к базе проверяется, и мёртвое
+соединение закрывается и открывается заново. Так же устроены проверки
+в Django 4.1; здесь они повторены для Django 2.2.
+"""
+
+
+class HealthCheckMixin:
+    health_check_done = False
+
+    @property
+    def health_check_enabled(self):
+        return self.settings_dict.get('CONN_HEALTH_CHECKS', False)
+
+    def connect(self):
+        super().connect()
+        self.health_check_done = True
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        # Вызывается в начале и в конце каждого запроса к сайту.
+        self.health_check_done = False
+
+    def close_if_health_check_failed(self):
+        if (self.connection is None or not self.health_check_enabled
+                or self.health_check_done):
+            return
+        if not self.is_usable():
+            self.close()
+        self.health_check_done = True
+
+    def _cursor(self, name=None):
+        self.close_if_health_check_failed()
+        return super()._cursor(name)
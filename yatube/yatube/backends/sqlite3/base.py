@@ -0,0 +1,13 @@
+from django.db.backends.sqlite3 import base
+
+from .. import HealthCheckMixin
+
+
+class DatabaseWrapper(HealthCheckMixin, base.DatabaseWrapper):
+    """SQLite с PRAGMA из настройки PRAGMAS для каждого нового соединения."""
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        for pragma, value in self.settings_dict.get('PRAGMAS', {}).items():
+            connection.execute(f'PRAGMA {pragma} = {value}')
+        return connection
@@ -0,0 +1,225 @@
+"""
+Бэкенды кэша, которые считают попадания, промахи и вытеснения
+по префиксам ключей.
+
+Счётчики копятся в памяти процесса и периодически складываются
+в отдельное хранилище рядом с кэшем (у файлового кэша — подкаталог stats,
+общий для всех воркеров). Вытеснения и cache.clear() основного кэша
+его не затрагивают, поэтому статистика переживает их.
+"""
+import os
+import tempfile
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+
+from . import timing
+
+STATS_EVENTS = ('hits', 'misses', 'evictions')
+STATS_PARAMS = {'TIMEOUT': None, 'OPTIONS': {'MAX_ENTRIES': 100000}}
+
+_MISSING = object()
+_local = threading.local()
+
+
+def key_prefix(key):
+    """
+    'timeline:5' -> 'timeline',
+    'template.cache.post_card.<md5>' -> 'template.cache.post_card',
+    'sorl-thumbnail||image||<md5>' -> 'sorl-thumbnail||image'.
+    """
+    prefix, separator, _ = key.partition(':')
+    if separator:
+        return prefix
+    for separator in ('||', '.'):
+        if separator in prefix:
+            return prefix.rsplit(separator, 1)[0]
+    return prefix
+
+
+@contextmanager
+def nested_call():
+    """Отмечает вызовы бэкенда изнутри другого вызова, чтобы не считать их."""
+    depth = getattr(_local, 'depth', 0)
+    _local.depth = depth + 1
+    try:
+        yield depth == 0
+    finally:
+        _local.depth = depth
+
+
+class CacheStatsMixin:
+    stats_flush_every = 100
+    # Известен ли префикс вытесненного ключа.
+    evictions_by_prefix = True
+
+    def __init__(self, location, params):
+        super().__init__(location, params)
+        self._stats = Counter()
+        self._stats_pending = 0
+        self._stats_lock = threading.Lock()
+        self.stats_store = self.make_stats_store(location)
+
+    def make_stats_store(self, location):
+        """Хранилище счётчиков вне вытесняемых ключей кэша."""
+        raise NotImplementedError
+
+    def get(self, key, default=None, version=None):
+        with nested_call() as outer, timing.timed('cache'):
+            value = super().get(key, _MISSING, version)
+        if outer:
+            self.record(key, 'hits' if value is not _MISSING else 'misses')
+        return default if value is _MISSING else value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        with nested_call() as outer, timing.timed('cache'):
+            values = super().get_many(keys, version)
+        if outer:
+            for key in keys:
+                self.record(key, 'hits' if key in values else 'misses')
+        return values
+
+    def set(self, *args, **kwargs):
+        with timing.timed('cache'):
+            return super().set(*args, **kwargs)
+
+    def set_many(self, *args, **kwargs):
+        with timing.timed('cache'):
+            return super().set_many(*args, **kwargs)
+
+    def record(self, key, event, flush=True):
+        """Учитывает событие; key = None — вытеснение без префикса."""
+        prefix = key_prefix(key) if key is not None else None
+        if event != 'evictions':
+            timing.count(f'cache_{event}')
+        with self._stats_lock:
+            self._stats[prefix, event] += 1
+            self._stats_pending += 1
+            if not flush or self._stats_pending < self.stats_flush_every:
+                return
+        self.flush_stats()
+
+    def flush_stats(self):
+        """Складывает накопленные процессом счётчики в хранилище."""
+        with self._stats_lock:
+            stats, self._stats = self._stats, Counter()
+            self._stats_pending = 0
+        if not stats:
+            return
+        store = self.stats_store
+        prefixes = set(store.get('prefixes', ()))
+        new_prefixes = {prefix for prefix, _ in stats} - prefixes - {None}
+        if new_prefixes:
+            store.set('prefixes', sorted(prefixes | new_prefixes))
+        for (prefix, event), count in stats.items():
+            key = event if prefix is None else f'{prefix}:{event}'
+            if store.add(key, count):
+                continue
+            try:
+                store.incr(key, count)
+            except ValueError:
+                store.set(key, count)
+
+    def read_stats(self):
+        """
+        Возвращает {префикс: {'hits': …, 'misses': …, 'evictions': …}}.
+        Если префиксы вытесненных ключей неизвестны, evictions — None,
+        а общее число вытеснений возвращает read_evictions().
+        """
+        self.flush_stats()
+        prefixes = self.stats_store.get('prefixes', ())
+        values = self.stats_store.get_many([
+            f'{prefix}:{event}'
+            for prefix in prefixes for event in STATS_EVENTS
+        ])
+        stats = {}
+        for prefix in prefixes:
+            stats[prefix] = {
+                event: values.get(f'{prefix}:{event}', 0)
+                for event in STATS_EVENTS
+            }
+            if not self.evictions_by_prefix:
+                stats[prefix]['evictions'] = None
+        return stats
+
+    def read_evictions(self):
+        """Общее число вытеснений."""
+        if self.evictions_by_prefix:
+            return sum(stats['evictions']
+                       for stats in self.read_stats().values())
+        self.flush_stats()
+        return self.stats_store.get('evictions', 0)
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self._stats = Counter()
+            self._stats_pending = 0
+        self.stats_store.clear()
+
+
+class StatsLocMemCache(CacheStatsMixin, LocMemCache):
+    """Кэш в памяти процесса. Подходит для разработки и тестов."""
+
+    def make_stats_store(self, location):
+        return LocMemCache(f'{location}:stats', STATS_PARAMS)
+
+    def _cull(self):
+        # Вызывается под блокировкой кэша, поэтому без сброса в хранилище.
+        keys = set(self._cache)
+        super()._cull()
+        for key in keys.difference(self._cache):
+            self.record(key.split(':', 2)[-1], 'evictions', flush=False)
+
+
+class StatsFileBasedCache(CacheStatsMixin, FileBasedCache):
+    """
+    Кэш в файлах, общий для всех процессов на одной машине.
+    Имена файлов — хэши ключей, и при вытеснении ключ уже не узнать,
+    поэтому вытеснения считаются только общим числом, без префиксов.
+    """
+    evictions_by_prefix = False
+    _culling = False
+
+    def make_stats_store(self, location):
+        # FileBasedCache чистит и вытесняет только файлы верхнего уровня
+        # своего каталога, поэтому подкаталог stats остаётся нетронутым.
+        return FileBasedCache(os.path.join(location, 'stats'), STATS_PARAMS)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        """
+        У FileBasedCache add — проверка и запись по отдельности, и ключ
+        получают оба процесса. os.link не заменяет существующий файл,
+        поэтому из одновременных add успешен только один.
+        """
+        self._createdir()
+        fname = self._key_to_file(key, version)
+        if self.has_key(key, version):
+            return False
+        self._cull()
+        fd, tmp_path = tempfile.mkstemp(dir=self._dir)
+        try:
+            with open(fd, 'wb') as f:
+                self._write_content(f, timeout, value)
+            os.link(tmp_path, fname)
+        except FileExistsError:
+            return False
+        finally:
+            os.remove(tmp_path)
+        return True
+
+    def _cull(self):
+        self._culling = True
+        try:
+            super()._cull()
+        finally:
+            self._culling = False
+
+    def _delete(self, fname):
+        super()._delete(fname)
+        if self._culling:
+            self.record(None, 'evictions', flush=False)
@@ -0,0 +1,90 @@
+"""
+Чтение с реплик базы для страниц, которые только читают.
+
+ReplicaMiddleware отмечает запрос, если его вид указан
+в REPLICA_READ_VIEWS, и тогда ReplicaRouter отправляет чтения на
+случайную реплику из DATABASE_REPLICAS. Запись всегда идёт в основную
+базу (default). После записи клиент получает cookie, и ещё
+REPLICA_STICKY_SECONDS секунд все его запросы читают из основной базы —
+так отставание реплики не прячет от пользователя его же новый пост.
+used_replica() сообщает, читал ли текущий запрос с реплики: кэши
+по нему решают, можно ли сохранить прочитанное (posts/versions.py).
+"""
+import random
+import threading
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_state = threading.local()
+
+
+def used_replica():
+    return getattr(_state, 'used_replica', False)
+
+
+def reads_from_replica():
+    return (getattr(_state, 'replica_reads', False)
+            and not getattr(_state, 'wrote', False)
+            and not connections[DEFAULT_DB_ALIAS].in_atomic_block)
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if settings.DATABASE_REPLICAS and reads_from_replica():
+            _state.used_replica = True
+            return random.choice(settings.DATABASE_REPLICAS)
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Дальше в этом запросе читаем то, что только что записали.
+        _state.wrote = True
+        # Объект из другой базы (не реплики) пишется в свою же базу.
+        instance = hints.get('instance')
+        db = instance._state.db if instance is not None else None
+        if db and db not in settings.DATABASE_REPLICAS:
+            return db
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Схема приходит на реплики вместе с данными.
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ReplicaMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _state.replica_reads = _state.wrote = _state.used_replica = False
+        try:
+            response = self.get_response(request)
+            wrote = _state.wrote
+        finally:
+            _state.replica_reads = _state.wrote = False
+            _state.used_replica = False
+        if wrote and settings.DATABASE_REPLICAS:
+            response.set_cookie(
+                settings.REPLICA_STICKY_COOKIE, '1',
+                max_age=settings.REPLICA_STICKY_SECONDS, httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        _state.replica_reads = (
+            request.method in ('GET', 'HEAD')
+            and request.resolver_match.view_name
+            in settings.REPLICA_READ_VIEWS
+            and settings.REPLICA_STICKY_COOKIE not in request.COOKIES
+        )
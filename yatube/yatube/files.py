@@ -0,0 +1,124 @@
+"""
+Раздача статики и загруженных файлов.
+
+FILE_SERVING выбирает, кто читает файлы с диска:
+'django' — сам Django через django.views.static.serve (для разработки);
+'x-sendfile' — веб-сервер по заголовку X-Sendfile с путём к файлу
+(Apache mod_xsendfile, lighttpd);
+'x-accel-redirect' — nginx по заголовку X-Accel-Redirect с адресом
+внутренней location из FILE_ACCEL_LOCATIONS.
+
+В двух последних режимах воркер только проверяет путь, выбирает
+заранее сжатую копию по Accept-Encoding и ставит заголовки кэширования,
+а сами байты отдаёт веб-сервер.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import (ImproperlyConfigured,
+                                    SuspiciousFileOperation)
+from django.http import Http404, HttpResponse, HttpResponseNotModified
+from django.urls import re_path
+from django.utils._os import safe_join
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import serve, was_modified_since
+
+FILE_SERVING_MODES = ('django', 'x-sendfile', 'x-accel-redirect')
+# Заранее сжатые копии в порядке предпочтения.
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def accepts(request, coding):
+    return re.search(rf'\b{coding}\b',
+                     request.META.get('HTTP_ACCEPT_ENCODING', ''))
+
+
+def file_response(request, root, path, location, cache_control):
+    try:
+        full_path = safe_join(root, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+    content_type, encoding = mimetypes.guess_type(full_path)
+    served_path, coding = full_path, None
+    variants = [] if encoding else [
+        (coding, full_path + suffix) for coding, suffix in ENCODINGS
+        if os.path.isfile(full_path + suffix)
+    ]
+    for variant_coding, variant_path in variants:
+        if accepts(request, variant_coding):
+            served_path, coding = variant_path, variant_coding
+            break
+    stat = os.stat(served_path)
+    if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'),
+                              stat.st_mtime, stat.st_size):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(
+            content_type=content_type or 'application/octet-stream')
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        if coding:
+            response['Content-Encoding'] = coding
+        if settings.FILE_SERVING == 'x-sendfile':
+            # Путь уходит байтами UTF-8, как его прочтёт веб-сервер;
+            # иначе Django закодировал бы не-ASCII имя по RFC 2047.
+            response['X-Sendfile'] = served_path.encode().decode('latin-1')
+        else:
+            relative = os.path.relpath(served_path, os.path.abspath(root))
+            response['X-Accel-Redirect'] = (
+                settings.FILE_ACCEL_LOCATIONS[location]
+                + quote(relative.replace(os.sep, '/')))
+    if variants:
+        patch_vary_headers(response, ('Accept-Encoding',))
+    patch_cache_control(response, **cache_control)
+    return response
+
+
+def is_hashed(path):
+    return path in getattr(staticfiles_storage, 'hashed_files', {}).values()
+
+
+def serve_static(request, path):
+    if is_hashed(path):
+        # Имя меняется вместе с содержимым: файл можно кэшировать навсегда.
+        cache_control = {'public': True, 'immutable': True,
+                         'max_age': settings.STATIC_CACHE_SECONDS}
+    else:
+        cache_control = {'public': True,
+                         'max_age': settings.STATIC_UNHASHED_CACHE_SECONDS}
+    return file_response(request, settings.STATIC_ROOT, path, 'static',
+                         cache_control)
+
+
+def serve_media(request, path):
+    return file_response(
+        request, settings.MEDIA_ROOT, path, 'media',
+        {'public': True, 'max_age': settings.MEDIA_CACHE_SECONDS})
+
+
+def url_pattern(url):
+    return r'^{}(?P<path>.*)$'.format(re.escape(url.lstrip('/')))
+
+
+def file_urlpatterns():
+    """Адреса статики и загруженных файлов для режима FILE_SERVING."""
+    if settings.FILE_SERVING not in FILE_SERVING_MODES:
+        raise ImproperlyConfigured(
+            f'FILE_SERVING должен быть одним из {FILE_SERVING_MODES}.')
+    if settings.FILE_SERVING == 'django':
+        return [
+            re_path(url_pattern(settings.MEDIA_URL), serve,
+                    {'document_root': settings.MEDIA_ROOT}),
+            re_path(url_pattern(settings.STATIC_URL), serve,
+                    {'document_root': settings.STATIC_ROOT}),
+        ]
+    return [
+        re_path(url_pattern(settings.MEDIA_URL), serve_media),
+        re_path(url_pattern(settings.STATIC_URL), serve_static),
+    ]
@@ -0,0 +1,191 @@
+"""
+Учёт SQL-запросов каждого запроса к сайту.
+
+QueryBudgetMiddleware считает запросы к базе, время в базе и повторы
+одинаковых запросов (признак N+1) и сравнивает число запросов с бюджетом
+страницы из QUERY_BUDGETS. При превышении пишет предупреждение в лог,
+а при QUERY_BUDGET_STRICT = True выбрасывает QueryBudgetExceeded —
+так превышение бюджета роняет тест.
+
+Сводка по страницам копится в памяти процесса и периодически
+складывается в кэш по часам; её показывает команда query_stats.
+"""
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+STATS_PREFIX = 'query_stats'
+STATS_TIMEOUT = 60 * 60 * 24 * 7
+TOP_DUPLICATES = 5
+UNRESOLVED = '<unresolved>'
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def fingerprint(sql):
+    """Запрос без различий в длине списков IN (%s, %s, ...)."""
+    return re.sub(r'%s(, %s)+', '%s, ...', ' '.join(sql.split()))
+
+
+class QueryRecorder:
+    """execute_wrapper, который запоминает запросы одного HTTP-запроса."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    @property
+    def duplicates(self):
+        return Counter({
+            sql: count for sql, count in self.fingerprints.items()
+            if count > 1
+        })
+
+
+def hour_bucket(timestamp=None):
+    return int((timestamp or time.time()) // 3600)
+
+
+def stats_key(bucket, url_name):
+    return f'{STATS_PREFIX}:{bucket}:{url_name}'
+
+
+def empty_stats():
+    return {
+        'requests': 0, 'queries': 0, 'max_queries': 0, 'db_time': 0.0,
+        'duplicates': 0, 'over_budget': 0, 'top_duplicates': Counter(),
+    }
+
+
+def merge_stats(total, stats):
+    for field in ('requests', 'queries', 'db_time', 'duplicates',
+                  'over_budget'):
+        total[field] += stats[field]
+    total['max_queries'] = max(total['max_queries'], stats['max_queries'])
+    total['top_duplicates'].update(stats['top_duplicates'])
+    total['top_duplicates'] = Counter(
+        dict(total['top_duplicates'].most_common(TOP_DUPLICATES)))
+    return total
+
+
+class QueryStats:
+    """Сводка процесса по страницам, которая сбрасывается в кэш."""
+
+    def __init__(self):
+        self._stats = {}
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def record(self, url_name, recorder, over_budget):
+        duplicates = recorder.duplicates
+        stats = {
+            'requests': 1,
+            'queries': recorder.count,
+            'max_queries': recorder.count,
+            'db_time': recorder.duration,
+            'duplicates': sum(duplicates.values()) - len(duplicates),
+            'over_budget': int(over_budget),
+            'top_duplicates': duplicates,
+        }
+        with self._lock:
+            merge_stats(self._stats.setdefault(url_name, empty_stats()),
+                        stats)
+            self._pending += 1
+            if self._pending < settings.QUERY_STATS_FLUSH_EVERY:
+                return
+        self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._stats = self._stats, {}
+            self._pending = 0
+        if not pending:
+            return
+        bucket = hour_bucket()
+        names_key = f'{STATS_PREFIX}:names'
+        names = set(cache.get(names_key, ()))
+        if not names.issuperset(pending):
+            cache.set(names_key, sorted(names | set(pending)), None)
+        for url_name, stats in pending.items():
+            key = stats_key(bucket, url_name)
+            total = cache.get(key) or empty_stats()
+            cache.set(key, merge_stats(total, stats), STATS_TIMEOUT)
+
+    def read(self, hours=24):
+        """Возвращает {страница: сводка} за последние hours часов."""
+        self.flush()
+        now = hour_bucket()
+        names = cache.get(f'{STATS_PREFIX}:names', ())
+        keys = {
+            stats_key(bucket, url_name): url_name
+            for url_name in names
+            for bucket in range(now - hours + 1, now + 1)
+        }
+        result = {}
+        for key, stats in cache.get_many(list(keys)).items():
+            merge_stats(result.setdefault(keys[key], empty_stats()), stats)
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+            self._pending = 0
+        cache.delete(f'{STATS_PREFIX}:names')
+
+
+query_stats = QueryStats()
+
+
+class QueryBudgetMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        match = request.resolver_match
+        url_name = match.view_name if match else UNRESOLVED
+        budget = settings.QUERY_BUDGETS.get(url_name)
+        over_budget = budget is not None and recorder.count > budget
+        query_stats.record(url_name, recorder, over_budget)
+        if over_budget:
+            self.report(request, url_name, budget, recorder)
+        return response
+
+    def report(self, request, url_name, budget, recorder):
+        message = (
+            f'{url_name} ({request.path}): {recorder.count} SQL-запросов '
+            f'при бюджете {budget}, {recorder.duration * 1000:.1f} мс в БД'
+        )
+        duplicates = recorder.duplicates.most_common(TOP_DUPLICATES)
+        if duplicates:
+            message += '; повторы: ' + '; '.join(
+                f'{count}× {sql}' for sql, count in duplicates)
+        if settings.QUERY_BUDGET_STRICT:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
@@ -38,8 +38,9 @@ ALLOWED_HOSTS = [
 
 INSTALLED_APPS = [
     'posts.apps.PostsConfig',
-    'users',
+    'users.apps.UsersConfig',
     'about',
+    'api',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -47,26 +48,32 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'sorl.thumbnail',
-    'debug_toolbar',
 ]
 
 MIDDLEWARE = [
+    'yatube.timing.ServerTimingMiddleware',
+    'yatube.query_budget.QueryBudgetMiddleware',
+    'yatube.db_router.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'users.auth.CachedAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
 ]
 
+# Панель отладки нужна только при разработке.
+if DEBUG:
+    INSTALLED_APPS += ['debug_toolbar']
+    MIDDLEWARE += ['debug_toolbar.middleware.DebugToolbarMiddleware']
+
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'yatube.timing.TimedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -87,13 +94,76 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# 'sqlite' или 'postgresql' (нужен пакет psycopg2-binary).
+DB_ENGINE = os.environ.get('YATUBE_DB_ENGINE', 'sqlite')
+DATABASE_BACKENDS = {
+    'sqlite': {
+        'ENGINE': 'yatube.backends.sqlite3',
+        'NAME': os.environ.get(
+            'YATUBE_DB_NAME', os.path.join(BASE_DIR, 'db.sqlite3')),
+        # WAL: читатели не ждут писателя. Выполняются при каждом
+        # новом соединении.
+        'PRAGMAS': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'mmap_size': 256 * 1024 * 1024,
+            'busy_timeout': 5000,
+        },
+    },
+    'postgresql': {
+        'ENGINE': 'yatube.backends.postgresql',
+        'NAME': os.environ.get('YATUBE_DB_NAME', 'yatube'),
+        'USER': os.environ.get('YATUBE_DB_USER', 'yatube'),
+        'PASSWORD': os.environ.get('YATUBE_DB_PASSWORD', ''),
+        'HOST': os.environ.get('YATUBE_DB_HOST', 'localhost'),
+        'PORT': os.environ.get('YATUBE_DB_PORT', '5432'),
+    },
+}
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        **DATABASE_BACKENDS[DB_ENGINE],
+        # Соединение живёт между запросами столько секунд; 0 — закрывать
+        # после каждого запроса.
+        'CONN_MAX_AGE': int(os.environ.get('YATUBE_DB_CONN_MAX_AGE', 60)),
+        # Проверять оставшееся с прошлого запроса соединение перед
+        # первым запросом к базе.
+        'CONN_HEALTH_CHECKS': (
+            os.environ.get('YATUBE_DB_HEALTH_CHECKS', '1') == '1'),
     }
 }
 
+# Реплики только для чтения: имена баз через запятую в YATUBE_DB_REPLICAS
+# (для SQLite — пути к файлам). В тестах реплики зеркалят default.
+DATABASE_REPLICAS = []
+for number, name in enumerate(
+        filter(None, os.environ.get('YATUBE_DB_REPLICAS', '').split(',')),
+        start=1):
+    DATABASES[f'replica{number}'] = {
+        **DATABASES['default'], 'NAME': name, 'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{number}')
+DATABASE_ROUTERS = ['yatube.db_router.ReplicaRouter']
+# Страницы, которые только читают и могут читать с реплик.
+REPLICA_READ_VIEWS = (
+    'index', 'group_posts', 'profile', 'post', 'post_comments',
+    'follow_index', 'about:author', 'about:tech',
+    *(f'api:v1:{name}' for name in (
+        'posts', 'groups', 'group', 'group_posts', 'profile', 'user_posts',
+        'post', 'post_comments', 'followers', 'following',
+    )),
+)
+# Наибольшее отставание реплик в секундах. Столько же после записи
+# клиент читает только из основной базы, а ответы, прочитанные с реплики,
+# не попадают в кэш страниц и карточек, пока с изменения их версии
+# не прошло столько же.
+REPLICA_LAG_SECONDS = float(os.environ.get('YATUBE_DB_REPLICA_LAG', '10'))
+REPLICA_STICKY_SECONDS = round(REPLICA_LAG_SECONDS)
+REPLICA_STICKY_COOKIE = 'primary_reads'
+
+
+# Словарь PostgreSQL для полнотекстового поиска по постам.
+SEARCH_CONFIG = 'russian'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -137,6 +207,23 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Кто читает статику и загруженные файлы с диска: 'django' (для
+# разработки), 'x-sendfile' (Apache, lighttpd) или 'x-accel-redirect'
+# (nginx). В двух последних режимах статика собирается collectstatic
+# с хэшами в именах и сжатыми копиями .gz/.br.
+FILE_SERVING = os.environ.get('YATUBE_FILE_SERVING', 'django')
+if FILE_SERVING != 'django':
+    STATICFILES_STORAGE = (
+        'yatube.storage.CompressedManifestStaticFilesStorage')
+# Внутренние location nginx, указывающие на STATIC_ROOT и MEDIA_ROOT.
+FILE_ACCEL_LOCATIONS = {
+    'static': '/protected/static/',
+    'media': '/protected/media/',
+}
+STATIC_CACHE_SECONDS = 60 * 60 * 24 * 365
+STATIC_UNHASHED_CACHE_SECONDS = 60 * 60
+MEDIA_CACHE_SECONDS = 60 * 60 * 24 * 30
+
 LOGIN_URL = '/auth/login/'
 LOGIN_REDIRECT_URL = 'index'
 
@@ -144,12 +231,123 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 POSTS_PER_PAGE = 10
-
+# Комментарии под постом подгружаются страницами по ключу (created, id).
+COMMENTS_PER_PAGE = 20
+# Размер страницы всех списков API.
+API_PAGE_SIZE = 20
+
+# 'cursor' — постраничный вывод по ключу (pub_date, id) без COUNT и OFFSET,
+# 'numbered' — классическая нумерация страниц.
+POSTS_PAGINATION = 'cursor'
+# Небольшие ленты, которые всегда выводятся с нумерацией страниц.
+NUMBERED_PAGINATION_VIEWS = ('follow_index',)
+
+# 'locmem' — отдельный кэш в памяти каждого процесса (для разработки),
+# 'file' — кэш в файлах, общий для всех воркеров на одной машине.
+CACHE_TYPE = os.environ.get('YATUBE_CACHE', 'locmem')
+CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'yatube.cache.StatsLocMemCache',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    'file': {
+        'BACKEND': 'yatube.cache.StatsFileBasedCache',
+        'LOCATION': os.environ.get(
+            'YATUBE_CACHE_DIR', os.path.join(BASE_DIR, 'cache')),
+        'OPTIONS': {'MAX_ENTRIES': 50000},
+    },
+}
 CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    'default': CACHE_BACKENDS[CACHE_TYPE],
+}
+
+# Ленты подписок, собираемые при публикации поста (fan-out-on-write).
+# Хранятся в кэше, поэтому включены только с общим для всех процессов кэшем.
+FOLLOW_TIMELINES = CACHE_TYPE != 'locmem'
+TIMELINE_LENGTH = 1000
+TIMELINE_TIMEOUT = 60 * 60 * 24
+# Блокировка ленты на время её обновления; истекает, если процесс упал.
+TIMELINE_LOCK_TIMEOUT = 10
+# Посты авторов с большим числом подписчиков не раскладываются по лентам,
+# а подмешиваются при чтении ленты.
+TIMELINE_FANOUT_MAX_FOLLOWERS = 5000
+
+# Сессии и вошедшие пользователи читаются из кэша. Выход и смену пароля
+# должны сразу увидеть все процессы, поэтому только с общим кэшем.
+if CACHE_TYPE == 'locmem':
+    SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+    USER_CACHE_TIMEOUT = 0
+else:
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+    USER_CACHE_TIMEOUT = 60 * 60
+
+# Срок хранения страниц в кэше для анонимных посетителей. Устаревшие
+# страницы сбрасываются сигналами, срок лишь ограничивает память;
+# 0 — не кэшировать страницы.
+PAGE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Уменьшенные копии картинок постов для srcset. Форматы, которые
+# не поддерживает установленный Pillow, пропускаются.
+POST_IMAGE_WIDTHS = (320, 640, 960)
+POST_IMAGE_FORMATS = ('AVIF', 'WEBP')
+
+# Ограничения на загружаемые картинки. Принятая картинка уменьшается
+# до POST_IMAGE_MAX_SIDE пикселей по большей стороне.
+POST_IMAGE_MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+POST_IMAGE_MAX_PIXELS = 40 * 1000 * 1000
+POST_IMAGE_MAX_SIDE = 2048
+
+# Бюджеты SQL-запросов на страницу по имени URL. При превышении
+# QueryBudgetMiddleware пишет предупреждение в лог, а при
+# QUERY_BUDGET_STRICT = True выбрасывает исключение (для тестов).
+QUERY_BUDGETS = {
+    'index': 8,
+    'group_posts': 9,
+    'profile': 10,
+    'post': 7,
+    'post_comments': 3,
+    'follow_index': 6,
+    'search': 7,
+    'api:v1:posts': 4,
+    'api:v1:group_posts': 5,
+    'api:v1:user_posts': 6,
+    'api:v1:post': 3,
+    'api:v1:post_comments': 4,
+    'api:v1:profile': 4,
+    'api:v1:followers': 5,
+    'api:v1:following': 5,
+}
+QUERY_BUDGET_STRICT = False
+
+# Доля запросов, у которых замеряются база, шаблоны, миниатюры и кэш
+# (0 — не замерять, 1 — все). Замер уходит JSON-строкой в лог yatube.perf,
+# а заголовком Server-Timing — сотрудникам (is_staff) и, если
+# PERF_SERVER_TIMING, всем. Заголовок раскрывает число SQL-запросов
+# и попадания в кэш, поэтому для всех он включён только в DEBUG.
+PERF_SAMPLE_RATE = float(os.environ.get('YATUBE_PERF_SAMPLE_RATE', '0'))
+PERF_SERVER_TIMING = DEBUG
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'perf': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'message',
+        },
+    },
+    'loggers': {
+        'yatube.perf': {
+            'handlers': ['perf'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
 }
+# Через сколько запросов процесс складывает свою сводку в кэш.
+QUERY_STATS_FLUSH_EVERY = 50
 
 INTERNAL_IPS = [
     "127.0.0.1",
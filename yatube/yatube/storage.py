@@ -0,0 +1,57 @@
+"""
+Хранилище статики для боевого режима: имена файлов с хэшем содержимого
+(ManifestStaticFilesStorage) и заранее сжатые копии .gz и .br рядом
+с ними. Brotli используется, только если установлен пакет brotli.
+"""
+import gzip
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = (
+    '.css', '.js', '.map', '.svg', '.txt', '.json', '.xml', '.html',
+)
+
+
+def compressors():
+    yield '.gz', lambda data: gzip.compress(data, 9, mtime=0)
+    if brotli is not None:
+        yield '.br', brotli.compress
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+
+    def stored_name(self, name):
+        # Файлы, которых нет в манифесте (например, положенные в STATIC_ROOT
+        # вручную), отдаются под исходными именами, а не роняют страницу.
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in sorted(set(self.hashed_files.values())):
+            if not name.endswith(COMPRESSIBLE_EXTENSIONS):
+                continue
+            for compressed_name in self.compress(name):
+                yield name, compressed_name, True
+
+    def compress(self, name):
+        """Пишет сжатые копии файла, если они меньше исходного."""
+        path = self.path(name)
+        with open(path, 'rb') as file:
+            data = file.read()
+        for suffix, compress in compressors():
+            compressed = compress(data)
+            if len(compressed) >= len(data):
+                continue
+            with open(path + suffix, 'wb') as file:
+                file.write(compressed)
+            yield name + suffix
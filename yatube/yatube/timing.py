@@ -0,0 +1,176 @@
+"""
+Замер времени участков запроса: база, шаблоны, миниатюры, кэш.
+
+ServerTimingMiddleware с вероятностью PERF_SAMPLE_RATE замеряет запрос:
+SQL-запросы через execute_wrapper, рендеринг через бэкенд шаблонов
+TimedDjangoTemplates, миниатюры и обращения к кэшу через timed().
+Время участков исключающее: запросы к базе из шаблона идут в db, а не
+в template. Остаток до полного времени — app (код видов и middleware).
+Итог всегда уходит JSON-строкой в лог yatube.perf, а заголовком
+Server-Timing — только сотрудникам или всем при PERF_SERVER_TIMING.
+Незамеряемые запросы проходят без накладных расходов: timed() без
+текущего замера ничего не делает.
+"""
+import json
+import logging
+import random
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+
+from .query_budget import UNRESOLVED
+
+SEGMENTS = ('db', 'template', 'thumbnail', 'cache')
+
+logger = logging.getLogger('yatube.perf')
+_local = threading.local()
+
+
+class RequestTimer:
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.durations = Counter()
+        self.counts = Counter()
+        self._stack = []
+
+    @contextmanager
+    def segment(self, name):
+        # Участок внутри участка того же вида (шаблон из тега шаблона)
+        # уже учтён внешним.
+        if any(entry[0] == name for entry in self._stack):
+            yield
+            return
+        entry = [name, 0.0]
+        self._stack.append(entry)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self._stack.pop()
+            self.durations[name] += elapsed - entry[1]
+            self.counts[name] += 1
+            if self._stack:
+                self._stack[-1][1] += elapsed
+
+    def timings(self):
+        """Миллисекунды по участкам, app и total."""
+        total = time.perf_counter() - self.start
+        timings = {
+            name: round(self.durations[name] * 1000, 2) for name in SEGMENTS
+        }
+        timings['app'] = round(
+            max(total - sum(self.durations.values()), 0) * 1000, 2)
+        timings['total'] = round(total * 1000, 2)
+        return timings
+
+
+def current_timer():
+    return getattr(_local, 'timer', None)
+
+
+@contextmanager
+def timed(name):
+    timer = current_timer()
+    if timer is None:
+        yield
+        return
+    with timer.segment(name):
+        yield
+
+
+def count(name, value=1):
+    timer = current_timer()
+    if timer is not None:
+        timer.counts[name] += value
+
+
+def time_query(execute, sql, params, many, context):
+    with timed('db'):
+        return execute(sql, params, many, context)
+
+
+class TimedTemplate(Template):
+
+    def render(self, context=None, request=None):
+        with timed('template'):
+            return super().render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Бэкенд шаблонов Django, который замеряет загрузку и рендеринг."""
+
+    def from_string(self, template_code):
+        with timed('template'):
+            template = super().from_string(template_code)
+        return TimedTemplate(template.template, self)
+
+    def get_template(self, template_name):
+        with timed('template'):
+            template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
+
+
+def server_timing(timings, counts):
+    descriptions = {
+        'db': f'{counts["db"]} SQL',
+        'cache': f'{counts["cache_hits"]} hit, {counts["cache_misses"]} miss',
+    }
+    metrics = []
+    for name, duration in timings.items():
+        metric = f'{name};dur={duration}'
+        if name in descriptions:
+            metric += f';desc="{descriptions[name]}"'
+        metrics.append(metric)
+    return ', '.join(metrics)
+
+
+class ServerTimingMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.PERF_SAMPLE_RATE:
+            return self.get_response(request)
+        timer = _local.timer = RequestTimer()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(time_query))
+                response = self.get_response(request)
+        finally:
+            _local.timer = None
+        timings = timer.timings()
+        if self.shows_timing(request):
+            response['Server-Timing'] = server_timing(timings, timer.counts)
+        self.log(request, response, timings, timer.counts)
+        return response
+
+    def shows_timing(self, request):
+        if settings.PERF_SERVER_TIMING:
+            return True
+        # Запрос мог оборваться раньше, чем middleware входа задала user.
+        user = getattr(request, 'user', None)
+        return user is not None and user.is_staff
+
+    def log(self, request, response, timings, counts):
+        match = request.resolver_match
+        logger.info(json.dumps({
+            'view': match.view_name if match else UNRESOLVED,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'timings': timings,
+            'queries': counts['db'],
+            'cache_hits': counts['cache_hits'],
+            'cache_misses': counts['cache_misses'],
+            'thumbnails': counts['thumbnail'],
+        }, ensure_ascii=False))
@@ -17,12 +17,14 @@ from django.conf import settings
 from django.conf.urls import handler404, handler500
 from django.conf.urls.static import static
 from django.contrib import admin
-from django.contrib.staticfiles.urls import staticfiles_urlpatterns  #for ngrok
-from django.views.static import serve  #for ngrok
-from django.urls import include, path, re_path
+from django.contrib.staticfiles.urls import staticfiles_urlpatterns
+from django.urls import include, path
+
+from .files import file_urlpatterns
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/', include('api.urls', namespace='api')),
     path('', include('posts.urls')),
     path('about/', include('about.urls', namespace='about')),
     path('auth/', include('users.urls')),
@@ -42,6 +44,4 @@ if settings.DEBUG:
                           document_root=settings.STATIC_ROOT)
 
 urlpatterns += staticfiles_urlpatterns()
-
-urlpatterns += [re_path(r'^media/(?P<path>.*)$', serve, {'document_root': settings.MEDIA_ROOT,}),]  #for ngrok
-urlpatterns += [re_path(r'^static/(?P<path>.*)$', serve, {'document_root':settings.STATIC_ROOT}),]
+urlpatterns += file_urlpatterns()